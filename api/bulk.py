@@ -0,0 +1,172 @@
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+
+from models import User
+from manage import db, password_hasher
+from app.accounts import EMAIL_RE
+from app.usernames import allocate_usernames, username_base
+
+BULK_MAX_ITEMS = 1000
+BULK_CHUNK_SIZE = 200
+# chamadas por admin: cada uma pode custar BULK_MAX_ITEMS hashes de senha
+BULK_RATE_BURST = 3
+BULK_RATE_PER_MINUTE = 1
+
+
+class BulkUserCreate:
+    """Cria vários usuários a partir de uma lista de objetos JSON.
+
+    Conflitos de e-mail e username do lote inteiro saem de uma única
+    consulta; os hashes de senha vão para o pool compartilhado
+    (app.accounts.PasswordHasher; todos enviados de uma vez, então o pool
+    adianta os próximos blocos enquanto o atual é gravado) e os INSERTs vão
+    em blocos de chunk_size.
+
+    atomic=False: cada bloco é uma transação e itens inválidos não impedem
+    os demais. atomic=True: qualquer erro cancela o lote inteiro.
+    """
+
+    def __init__(self, chunk_size=None, atomic=None):
+        config = current_app.config
+        self.chunk_size = chunk_size or config.get('API_BULK_CHUNK_SIZE', BULK_CHUNK_SIZE)
+        self.atomic = config.get('API_BULK_ATOMIC', False) if atomic is None else atomic
+        self.results = []
+
+    def run(self, items):
+        """Processa a lista e devolve os resultados por item (na ordem recebida)"""
+        self.results = [{'index': index, 'status': None} for index in range(len(items))]
+        valid = self._validate(items)
+        if self.atomic and len(valid) < len(items):
+            self._abort('batch aborted: invalid items')
+            return self.results
+        self._check_conflicts(valid)
+        if self.atomic and any(result['status'] == 'error' for result in self.results):
+            self._abort('batch aborted: conflicting items')
+            return self.results
+
+        pending = [item for item in valid if self.results[item['index']]['status'] is None]
+        # usernames gerados não podem tomar os escolhidos por outros itens do lote
+        chosen = {item['username'] for item in pending if item['username']}
+        bases = [item['username_base'] for item in pending if item['username'] is None]
+        allocated = iter(allocate_usernames(bases, chosen))
+        for item in pending:
+            if item['username'] is None:
+                item['username'] = next(allocated)
+
+        self._write(pending, password_hasher.hash_many(item.pop('password') for item in pending))
+        return self.results
+
+    def summary(self):
+        created = sum(1 for result in self.results if result['status'] == 'created')
+        return {'created': created, 'failed': len(self.results) - created, 'results': self.results}
+
+    # -- validação e conflitos --------------------------------------------------
+
+    def _validate(self, items):
+        valid = []
+        seen_emails, seen_usernames = set(), set()
+        for index, data in enumerate(items):
+            if not isinstance(data, dict):
+                self._error(index, 'item must be an object')
+                continue
+            email = str(data.get('email') or '').strip()
+            username = str(data.get('username') or '').strip() or None
+            if email:
+                self.results[index]['email'] = email
+            if not email or not data.get('password'):
+                self._error(index, 'email and password required')
+            elif not EMAIL_RE.match(email) or len(email) > 120:
+                self._error(index, 'invalid email')
+            elif username and len(username) > 50:
+                self._error(index, 'invalid username')
+            elif email.lower() in seen_emails:
+                self._error(index, 'duplicate email in batch')
+            elif username and username in seen_usernames:
+                self._error(index, 'duplicate username in batch')
+            else:
+                seen_emails.add(email.lower())
+                if username:
+                    seen_usernames.add(username)
+                valid.append({
+                    'index': index,
+                    'email': email,
+                    'username': username,
+                    'username_base': username_base(email=email),
+                    'name': str(data.get('name') or '').strip() or username_base(email=email),
+                    'password': str(data['password']),
+                })
+        return valid
+
+    def _check_conflicts(self, items):
+        # uma consulta para o lote todo: e-mails e usernames pedidos que já existem
+        if not items:
+            return
+        emails = [item['email'] for item in items]
+        usernames = [item['username'] for item in items if item['username']]
+        criteria = User.email.in_(emails)
+        if usernames:
+            criteria = db.or_(criteria, User.username.in_(usernames))
+        taken_emails, taken_usernames = set(), set()
+        for email, username in db.session.query(User.email, User.username).filter(criteria):
+            taken_emails.add(email)
+            taken_usernames.add(username)
+        for item in items:
+            if item['email'] in taken_emails:
+                self._error(item['index'], 'email exists')
+            elif item['username'] in taken_usernames:
+                self._error(item['index'], 'username exists')
+
+    # -- gravação ---------------------------------------------------------------
+
+    def _write(self, items, hashes):
+        hashes = iter(hashes)
+        try:
+            for start in range(0, len(items), self.chunk_size):
+                chunk = items[start:start + self.chunk_size]
+                for item in chunk:
+                    item['password_hash'] = next(hashes)
+                if self.atomic:
+                    self._insert(chunk)
+                    continue
+                try:
+                    self._insert(chunk)
+                    db.session.commit()
+                except IntegrityError:
+                    # outro processo gravou um dos e-mails/usernames: um a um, com savepoint
+                    db.session.rollback()
+                    for item in chunk:
+                        try:
+                            with db.session.begin_nested():
+                                self._insert([item])
+                        except IntegrityError:
+                            self._error(item['index'], 'email or username exists')
+                    db.session.commit()
+            if self.atomic:
+                db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            self._abort('batch aborted: email or username exists')
+
+    def _insert(self, items):
+        user_ids = db.session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True),
+            [{
+                'username': item['username'],
+                'name': item['name'],
+                'email': item['email'],
+                'password_hash': item['password_hash'],
+            } for item in items]
+        ).all()
+        for item, user_id in zip(items, user_ids):
+            self.results[item['index']].update(status='created', id=user_id, username=item['username'])
+
+    def _error(self, index, message):
+        self.results[index].update(status='error', error=message)
+
+    def _abort(self, message):
+        for result in self.results:
+            result.pop('id', None)
+            result.pop('username', None)
+            if result['status'] != 'error':
+                result.update(status='error', error=message)
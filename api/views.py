@@ -1,17 +1,101 @@
-from flask import Blueprint, jsonify, request
+import json
+
+from flask import Blueprint, jsonify, request, url_for, Response, stream_with_context, current_app
+from flask_login import current_user
 from models import User
-from manage import db
+from manage import db, login_throttle
+from api.bulk import BulkUserCreate, BULK_MAX_ITEMS, BULK_RATE_BURST, BULK_RATE_PER_MINUTE
 
 bp = Blueprint('api_bp', __name__)
 
+# campos que podem ser pedidos em ?fields= (id sempre vem: é o cursor)
+USER_FIELDS = {
+    'id': User.id,
+    'username': User.username,
+    'email': User.email,
+    'name': User.name,
+    'role': User.role,
+    'company_id': User.company_id,
+    'avatar': User.avatar,
+}
+# o que qualquer chamador vê; o resto dos campos, os filtros e o NDJSON são só para admin
+DEFAULT_USER_FIELDS = ('id', 'email', 'name')
+DEFAULT_USERS_LIMIT = 100
+MAX_USERS_LIMIT = 1000
+# linhas buscadas por vez do cursor do banco no modo NDJSON
+USERS_STREAM_CHUNK = 1000
+
 @bp.route('/health')
 def health():
     return jsonify({'status':'ok', 'message':'API is running', 'version':'1.0.0', 'author':'Organiums'}), 200
 
 @bp.route('/users', methods=['GET'])
 def list_users():
-    users = User.query.all()
-    return jsonify([{'id':u.id,'email':u.email,'name':u.name} for u in users]), 200
+    """Usuários em ordem de id, paginados por cursor.
+
+    Parâmetros: after_id e limit (até MAX_USERS_LIMIT). A resposta continua
+    sendo uma lista; a próxima página vem no cabeçalho Link (rel="next").
+    Só com sessão de admin: fields (lista separada por vírgulas),
+    company_id, role e format=ndjson (ou Accept: application/x-ndjson), que
+    envia em stream todos os usuários após after_id, um objeto JSON por linha.
+    """
+    requested = [name.strip() for name in request.args.get('fields', '').split(',') if name.strip()]
+    unknown = [name for name in requested if name not in USER_FIELDS]
+    if unknown:
+        return jsonify({'error': f"unknown fields: {', '.join(unknown)}"}), 400
+    fields = ['id'] + [name for name in dict.fromkeys(requested or DEFAULT_USER_FIELDS) if name != 'id']
+    stream = request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson'
+
+    restricted = set(fields) - set(DEFAULT_USER_FIELDS)
+    if stream or restricted or request.args.get('company_id') or request.args.get('role'):
+        denied = _require_admin()
+        if denied:
+            return denied
+
+    query = db.select(*[USER_FIELDS[name] for name in fields]).where(User.deleted_at.is_(None)).order_by(User.id)
+    company_id = request.args.get('company_id', type=int)
+    if company_id is not None:
+        query = query.where(User.company_id == company_id)
+    if request.args.get('role'):
+        query = query.where(User.role == request.args['role'])
+    after_id = request.args.get('after_id', type=int)
+    if after_id is not None:
+        query = query.where(User.id > after_id)
+
+    if stream:
+        limit = request.args.get('limit', type=int)
+        if limit:
+            query = query.limit(limit)
+        return Response(stream_with_context(_stream_users(query, fields)), mimetype='application/x-ndjson')
+
+    limit = min(max(request.args.get('limit', DEFAULT_USERS_LIMIT, type=int), 1), MAX_USERS_LIMIT)
+    rows = db.session.execute(query.limit(limit + 1)).all()
+    users = [dict(zip(fields, row)) for row in rows[:limit]]
+
+    response = jsonify(users)
+    if len(rows) > limit:
+        args = request.args.to_dict()
+        args.update(after_id=users[-1]['id'], limit=limit)
+        response.headers['Link'] = f'<{url_for("api_bp.list_users", _external=True, **args)}>; rel="next"'
+    return response, 200
+
+def _require_admin():
+    # sessão do flask-login; None quando permitido, senão a resposta de erro
+    if not current_user.is_authenticated:
+        return jsonify({'error': 'authentication required'}), 401
+    if not current_user.is_admin():
+        return jsonify({'error': 'admin role required'}), 403
+    return None
+
+def _stream_users(query, fields):
+    # yield_per mantém só um lote de linhas em memória; cada lote vira um bloco do stream
+    result = db.session.execute(query.execution_options(yield_per=USERS_STREAM_CHUNK))
+    try:
+        for rows in result.partitions():
+            yield ''.join(json.dumps(dict(zip(fields, row))) + '\n' for row in rows)
+    finally:
+        result.close()
+        db.session.close()
 
 @bp.route('/users', methods=['POST'])
 def create_user():
@@ -25,3 +109,44 @@ def create_user():
     db.session.add(user)
     db.session.commit()
     return jsonify({'id': user.id, 'email': user.email}), 201
+
+@bp.route('/users/bulk', methods=['POST'])
+def create_users_bulk():
+    """Cria vários usuários numa chamada.
+
+    Corpo: lista de objetos {email, password, name?, username?} ou
+    {"users": [...], "atomic": bool}. Sem username, um é gerado a partir do
+    e-mail. atomic (também ?atomic=1; padrão API_BULK_ATOMIC) cancela tudo
+    se algum item falhar; caso contrário cada item tem seu status.
+    Resposta 201 se todos foram criados, 207 se parte falhou e 422 se nenhum.
+    Exige sessão de admin e tem limite de chamadas por admin
+    (API_BULK_RATE_BURST, API_BULK_RATE_PER_MINUTE); acima dele, 429.
+    """
+    denied = _require_admin()
+    if denied:
+        return denied
+    config = current_app.config
+    wait = login_throttle.limit(f"api-bulk:{current_user.id}", config.get('API_BULK_RATE_BURST', BULK_RATE_BURST),
+                                config.get('API_BULK_RATE_PER_MINUTE', BULK_RATE_PER_MINUTE))
+    if wait:
+        response = jsonify({'error': 'too many bulk requests'})
+        response.headers['Retry-After'] = str(max(1, int(wait + 0.999)))
+        return response, 429
+
+    data = request.get_json(silent=True)
+    atomic = request.args.get('atomic', type=lambda value: value.lower() in ('1', 'true'))
+    if isinstance(data, dict):
+        if 'atomic' in data:
+            atomic = bool(data['atomic'])
+        data = data.get('users')
+    if not isinstance(data, list) or not data:
+        return jsonify({'error':'a non-empty list of users is required'}), 400
+    max_items = config.get('API_BULK_MAX_ITEMS', BULK_MAX_ITEMS)
+    if len(data) > max_items:
+        return jsonify({'error':f'at most {max_items} users per request'}), 413
+
+    bulk = BulkUserCreate(atomic=atomic)
+    bulk.run(data)
+    summary = bulk.summary()
+    status = 201 if not summary['failed'] else 207 if summary['created'] else 422
+    return jsonify(summary), status
@@ -0,0 +1,72 @@
+import atexit
+import multiprocessing
+import os
+import re
+import secrets
+import string
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from werkzeug.security import generate_password_hash
+
+# validação de e-mail usada pelas criações em lote (importação de colaboradores e API)
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# abaixo disso os hashes são calculados na própria thread
+MIN_ROWS_FOR_POOL = 16
+
+
+def generate_random_password(length=12):
+    """Gera uma senha aleatória"""
+    characters = string.ascii_letters + string.digits + string.punctuation
+    return ''.join(secrets.choice(characters) for i in range(length))
+
+
+class PasswordHasher:
+    """Hashes de senha em lote num pool de processos único por processo da aplicação.
+
+    O pool é criado na primeira vez que um lote grande aparece e reaproveitado
+    por todas as requisições, então o total de núcleos ocupados com hashes
+    nunca passa de PASSWORD_HASH_WORKERS, por mais lotes simultâneos que
+    haja. Os processos usam o método spawn: um fork no meio de uma
+    requisição copiaria as travas das threads de fundo (auditoria, pubsub,
+    exclusões, limite de login) em qualquer estado.
+    """
+
+    def __init__(self, app=None):
+        self.workers = 1
+        self._pool = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_WORKERS', os.cpu_count() or 1)
+
+        self.workers = max(1, app.config['PASSWORD_HASH_WORKERS'])
+        app.extensions['password_hasher'] = self
+        atexit.register(self.shutdown)
+
+    def hash_many(self, passwords):
+        """Iterador com o hash de cada senha, na mesma ordem; o cálculo começa na hora"""
+        passwords = list(passwords)
+        if self.workers <= 1 or len(passwords) < MIN_ROWS_FOR_POOL:
+            return map(generate_password_hash, passwords)
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return self._executor().map(generate_password_hash, passwords, chunksize=chunksize)
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None and self._pid == os.getpid():
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _executor(self):
+        # o pool não sobrevive a fork do servidor (gunicorn, etc.), então é criado por processo
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
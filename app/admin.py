@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import joinedload, contains_eager
+
+from models import User, Log, Ticket, Mensagem
+from manage import db
+
+ADMIN_PAGE_SIZE = 50
+MAX_ADMIN_PAGE_SIZE = 200
+
+USER_ROLES = ('admin', 'funcionarios', 'cliente_adm', 'cliente')
+LOG_STATUSES = ('ok', 'fail')
+TICKET_STATUSES = ('Aberto', 'Em andamento', 'Fechado')
+# filtro de idade dos tickets (dias desde a abertura): chave -> (rótulo, mínimo, máximo)
+TICKET_AGES = {
+    'ate_1': ('Até 1 dia', None, 1),
+    'ate_7': ('Até 7 dias', None, 7),
+    'ate_30': ('Até 30 dias', None, 30),
+    'mais_7': ('Mais de 7 dias', 7, None),
+    'mais_30': ('Mais de 30 dias', 30, None),
+}
+
+
+def page_size(value):
+    return min(max(value or ADMIN_PAGE_SIZE, 1), MAX_ADMIN_PAGE_SIZE)
+
+
+def parse_day(value):
+    """Data 'YYYY-MM-DD' do formulário de filtros; None se vazia ou inválida"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d') if value else None
+    except ValueError:
+        return None
+
+
+def load_users_page(role=None, company_id=None, limit=ADMIN_PAGE_SIZE, after_id=None):
+    """Usuários do mais novo para o mais antigo, paginados por cursor (id).
+
+    A empresa vem no mesmo SELECT (joinedload), sem consulta por linha.
+    Com filtro, a busca segue os índices (role, id) ou (company_id, id)
+    e para no limite. Devolve (usuários, cursor da próxima página ou None).
+    """
+    query = User.query.options(joinedload(User.company)).filter(User.deleted_at.is_(None))
+    if role:
+        query = query.filter(User.role == role)
+    if company_id is not None:
+        query = query.filter(User.company_id == company_id)
+    if after_id is not None:
+        query = query.filter(User.id < after_id)
+
+    users = query.order_by(User.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        next_cursor = {'after_id': users[-1].id}
+    return users, next_cursor
+
+
+def load_logs_page(status=None, user_id=None, company_id=None, start=None, end=None,
+                   limit=ADMIN_PAGE_SIZE, after=None):
+    """Registros de auditoria do mais recente para o mais antigo, paginados por cursor.
+
+    after é o par (created_at, id) do último registro da página anterior;
+    a ordem (created_at, id) segue os índices de log, então nenhuma página
+    ordena a tabela inteira. end é o último dia incluído no período.
+    """
+    query = Log.query.options(joinedload(Log.user))
+    if status:
+        query = query.filter(Log.status == status)
+    if user_id is not None:
+        query = query.filter(Log.user_id == user_id)
+    if company_id is not None:
+        query = query.filter(Log.user_id.in_(db.session.query(User.id).filter(User.company_id == company_id)))
+    if start is not None:
+        query = query.filter(Log.created_at >= start)
+    if end is not None:
+        query = query.filter(Log.created_at < end + timedelta(days=1))
+    if after is not None:
+        after_created_at, after_id = after
+        query = query.filter(db.or_(
+            Log.created_at < after_created_at,
+            db.and_(Log.created_at == after_created_at, Log.id < after_id)
+        ))
+
+    logs = query.order_by(Log.created_at.desc(), Log.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(logs) > limit:
+        logs = logs[:limit]
+        next_cursor = {'after_created_at': logs[-1].created_at.isoformat(), 'after_id': logs[-1].id}
+    return logs, next_cursor
+
+
+def load_tickets_page(status=None, age=None, limit=ADMIN_PAGE_SIZE, after=None, now=None):
+    """Caixa de entrada do suporte: tickets do mais novo para o mais antigo, paginados por cursor.
+
+    Um único SELECT traz cada ticket da página com o autor, a quantidade de
+    mensagens e a data da última mensagem: a página é escolhida primeiro
+    (índices (status, criado_em, id) ou (criado_em, id)) e só as mensagens
+    dela são agregadas, pelo índice (ticket_id, criado_em). Devolve
+    (linhas (ticket, mensagens, última mensagem), cursor da próxima página ou None).
+    """
+    page = db.session.query(Ticket.id)
+    if status:
+        page = page.filter(Ticket.status == status)
+    if age in TICKET_AGES:
+        _, min_days, max_days = TICKET_AGES[age]
+        now = now or datetime.utcnow()
+        if min_days is not None:
+            page = page.filter(Ticket.criado_em <= now - timedelta(days=min_days))
+        if max_days is not None:
+            page = page.filter(Ticket.criado_em > now - timedelta(days=max_days))
+    if after is not None:
+        after_criado_em, after_id = after
+        page = page.filter(db.or_(
+            Ticket.criado_em < after_criado_em,
+            db.and_(Ticket.criado_em == after_criado_em, Ticket.id < after_id)
+        ))
+    page = page.order_by(Ticket.criado_em.desc(), Ticket.id.desc()).limit(limit + 1).subquery()
+
+    rows = (
+        db.session.query(Ticket, db.func.count(Mensagem.id), db.func.max(Mensagem.criado_em))
+        .join(page, page.c.id == Ticket.id)
+        .outerjoin(Ticket.usuario)
+        .outerjoin(Mensagem, Mensagem.ticket_id == Ticket.id)
+        .options(contains_eager(Ticket.usuario))
+        .group_by(Ticket.id, User.id)
+        .order_by(Ticket.criado_em.desc(), Ticket.id.desc())
+        .all()
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1][0]
+        next_cursor = {'after_criado_em': last.criado_em.isoformat(), 'after_id': last.id}
+    return rows, next_cursor
+
+
+def serialize_deletion(job):
+    return {
+        'id': job.id,
+        'user_id': job.user_id,
+        'username': job.username,
+        'status': job.status,
+        'step': job.step,
+        'steps_done': job.steps_done,
+        'steps_total': job.steps_total,
+        'rows_processed': job.rows_processed,
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -0,0 +1,597 @@
+import json
+import threading
+from calendar import monthrange
+from collections import OrderedDict
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+
+from flask import current_app
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import update
+from sqlalchemy.orm import joinedload
+
+from models import Event, Company
+from manage import db
+from app.intervals import IntervalTree, merge_intervals
+
+# maior janela aceita por GET /api/events (um mês com folga, semana, dia...)
+MAX_EVENTS_WINDOW = timedelta(days=62)
+
+RECURRENCE_FREQS = ('daily', 'weekly', 'monthly')
+# teto de ocorrências expandidas de uma série numa única janela
+MAX_OCCURRENCES_PER_WINDOW = 500
+
+# feeds .ics: escopos aceitos, histórico incluído e quantos corpos gerados ficam em memória
+FEED_SCOPES = ('company', 'setor', 'responsavel')
+FEED_PAST_WINDOW = timedelta(days=180)
+FEED_CACHE_SIZE = 256
+
+# conflitos e disponibilidade: horizonte de séries propostas e teto de colaboradores por consulta
+CONFLICT_SERIES_HORIZON = MAX_EVENTS_WINDOW
+MAX_CONFLICT_BATCH = 200
+MAX_FREEBUSY_COLLABORATORS = 50
+
+_feed_cache = OrderedDict()
+_feed_cache_lock = threading.Lock()
+
+
+def parse_datetime(value):
+    """Converte uma data ISO 8601 (com ou sem fuso, 'Z' incluso) para datetime UTC sem fuso"""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _parse_exdates(raw):
+    if not raw:
+        return frozenset()
+    return frozenset(date.fromisoformat(value) for value in json.loads(raw))
+
+
+def event_exdates(event):
+    """Datas excluídas da série como conjunto de date"""
+    return _parse_exdates(event.recurrence_exdates)
+
+
+def exclude_occurrence(event, day):
+    """Adiciona uma data às exceções da série (a ocorrência deixa de ser expandida)"""
+    exdates = event_exdates(event) | {day}
+    event.recurrence_exdates = json.dumps(sorted(d.isoformat() for d in exdates))
+
+
+def serialize_recurrence(event):
+    if not event.recurrence_freq:
+        return None
+    return {
+        'freq': event.recurrence_freq,
+        'interval': event.recurrence_interval or 1,
+        'until': event.recurrence_until.isoformat() if event.recurrence_until else None,
+        'count': event.recurrence_count,
+        'exdates': sorted(d.isoformat() for d in event_exdates(event))
+    }
+
+
+def parse_recurrence(data):
+    """Valida o payload 'recurrence' da API e devolve os campos do modelo.
+
+    None ou {} removem a recorrência. Lança ValueError com a mensagem de erro.
+    """
+    if not data:
+        return {
+            'recurrence_freq': None,
+            'recurrence_interval': 1,
+            'recurrence_until': None,
+            'recurrence_count': None,
+            'recurrence_exdates': None,
+        }
+    if not isinstance(data, dict):
+        raise ValueError('recurrence deve ser um objeto')
+
+    freq = data.get('freq')
+    if freq not in RECURRENCE_FREQS:
+        raise ValueError(f"recurrence.freq deve ser um de: {', '.join(RECURRENCE_FREQS)}")
+
+    interval = data.get('interval') or 1
+    count = data.get('count')
+    if not isinstance(interval, int) or interval < 1:
+        raise ValueError('recurrence.interval deve ser um inteiro positivo')
+    if count is not None and (not isinstance(count, int) or count < 1):
+        raise ValueError('recurrence.count deve ser um inteiro positivo')
+
+    try:
+        until = parse_datetime(data['until']) if data.get('until') else None
+        exdates = sorted({date.fromisoformat(value[:10]).isoformat() for value in data.get('exdates') or []})
+    except (TypeError, ValueError):
+        raise ValueError('recurrence.until e recurrence.exdates devem ser datas ISO 8601')
+
+    return {
+        'recurrence_freq': freq,
+        'recurrence_interval': interval,
+        'recurrence_until': until,
+        'recurrence_count': count,
+        'recurrence_exdates': json.dumps(exdates) if exdates else None,
+    }
+
+
+def serialize_event(event):
+    """Converte um evento para o formato usado pelo calendar.js"""
+    return {
+        'id': event.id,
+        'title': event.title,
+        'description': event.description or '',
+        'start': event.start_at.isoformat() if event.start_at else None,
+        'end': event.end_at.isoformat() if event.end_at else None,
+        'responsavel': event.responsavel_id,
+        'setor': event.setor_id,
+        'color': event.cor or '#3b82f6',
+        'tipo': event.tipo,
+        'recurrence': serialize_recurrence(event)
+    }
+
+
+def serialize_occurrence(event, start, end):
+    """Ocorrência de uma série: id composto, datas da ocorrência e referência à série"""
+    if not event.recurrence_freq:
+        return serialize_event(event)
+    data = serialize_event(event)
+    data.update({
+        'id': f"{event.id}:{start:%Y%m%dT%H%M%S}",
+        'series_id': event.id,
+        'series_start': data['start'],
+        'series_end': data['end'],
+        'start': start.isoformat(),
+        'end': end.isoformat() if end else None,
+    })
+    return data
+
+
+def _add_months(value, months):
+    # mesmo dia em outro mês; None quando o dia não existe (ex.: 31 de abril)
+    year, month = divmod(value.month - 1 + months, 12)
+    year += value.year
+    month += 1
+    if value.day > monthrange(year, month)[1]:
+        return None
+    return value.replace(year=year, month=month)
+
+
+@lru_cache(maxsize=2048)
+def expand_occurrences(start_at, end_at, freq, interval, until, count, exdates, window_start, window_end):
+    """Ocorrências (início, fim) da série que se sobrepõem a [window_start, window_end).
+
+    Puro e memoizado: a chave inclui a regra inteira, então editar a série
+    gera uma chave nova e as entradas antigas saem pelo LRU. A expansão
+    salta direto para o índice da primeira ocorrência próxima da janela, de
+    modo que o custo depende do tamanho da janela e não da idade da série.
+    """
+    duration = end_at - start_at if end_at else timedelta(0)
+    earliest = window_start - duration  # inícios anteriores a isso terminam antes da janela
+
+    if freq == 'monthly':
+        months = (earliest.year - start_at.year) * 12 + earliest.month - start_at.month
+        index = max(0, months // interval - 1)
+    else:
+        step = timedelta(days=interval * (7 if freq == 'weekly' else 1))
+        index = max(0, (earliest - start_at) // step)
+
+    occurrences = []
+    while count is None or index < count:
+        if freq == 'monthly':
+            start = _add_months(start_at, index * interval)
+            if start is None:
+                # mês sem o dia da série: pula, mas para se o mês já passou da janela
+                if _add_months(start_at.replace(day=1), index * interval) >= window_end:
+                    break
+                index += 1
+                continue
+        else:
+            start = start_at + index * step
+
+        if start >= window_end or (until is not None and start > until):
+            break
+
+        end = start + duration if end_at else None
+        overlaps = start >= window_start or (end is not None and end > window_start)
+        if overlaps and start.date() not in exdates:
+            occurrences.append((start, end))
+            if len(occurrences) >= MAX_OCCURRENCES_PER_WINDOW:
+                break
+        index += 1
+
+    return tuple(occurrences)
+
+
+def series_occurrences(event, start, end):
+    """Ocorrências de uma série na janela (cache por série e janela)"""
+    return expand_occurrences(
+        event.start_at, event.end_at, event.recurrence_freq, event.recurrence_interval or 1,
+        event.recurrence_until, event.recurrence_count, event_exdates(event), start, end
+    )
+
+
+def events_in_window(company_id, start, end):
+    """Eventos da empresa que se sobrepõem à janela [start, end).
+
+    A sobreposição é a união de dois intervalos de índice: eventos que
+    começam dentro da janela (company_id, start_at) e eventos que começaram
+    antes mas terminam depois do início dela (company_id, end_at). Nenhum
+    dos dois lados percorre o histórico inteiro da empresa. Séries
+    recorrentes ficam de fora; veja occurrences_in_window.
+    """
+    starts_inside = Event.query.filter(
+        Event.company_id == company_id,
+        Event.recurrence_freq.is_(None),
+        Event.start_at >= start,
+        Event.start_at < end
+    )
+    spans_into = Event.query.filter(
+        Event.company_id == company_id,
+        Event.recurrence_freq.is_(None),
+        Event.end_at > start,
+        Event.start_at < start
+    )
+    return starts_inside.union(spans_into).order_by(Event.start_at).all()
+
+
+def occurrences_in_window(company_id, start, end):
+    """Lista (evento, início, fim) da janela, com as séries já expandidas.
+
+    Só as séries que começaram antes do fim da janela são carregadas (índice
+    company_id, recurrence_freq, start_at); as ocorrências são geradas apenas
+    para esta janela, e séries já encerradas saem da expansão sem iterar.
+    """
+    items = [(event, event.start_at, event.end_at) for event in events_in_window(company_id, start, end)]
+
+    series = Event.query.filter(
+        Event.company_id == company_id,
+        Event.recurrence_freq.isnot(None),
+        Event.start_at < end
+    ).all()
+    for event in series:
+        items.extend((event, occ_start, occ_end) for occ_start, occ_end in series_occurrences(event, start, end))
+
+    items.sort(key=lambda item: item[1])
+    return items
+
+
+# ---------------------------------------------------------------------------
+# Conflitos e disponibilidade
+# ---------------------------------------------------------------------------
+
+def busy_intervals(company_id, start, end, responsavel_ids=(), setor_ids=()):
+    """Ocupação (início, fim, evento) dos responsáveis/setores em [start, end).
+
+    Eventos únicos vêm da consulta de sobreposição nos índices
+    (responsavel_id, start_at, end_at) e (setor_id, start_at, end_at);
+    séries são expandidas só dentro da janela. Eventos sem fim não ocupam
+    a agenda.
+    """
+    resources = []
+    if responsavel_ids:
+        resources.append(Event.responsavel_id.in_(responsavel_ids))
+    if setor_ids:
+        resources.append(Event.setor_id.in_(setor_ids))
+    if not resources:
+        return []
+
+    base = Event.query.filter(
+        Event.company_id == company_id,
+        db.or_(*resources),
+        Event.start_at < end,
+        Event.end_at.isnot(None)
+    )
+    busy = [
+        (event.start_at, event.end_at, event)
+        for event in base.filter(Event.recurrence_freq.is_(None), Event.end_at > start)
+    ]
+    for event in base.filter(Event.recurrence_freq.isnot(None)):
+        busy.extend(
+            (occ_start, occ_end, event)
+            for occ_start, occ_end in series_occurrences(event, start, end)
+            if occ_end > start
+        )
+    return busy
+
+
+def proposed_intervals(start_at, end_at, recurrence=None):
+    """Intervalos que um evento proposto ocupará (séries limitadas a CONFLICT_SERIES_HORIZON)"""
+    if not end_at or end_at <= start_at:
+        return []
+    if not recurrence or not recurrence.get('recurrence_freq'):
+        return [(start_at, end_at)]
+    return list(expand_occurrences(
+        start_at, end_at, recurrence['recurrence_freq'], recurrence.get('recurrence_interval') or 1,
+        recurrence.get('recurrence_until'), recurrence.get('recurrence_count'),
+        _parse_exdates(recurrence.get('recurrence_exdates')),
+        start_at, start_at + CONFLICT_SERIES_HORIZON
+    ))
+
+
+def conflict_item(data, exclude_id=None):
+    """Converte um payload de evento da API no item usado por find_conflicts (ValueError se inválido)"""
+    try:
+        start_at = parse_datetime(data['start_at'])
+        end_at = parse_datetime(data['end_at']) if data.get('end_at') else None
+        responsavel_id = int(data['responsavel_id']) if data.get('responsavel_id') else None
+        setor_id = int(data['setor_id']) if data.get('setor_id') else None
+    except (KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError('start_at/end_at devem ser datas ISO 8601 e responsavel_id/setor_id, ids')
+    recurrence = parse_recurrence(data['recurrence']) if data.get('recurrence') else None
+    return {
+        'intervals': proposed_intervals(start_at, end_at, recurrence),
+        'responsavel_id': responsavel_id,
+        'setor_id': setor_id,
+        'exclude_id': exclude_id or data.get('exclude_id'),
+    }
+
+
+def find_conflicts(company_id, items):
+    """Conflitos de cada item proposto com a agenda atual.
+
+    items: dicts com 'intervals' [(início, fim)], 'responsavel_id',
+    'setor_id' e opcionalmente 'exclude_id' (o próprio evento numa edição).
+    Uma única consulta cobre o lote inteiro; cada recurso ganha uma árvore
+    de intervalos e os itens são verificados contra ela. Devolve, por
+    item, a lista de dicts serializados (com 'conflict_on').
+    """
+    intervals = [interval for item in items for interval in item['intervals']]
+    if not intervals:
+        return [[] for _ in items]
+
+    responsavel_ids = {item['responsavel_id'] for item in items if item.get('responsavel_id')}
+    setor_ids = {item['setor_id'] for item in items if item.get('setor_id')}
+    busy = busy_intervals(
+        company_id,
+        min(start for start, _ in intervals),
+        max(end for _, end in intervals),
+        responsavel_ids, setor_ids
+    )
+
+    trees = {}
+    for field, ids in (('responsavel', responsavel_ids), ('setor', setor_ids)):
+        for resource_id in ids:
+            trees[(field, resource_id)] = IntervalTree(
+                entry for entry in busy if getattr(entry[2], f"{field}_id") == resource_id
+            )
+
+    results = []
+    for item in items:
+        found = {}
+        for field in ('responsavel', 'setor'):
+            tree = trees.get((field, item.get(f"{field}_id")))
+            if tree is None:
+                continue
+            for start, end in item['intervals']:
+                for occ_start, occ_end, event in tree.overlapping(start, end):
+                    if event.id == item.get('exclude_id'):
+                        continue
+                    key = (event.id, occ_start)
+                    if key not in found:
+                        found[key] = serialize_occurrence(event, occ_start, occ_end)
+                        found[key]['conflict_on'] = []
+                    if field not in found[key]['conflict_on']:
+                        found[key]['conflict_on'].append(field)
+        results.append(sorted(found.values(), key=lambda conflict: conflict['start']))
+    return results
+
+
+def first_free_slot(busy, duration, after, until, day_start=None, day_end=None):
+    """Primeiro início >= after em que [início, início + duration) não colide com busy.
+
+    busy é uma IntervalTree com a ocupação somada de todos os envolvidos.
+    day_start/day_end (timedelta desde a meia-noite) restringem o horário
+    do dia. Cada passo salta para o fim do maior conflito ou para o dia
+    seguinte, então o custo é proporcional aos compromissos na janela.
+    """
+    candidate = after
+    while candidate + duration <= until:
+        if day_start is not None:
+            midnight = datetime.combine(candidate.date(), datetime.min.time())
+            if candidate < midnight + day_start:
+                candidate = midnight + day_start
+            if candidate + duration > midnight + day_end:
+                candidate = midnight + timedelta(days=1) + day_start
+                continue
+            if candidate + duration > until:
+                break
+
+        conflicts = busy.overlapping(candidate, candidate + duration)
+        if not conflicts:
+            return candidate
+        candidate = max(end for _, end, _ in conflicts)
+    return None
+
+
+
+def free_busy(company_id, responsavel_ids, start, end, duration=None, day_start=None, day_end=None,
+              tz_offset=timedelta(0)):
+    """Blocos ocupados de cada responsável em [start, end) e, com duration, o primeiro horário livre comum.
+
+    day_start/day_end são horários locais (tz_offset em relação a UTC);
+    a busca do horário livre roda no fuso local e o resultado volta em UTC.
+    """
+    busy = busy_intervals(company_id, start, end, responsavel_ids=responsavel_ids)
+
+    result = {
+        'busy': {
+            responsavel_id: [
+                {'start': block_start.isoformat(), 'end': block_end.isoformat()}
+                for block_start, block_end in merge_intervals(
+                    (max(occ_start, start), min(occ_end, end))
+                    for occ_start, occ_end, event in busy if event.responsavel_id == responsavel_id
+                )
+            ]
+            for responsavel_id in responsavel_ids
+        }
+    }
+
+    if duration is not None:
+        local = IntervalTree((occ_start + tz_offset, occ_end + tz_offset, event) for occ_start, occ_end, event in busy)
+        slot = first_free_slot(local, duration, start + tz_offset, end + tz_offset, day_start, day_end)
+        result['first_free_slot'] = {
+            'start': (slot - tz_offset).isoformat(),
+            'end': (slot - tz_offset + duration).isoformat()
+        } if slot else None
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Feeds iCalendar
+# ---------------------------------------------------------------------------
+
+def touch_calendar(company_id):
+    """Marca a agenda da empresa como alterada (invalida os feeds .ics em cache)"""
+    db.session.execute(
+        update(Company)
+        .where(Company.id == company_id)
+        .values(calendar_version=Company.calendar_version + 1, calendar_updated_at=datetime.utcnow())
+    )
+
+
+def _feed_serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='calendar-feed')
+
+
+def feed_token(company_id, scope='company', scope_id=None):
+    """Token assinado que identifica um feed (a URL funciona sem login, como exigem os clientes de calendário)"""
+    return _feed_serializer().dumps([company_id, scope, scope_id])
+
+
+def read_feed_token(token):
+    """(company_id, scope, scope_id) do token ou None se for inválido"""
+    try:
+        company_id, scope, scope_id = _feed_serializer().loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None
+    if scope not in FEED_SCOPES:
+        return None
+    return company_id, scope, scope_id
+
+
+def feed_state(company_id):
+    """(versão, última alteração) da agenda da empresa; None se a empresa não existe"""
+    return db.session.query(Company.calendar_version, Company.calendar_updated_at).filter(
+        Company.id == company_id
+    ).first()
+
+
+def feed_etag(company_id, scope, scope_id, version):
+    return f"cal-{company_id}-{scope}-{scope_id or 0}-{version}"
+
+
+def _ics_escape(value):
+    return (value or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _ics_datetime(value):
+    # datas são gravadas em UTC sem fuso
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+
+def _ics_fold(line):
+    # linhas de no máximo 75 octetos; continuações começam com espaço (RFC 5545, 3.1)
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    parts, limit = [], 75
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:
+            cut -= 1  # não parte caracteres multibyte
+        parts.append(data[:cut].decode('utf-8'))
+        data, limit = data[cut:], 74
+    return '\r\n '.join(parts)
+
+
+def _ics_rrule(event):
+    rule = f"FREQ={event.recurrence_freq.upper()};INTERVAL={event.recurrence_interval or 1}"
+    # RFC 5545 não aceita UNTIL e COUNT juntos; UNTIL prevalece
+    if event.recurrence_until:
+        rule += f";UNTIL={_ics_datetime(event.recurrence_until)}"
+    elif event.recurrence_count:
+        rule += f";COUNT={event.recurrence_count}"
+    return rule
+
+
+def _ics_event(event):
+    description = event.description or ''
+    if event.responsavel:
+        description += f"\nResponsável: {event.responsavel.name}"
+    if event.setor:
+        description += f"\nSetor: {event.setor.name}"
+
+    lines = [
+        'BEGIN:VEVENT',
+        f"UID:event-{event.id}@organiums",
+        f"DTSTAMP:{_ics_datetime(event.updated_at or event.created_at or event.start_at)}",
+        f"DTSTART:{_ics_datetime(event.start_at)}",
+    ]
+    if event.end_at:
+        lines.append(f"DTEND:{_ics_datetime(event.end_at)}")
+    lines.append(f"SUMMARY:{_ics_escape(event.title)}")
+    if description.strip():
+        lines.append(f"DESCRIPTION:{_ics_escape(description.strip())}")
+    if event.setor:
+        lines.append(f"CATEGORIES:{_ics_escape(event.setor.name)}")
+    if event.recurrence_freq:
+        lines.append(f"RRULE:{_ics_rrule(event)}")
+        for day in sorted(event_exdates(event)):
+            lines.append(f"EXDATE:{_ics_datetime(datetime.combine(day, event.start_at.time()))}")
+    lines.append('END:VEVENT')
+    return lines
+
+
+def build_feed(company_id, scope='company', scope_id=None):
+    """Corpo .ics do feed: eventos recentes/futuros e séries como RRULE (sem expandir)"""
+    since = datetime.utcnow() - FEED_PAST_WINDOW
+    query = Event.query.options(
+        joinedload(Event.responsavel), joinedload(Event.setor)
+    ).filter(
+        Event.company_id == company_id,
+        Event.start_at.isnot(None),
+        db.or_(
+            Event.start_at >= since,
+            Event.end_at >= since,
+            Event.recurrence_freq.isnot(None)
+        )
+    )
+    if scope == 'setor':
+        query = query.filter(Event.setor_id == scope_id)
+    elif scope == 'responsavel':
+        query = query.filter(Event.responsavel_id == scope_id)
+
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Organiums//Agenda Institucional//PT-BR',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+    ]
+    for event in query.order_by(Event.start_at, Event.id):
+        lines.extend(_ics_event(event))
+    lines.append('END:VCALENDAR')
+    return '\r\n'.join(_ics_fold(line) for line in lines) + '\r\n'
+
+
+def cached_feed(company_id, scope, scope_id, version):
+    """Corpo do feed para a versão atual da agenda, gerado no máximo uma vez por versão.
+
+    A versão faz parte da chave, então touch_calendar invalida o cache em
+    todos os processos sem coordenação; entradas antigas saem pelo LRU.
+    """
+    key = (company_id, scope, scope_id, version)
+    with _feed_cache_lock:
+        body = _feed_cache.get(key)
+        if body is not None:
+            _feed_cache.move_to_end(key)
+            return body
+
+    body = build_feed(company_id, scope, scope_id)
+    with _feed_cache_lock:
+        _feed_cache[key] = body
+        while len(_feed_cache) > FEED_CACHE_SIZE:
+            _feed_cache.popitem(last=False)
+    return body
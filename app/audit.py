@@ -0,0 +1,152 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+# colocado na fila por shutdown() para acordar a thread que espera registros
+_WAKE = object()
+
+
+class AuditLogWriter:
+    """Grava os registros de auditoria (Log) em lote, fora da thread da requisição.
+
+    Os registros entram numa fila limitada em memória e uma thread de fundo
+    faz INSERTs de várias linhas quando o lote enche, quando o intervalo
+    expira ou quando o processo é encerrado. A escrita usa uma conexão
+    própria do engine, então nunca comita o que estiver pendente na
+    db.session da requisição.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._atexit_registered = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('AUDIT_LOG_ASYNC', True)
+        app.config.setdefault('AUDIT_LOG_QUEUE_SIZE', 10000)
+        app.config.setdefault('AUDIT_LOG_BATCH_SIZE', 200)
+        app.config.setdefault('AUDIT_LOG_FLUSH_INTERVAL', 1.0)  # segundos
+
+        if self.app is not None:
+            # outro create_app no mesmo processo (testes, scripts): a fila atual
+            # pertence ao app anterior e é gravada nele antes da troca
+            self.shutdown()
+        self.app = app
+        self._queue = queue.Queue(maxsize=app.config['AUDIT_LOG_QUEUE_SIZE'])
+        app.extensions['audit_log'] = self
+        if not self._atexit_registered:
+            atexit.register(self.shutdown)
+            self._atexit_registered = True
+
+    # API pública
+
+    def record(self, action, user_id=None, ip_address=None, status="ok"):
+        """Enfileira um registro de auditoria (ou grava na hora se o modo assíncrono estiver desligado)"""
+        row = {
+            'user_id': user_id,
+            'action': action,
+            'ip_address': ip_address,
+            'status': status,
+            'created_at': datetime.utcnow(),
+        }
+
+        if not self.app.config['AUDIT_LOG_ASYNC']:
+            self._write([row])
+            return
+
+        self._ensure_worker()
+        try:
+            self._queue.put(row, timeout=0.5)
+        except queue.Full:
+            # fila cheia: aplica backpressure gravando direto, sem perder o registro
+            self._write([row])
+
+    def flush(self):
+        """Grava imediatamente tudo o que está na fila"""
+        batch = self._drain(self.app, self._queue, block=False)
+        while batch:
+            self._write(batch)
+            batch = self._drain(self.app, self._queue, block=False)
+
+    def shutdown(self):
+        """Para a thread de fundo e descarrega a fila"""
+        self._stop.set()
+        if self._queue is not None:
+            try:
+                self._queue.put_nowait(_WAKE)
+            except queue.Full:
+                pass  # fila cheia: a thread não está parada esperando
+        thread = self._thread
+        if thread is not None and thread.is_alive() and self._pid == os.getpid():
+            thread.join(timeout=5)
+        self.flush()
+
+    # internos
+
+    def _ensure_worker(self):
+        # a thread não sobrevive a fork (gunicorn, etc.), então é criada por processo
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            # app, fila e sinal de parada são fixados na thread: se init_app trocar
+            # o app, uma thread antiga ainda em espera grava no banco do app dela
+            self._stop = threading.Event()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, args=(self.app, self._queue, self._stop),
+                                            name='audit-log-writer', daemon=True)
+            self._thread.start()
+
+    def _run(self, app, pending, stop):
+        while not stop.is_set():
+            batch = self._drain(app, pending, block=True)
+            if batch:
+                self._write(batch, app)
+
+    def _drain(self, app, pending, block):
+        batch_size = app.config['AUDIT_LOG_BATCH_SIZE']
+        interval = app.config['AUDIT_LOG_FLUSH_INTERVAL']
+        batch = []
+        try:
+            if not block:
+                while len(batch) < batch_size:
+                    row = pending.get_nowait()
+                    if row is not _WAKE:
+                        batch.append(row)
+                return batch
+
+            # espera o primeiro registro e junta os seguintes até encher o lote,
+            # até o intervalo expirar ou até shutdown() acordar a thread
+            row = pending.get(timeout=interval)
+            deadline = time.monotonic() + interval
+            while row is not _WAKE:
+                batch.append(row)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= batch_size or remaining <= 0:
+                    break
+                row = pending.get(timeout=remaining)
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write(self, rows, app=None):
+        from manage import db
+        from models import Log
+
+        app = app or self.app
+        try:
+            with app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(Log.__table__.insert(), rows)
+        except Exception:
+            app.logger.exception("Falha ao gravar %d registro(s) de auditoria", len(rows))
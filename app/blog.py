@@ -0,0 +1,161 @@
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from flask import url_for
+from sqlalchemy import DDL, event, exists, update
+from sqlalchemy.orm import defer, joinedload
+
+from models import BlogPost, BlogState
+from manage import db
+
+BLOG_PAGE_SIZE = 10
+MAX_BLOG_PAGE_SIZE = 50
+RSS_ITEMS = 20
+# o protocolo de sitemap aceita até 50 mil URLs por arquivo
+SITEMAP_MAX_POSTS = 49000
+FEED_CACHE_SIZE = 16
+# id da linha única de blog_state
+BLOG_STATE_ID = 1
+
+# páginas públicas fixas que entram no sitemap
+SITEMAP_PAGES = ('app_bp.home', 'app_bp.about', 'app_bp.empresas', 'app_bp.planos', 'app_bp.faq',
+                 'app_bp.privacidade', 'app_bp.blog')
+
+_feed_cache = OrderedDict()
+_feed_cache_lock = threading.Lock()
+
+# bancos criados com db.create_all() (sem as migrações) também ganham a linha
+event.listen(BlogState.__table__, 'after_create',
+             DDL(f"INSERT INTO blog_state (id, version) VALUES ({BLOG_STATE_ID}, 0)"))
+
+
+def blog_page_size(value):
+    return min(max(value or BLOG_PAGE_SIZE, 1), MAX_BLOG_PAGE_SIZE)
+
+
+def load_posts_page(limit=BLOG_PAGE_SIZE, after=None):
+    """Posts do mais novo para o mais antigo, paginados por cursor (criado_em, id).
+
+    O autor vem no mesmo SELECT e o conteúdo (bruto e compilado) não sai do
+    banco: a listagem só mostra título, resumo e autor. A ordem segue o
+    índice ix_blog_post_criado_em. Devolve (posts, cursor da próxima página ou None).
+    """
+    query = BlogPost.query.options(
+        defer(BlogPost.conteudo), defer(BlogPost.conteudo_html), joinedload(BlogPost.autor)
+    )
+    if after is not None:
+        after_criado_em, after_id = after
+        query = query.filter(db.or_(
+            BlogPost.criado_em < after_criado_em,
+            db.and_(BlogPost.criado_em == after_criado_em, BlogPost.id < after_id)
+        ))
+
+    posts = query.order_by(BlogPost.criado_em.desc(), BlogPost.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = {'after_criado_em': posts[-1].criado_em.isoformat(), 'after_id': posts[-1].id}
+    return posts, next_cursor
+
+
+def touch_blog(author_ids=None):
+    """Marca o blog como alterado (invalida sitemap e RSS em cache); o commit fica com quem chama.
+
+    Com author_ids só conta se algum desses usuários tiver posts: renomear
+    um autor muda o dc:creator do RSS, renomear os demais não muda nada.
+    """
+    statement = (update(BlogState)
+                 .where(BlogState.id == BLOG_STATE_ID)
+                 .values(version=BlogState.version + 1, updated_at=datetime.utcnow()))
+    if author_ids is not None:
+        statement = statement.where(exists().where(BlogPost.autor_id.in_(author_ids)))
+    db.session.execute(statement)
+
+
+def blog_state():
+    """(versão, última alteração) do blog, como feed_state da agenda (ver touch_blog)"""
+    return tuple(db.session.query(BlogState.version, BlogState.updated_at).filter(
+        BlogState.id == BLOG_STATE_ID
+    ).one())
+
+
+def cached_blog_feed(kind, build):
+    """Corpo do feed (sitemap ou rss) para o estado atual do blog, gerado no máximo uma vez por estado.
+
+    A versão do blog faz parte da chave, então qualquer alteração registrada
+    com touch_blog invalida o cache em todos os processos sem coordenação;
+    entradas antigas saem pelo LRU. As URLs são absolutas, por isso o host
+    também entra na chave.
+    """
+    key = (kind, url_for('app_bp.home', _external=True), blog_state())
+    with _feed_cache_lock:
+        body = _feed_cache.get(key)
+        if body is not None:
+            _feed_cache.move_to_end(key)
+            return body
+
+    body = build()
+    with _feed_cache_lock:
+        _feed_cache[key] = body
+        while len(_feed_cache) > FEED_CACHE_SIZE:
+            _feed_cache.popitem(last=False)
+    return body
+
+
+def _w3c_datetime(value):
+    # datas são gravadas em UTC sem fuso
+    return value.replace(microsecond=0).isoformat() + '+00:00'
+
+
+def build_sitemap():
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for endpoint in SITEMAP_PAGES:
+        lines.append(f"<url><loc>{escape(url_for(endpoint, _external=True))}</loc></url>")
+
+    rows = db.session.query(BlogPost.slug, BlogPost.atualizado_em).order_by(
+        BlogPost.criado_em.desc(), BlogPost.id.desc()
+    ).limit(SITEMAP_MAX_POSTS)
+    for slug, atualizado_em in rows:
+        loc = escape(url_for('app_bp.blog_post', slug=slug, _external=True))
+        lastmod = f"<lastmod>{_w3c_datetime(atualizado_em)}</lastmod>" if atualizado_em else ''
+        lines.append(f"<url><loc>{loc}</loc>{lastmod}</url>")
+    lines.append('</urlset>')
+    return '\n'.join(lines) + '\n'
+
+
+def build_rss():
+    posts, _ = load_posts_page(limit=RSS_ITEMS)
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<rss version="2.0" xmlns:atom="http://www.w3.org/2005/Atom" xmlns:dc="http://purl.org/dc/elements/1.1/">',
+        '<channel>',
+        '<title>Blog Organiums</title>',
+        f"<link>{escape(url_for('app_bp.blog', _external=True))}</link>",
+        f"<atom:link href=\"{escape(url_for('app_bp.blog_rss', _external=True))}\" rel=\"self\" type=\"application/rss+xml\"/>",
+        '<description>Artigos, novidades e dicas para organização pessoal e profissional.</description>',
+        '<language>pt-br</language>',
+    ]
+    if posts and posts[0].criado_em:
+        lines.append(f"<lastBuildDate>{format_datetime(posts[0].criado_em.replace(tzinfo=timezone.utc))}</lastBuildDate>")
+    for post in posts:
+        link = escape(url_for('app_bp.blog_post', slug=post.slug, _external=True))
+        lines.append('<item>')
+        lines.append(f"<title>{escape(post.titulo)}</title>")
+        lines.append(f"<link>{link}</link>")
+        lines.append(f"<guid isPermaLink=\"true\">{link}</guid>")
+        if post.resumo or post.excerpt:
+            lines.append(f"<description>{escape(post.resumo or post.excerpt)}</description>")
+        if post.autor is not None:
+            lines.append(f"<dc:creator>{escape(post.autor.name)}</dc:creator>")
+        if post.criado_em:
+            lines.append(f"<pubDate>{format_datetime(post.criado_em.replace(tzinfo=timezone.utc))}</pubDate>")
+        lines.append('</item>')
+    lines += ['</channel>', '</rss>']
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,207 @@
+import hashlib
+import json
+import re
+import unicodedata
+from html import escape
+from html.parser import HTMLParser
+
+import click
+
+from models import BlogPost
+from manage import db
+from app.blog_search import blog_cli
+from app.blog import touch_blog
+
+# incrementar quando a saída do render mudar: os posts são recompilados na próxima leitura
+RENDERER_VERSION = 1
+EXCERPT_LENGTH = 280
+
+ALLOWED_TAGS = {
+    'p', 'br', 'hr', 'strong', 'b', 'em', 'i', 'u', 's', 'sub', 'sup', 'span', 'div', 'a', 'img',
+    'ul', 'ol', 'li', 'blockquote', 'code', 'pre', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td', 'figure', 'figcaption',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+# conteúdo descartado junto com a tag
+DROP_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'template', 'noscript'}
+ALLOWED_ATTRS = {
+    'a': {'href', 'title', 'target'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+URL_ATTRS = {'href', 'src'}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto'}
+# títulos que entram no sumário (e ganham id para âncora)
+TOC_LEVELS = {'h2', 'h3'}
+
+
+def _safe_url(value):
+    value = (value or '').strip()
+    scheme = re.match(r'^([a-zA-Z][a-zA-Z0-9+.-]*):', re.sub(r'[\x00-\x20]', '', value))
+    return value if scheme is None or scheme.group(1).lower() in ALLOWED_SCHEMES else None
+
+
+def _slugify(value):
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode()
+    return re.sub(r'[^a-z0-9]+', '-', value.lower()).strip('-') or 'secao'
+
+
+class _Renderer(HTMLParser):
+    """Uma passada pelo HTML: saída sanitizada (lista de permissões), texto e títulos"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.text = []
+        self.headings = []
+        self._open = []
+        self._dropping = 0
+        self._heading = None  # (nível, posição da tag de abertura em out, partes do texto)
+        self._ids = set()
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_TAGS:
+            self._dropping += 1
+            return
+        if self._dropping or tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRS.get(tag, set())
+        rendered = []
+        for name, value in attrs:
+            if name not in allowed:
+                continue
+            if name in URL_ATTRS:
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            rendered.append(f' {name}="{escape(value or "", quote=True)}"')
+        if tag == 'a' and dict(attrs).get('target') == '_blank':
+            rendered.append(' rel="noopener noreferrer"')
+
+        if tag in TOC_LEVELS and self._heading is None:
+            self._heading = (tag, len(self.out), [])
+        self.out.append(f"<{tag}{''.join(rendered)}>")
+        if tag in VOID_TAGS:
+            if tag == 'br':
+                self.text.append(' ')
+        else:
+            self._open.append(tag)
+        if tag in ('p', 'div', 'li', 'tr', 'blockquote', 'pre') or tag.startswith('h'):
+            self.text.append(' ')
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and not self._dropping and tag in ALLOWED_TAGS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_TAGS:
+            if self._dropping:
+                self._dropping -= 1
+            return
+        if self._dropping or tag not in self._open:
+            return
+        # fecha o que ficou aberto dentro desta tag (HTML mal formado)
+        while self._open:
+            current = self._open.pop()
+            self.out.append(f"</{current}>")
+            if current == tag:
+                break
+        if self._heading is not None and self._heading[0] == tag:
+            self._close_heading()
+        self.text.append(' ')
+
+    def handle_data(self, data):
+        if self._dropping:
+            return
+        self.out.append(escape(data, quote=False))
+        self.text.append(data)
+        if self._heading is not None:
+            self._heading[2].append(data)
+
+    def _close_heading(self):
+        tag, position, parts = self._heading
+        self._heading = None
+        text = re.sub(r'\s+', ' ', ''.join(parts)).strip()
+        if not text:
+            return
+        anchor = base = _slugify(text)
+        counter = 2
+        while anchor in self._ids:
+            anchor = f"{base}-{counter}"
+            counter += 1
+        self._ids.add(anchor)
+        self.out[position] = self.out[position].replace(f"<{tag}", f'<{tag} id="{anchor}"', 1)
+        self.headings.append({'level': int(tag[1]), 'id': anchor, 'text': text})
+
+    def result(self):
+        self.close()
+        while self._open:
+            self.out.append(f"</{self._open.pop()}>")
+        return ''.join(self.out), re.sub(r'\s+', ' ', ''.join(self.text)).strip()
+
+
+def content_hash(conteudo):
+    return hashlib.sha256((conteudo or '').encode('utf-8')).hexdigest()
+
+
+def render_content(conteudo):
+    """HTML sanitizado, resumo em texto, contagem de palavras e títulos do conteúdo"""
+    renderer = _Renderer()
+    renderer.feed(conteudo or '')
+    html, text = renderer.result()
+    excerpt = text
+    if len(excerpt) > EXCERPT_LENGTH:
+        excerpt = excerpt[:EXCERPT_LENGTH].rsplit(' ', 1)[0].rstrip(' ,.;:') + '…'
+    return {
+        'html': html,
+        'excerpt': excerpt,
+        'word_count': len(text.split()),
+        'headings': renderer.headings,
+    }
+
+
+def compile_post(post, force=False, keep_timestamp=False):
+    """Grava o render do post se o conteúdo ou o renderer mudaram; devolve True se recompilou.
+
+    keep_timestamp mantém atualizado_em (recompilação sem edição do post:
+    leitura pública, `flask blog render`), que também é a data dos feeds.
+    """
+    digest = content_hash(post.conteudo)
+    if (not force and post.conteudo_html is not None and post.content_hash == digest
+            and post.renderer_version == RENDERER_VERSION):
+        return False
+    rendered = render_content(post.conteudo)
+    post.conteudo_html = rendered['html']
+    post.excerpt = rendered['excerpt']
+    post.word_count = rendered['word_count']
+    post.headings = json.dumps(rendered['headings'], ensure_ascii=False)
+    post.content_hash = digest
+    post.renderer_version = RENDERER_VERSION
+    if post.id is not None:
+        touch_blog()  # o resumo compilado entra no RSS; post novo fica com quem o cria
+        if keep_timestamp:
+            # expressão no SET: o onupdate de atualizado_em não entra no UPDATE
+            post.atualizado_em = BlogPost.atualizado_em
+    return True
+
+
+def needs_compile(post):
+    """Verificação da leitura: não toca em conteudo (coluna adiada nas views públicas)"""
+    return post.conteudo_html is None or post.renderer_version != RENDERER_VERSION
+
+
+@blog_cli.command('render')
+@click.option('--all', 'render_all', is_flag=True, help='Recompila todos os posts, não só os desatualizados')
+def render_command(render_all):
+    """Compila o HTML armazenado dos posts desatualizados (ex.: após mudar RENDERER_VERSION)"""
+    query = BlogPost.query
+    if not render_all:
+        query = query.filter(db.or_(BlogPost.conteudo_html.is_(None), BlogPost.renderer_version != RENDERER_VERSION))
+    count = 0
+    for post in query.order_by(BlogPost.id).all():
+        count += compile_post(post, force=render_all, keep_timestamp=True)
+    db.session.commit()
+    click.echo(f"{count} post(s) compilado(s)")
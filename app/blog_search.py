@@ -0,0 +1,178 @@
+import re
+from html.parser import HTMLParser
+
+import click
+from flask.cli import AppGroup
+from markupsafe import Markup, escape
+from sqlalchemy import DDL, event, text
+
+from models import BlogPost
+from manage import db
+
+blog_cli = AppGroup('blog', help='Manutenção do blog')
+
+SEARCH_PAGE_SIZE = 10
+MAX_SEARCH_TERMS = 10
+# pesos do bm25 por coluna: título > resumo > conteúdo
+RANK_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Índice FTS5 com conteúdo próprio (texto sem HTML), rowid = blog_post.id.
+# A exclusão é feita por trigger, então vale também para DELETEs em lote;
+# inserções e edições passam pelos eventos do ORM abaixo (o texto indexado
+# precisa do HTML já convertido em texto, o que o SQL não faz).
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts USING fts5("
+    "titulo, resumo, conteudo, tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS blog_post_fts_delete AFTER DELETE ON blog_post BEGIN "
+    "DELETE FROM blog_post_fts WHERE rowid = old.id; END",
+]
+
+for statement in FTS_DDL:
+    # bancos criados com db.create_all() (sem as migrações) também ganham o índice
+    event.listen(BlogPost.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+_HIGHLIGHT_START, _HIGHLIGHT_END = '\x02', '\x03'
+
+
+class _TextExtractor(HTMLParser):
+    SKIP = {'script', 'style'}
+    BLOCKS = {'p', 'div', 'br', 'li', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'tr', 'blockquote', 'pre'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP:
+            self._skipping += 1
+        elif tag in self.BLOCKS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP and self._skipping:
+            self._skipping -= 1
+        elif tag in self.BLOCKS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def html_to_text(html):
+    """Texto visível do HTML do post (sem tags, scripts e estilos)"""
+    parser = _TextExtractor()
+    parser.feed(html or '')
+    parser.close()
+    return re.sub(r'\s+', ' ', ''.join(parser.parts)).strip()
+
+
+def fts_enabled(connection):
+    return connection.dialect.name == 'sqlite'
+
+
+def index_post(connection, post):
+    """Grava (ou regrava) o post no índice, na mesma transação da alteração"""
+    if not fts_enabled(connection):
+        return
+    connection.execute(text("DELETE FROM blog_post_fts WHERE rowid = :id"), {'id': post.id})
+    connection.execute(
+        text("INSERT INTO blog_post_fts (rowid, titulo, resumo, conteudo) VALUES (:id, :titulo, :resumo, :conteudo)"),
+        {'id': post.id, 'titulo': post.titulo or '', 'resumo': post.resumo or '', 'conteudo': html_to_text(post.conteudo)}
+    )
+
+
+@event.listens_for(BlogPost, 'after_insert')
+def _index_new_post(mapper, connection, post):
+    index_post(connection, post)
+
+
+@event.listens_for(BlogPost, 'after_update')
+def _sync_post(mapper, connection, post):
+    # só gravar o render compilado (app/blog_render.py) não muda o texto indexado
+    state = db.inspect(post)
+    if any(state.attrs[name].history.has_changes() for name in ('titulo', 'resumo', 'conteudo')):
+        index_post(connection, post)
+
+
+def match_query(terms):
+    """Expressão MATCH segura: cada palavra entre aspas, como prefixo, todas obrigatórias"""
+    words = re.findall(r'\w+', terms or '')[:MAX_SEARCH_TERMS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def _highlighted(value):
+    # o texto vem do banco: escapa tudo e só então troca os marcadores por <mark>
+    return Markup(str(escape(value or '')).replace(_HIGHLIGHT_START, '<mark>').replace(_HIGHLIGHT_END, '</mark>'))
+
+
+def search_posts(terms, page=1, per_page=SEARCH_PAGE_SIZE):
+    """Posts que casam com os termos, do mais relevante ao menos relevante.
+
+    Devolve (resultados, total); cada resultado tem o post, o título com os
+    termos marcados e um trecho do texto em volta da ocorrência. Fora do
+    SQLite cai numa busca por LIKE, sem ranking nem destaque.
+    """
+    page = max(page, 1)
+    query = match_query(terms)
+    if not query:
+        return [], 0
+
+    connection = db.session.connection()
+    if not fts_enabled(connection):
+        return _search_like(terms, page, per_page)
+
+    total = connection.execute(
+        text("SELECT count(*) FROM blog_post_fts WHERE blog_post_fts MATCH :q"), {'q': query}
+    ).scalar()
+    rows = connection.execute(text(
+        "SELECT rowid, "
+        "highlight(blog_post_fts, 0, :start, :end) AS titulo, "
+        "snippet(blog_post_fts, -1, :start, :end, '…', 32) AS trecho "
+        "FROM blog_post_fts WHERE blog_post_fts MATCH :q "
+        f"ORDER BY bm25(blog_post_fts, {', '.join(str(weight) for weight in RANK_WEIGHTS)}) "
+        "LIMIT :limit OFFSET :offset"
+    ), {'q': query, 'start': _HIGHLIGHT_START, 'end': _HIGHLIGHT_END,
+        'limit': per_page, 'offset': (page - 1) * per_page}).all()
+
+    posts = {post.id: post for post in BlogPost.query.filter(BlogPost.id.in_([row.rowid for row in rows]))}
+    results = [
+        {'post': posts[row.rowid], 'titulo': _highlighted(row.titulo), 'trecho': _highlighted(row.trecho)}
+        for row in rows if row.rowid in posts
+    ]
+    return results, total
+
+
+def _search_like(terms, page, per_page):
+    query = BlogPost.query
+    for word in re.findall(r'\w+', terms)[:MAX_SEARCH_TERMS]:
+        pattern = f'%{word}%'
+        query = query.filter(db.or_(BlogPost.titulo.ilike(pattern), BlogPost.resumo.ilike(pattern),
+                                    BlogPost.conteudo.ilike(pattern)))
+    total = query.count()
+    posts = query.order_by(BlogPost.criado_em.desc()).limit(per_page).offset((page - 1) * per_page).all()
+    return [{'post': post, 'titulo': escape(post.titulo), 'trecho': escape(post.resumo or '')} for post in posts], total
+
+
+def rebuild_index(batch_size=500):
+    """Recria o índice a partir de todos os posts; devolve quantos foram indexados"""
+    connection = db.session.connection()
+    if not fts_enabled(connection):
+        return 0
+    for statement in FTS_DDL:
+        connection.execute(text(statement))
+    connection.execute(text("DELETE FROM blog_post_fts"))
+    count = 0
+    for post in BlogPost.query.order_by(BlogPost.id).yield_per(batch_size):
+        index_post(connection, post)
+        count += 1
+    db.session.commit()
+    return count
+
+
+@blog_cli.command('reindex')
+def reindex_command():
+    """Recria o índice de busca do blog com os posts existentes"""
+    count = rebuild_index()
+    click.echo(f"{count} post(s) indexado(s)")
@@ -0,0 +1,291 @@
+import csv
+import io
+import json
+
+from flask import current_app
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
+
+from models import User, Collaborator, Sector
+from manage import db, user_cache, password_hasher
+from app.accounts import EMAIL_RE, generate_random_password
+from app.blog import touch_blog
+from app.usernames import MAX_ALLOCATION_ATTEMPTS, allocate_usernames, allocate_username, username_base, username_taken
+
+# linhas gravadas por transação e teto de linhas por arquivo
+IMPORT_BATCH_SIZE = 500
+MAX_IMPORT_ROWS = 20000
+
+# nomes de coluna aceitos no arquivo -> campo
+COLUMN_ALIASES = {
+    'name': 'name', 'nome': 'name',
+    'email': 'email', 'e-mail': 'email',
+    'role': 'role', 'cargo': 'role', 'funcao': 'role', 'função': 'role',
+    'sector': 'sector', 'setor': 'sector', 'sector_id': 'sector',
+}
+
+
+def _normalize(record):
+    row = {}
+    for key, value in record.items():
+        field = COLUMN_ALIASES.get((key or '').strip().lower())
+        if field and value is not None:
+            row[field] = str(value).strip()
+    return row
+
+
+def read_rows(file_storage):
+    """Gera (linha, dict) do arquivo enviado sem carregá-lo inteiro quando possível.
+
+    Formatos: .csv (cabeçalho na primeira linha), .jsonl/.ndjson (um objeto
+    por linha) e .json (lista de objetos). Lança ValueError para outros.
+    """
+    filename = (file_storage.filename or '').lower()
+    if filename.endswith('.csv'):
+        reader = csv.DictReader(io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig', newline=''))
+        for record in reader:
+            yield reader.line_num, _normalize(record)
+    elif filename.endswith(('.jsonl', '.ndjson')):
+        for line, raw in enumerate(io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig'), start=1):
+            if raw.strip():
+                try:
+                    record = json.loads(raw)
+                except ValueError:
+                    yield line, {'error': 'JSON inválido'}
+                    continue
+                yield line, _normalize(record) if isinstance(record, dict) else {}
+    elif filename.endswith('.json'):
+        records = json.load(io.TextIOWrapper(file_storage.stream, encoding='utf-8-sig'))
+        if isinstance(records, dict):
+            records = records.get('collaborators', [])
+        for line, record in enumerate(records, start=1):
+            yield line, _normalize(record) if isinstance(record, dict) else {}
+    else:
+        raise ValueError('Formato não suportado: envie um arquivo .csv, .json ou .jsonl')
+
+
+class CollaboratorImport:
+    """Importa colaboradores (e os usuários correspondentes) em lote para uma empresa.
+
+    As linhas são validadas à medida que são lidas e agrupadas em lotes.
+    Cada lote resolve e-mails e usernames existentes com consultas por
+    conjunto, calcula os hashes de senha num pool de processos (o lote
+    seguinte é preparado enquanto o anterior é gravado; veja
+    app.accounts.PasswordHasher) e grava tudo numa
+    transação com INSERTs em lote. Se um lote falhar por conflito, suas
+    linhas são regravadas uma a uma com savepoints para o relatório
+    apontar exatamente quais falharam.
+    """
+
+    def __init__(self, company_id, batch_size=None):
+        self.company_id = company_id
+        self.batch_size = batch_size or current_app.config.get('COLLABORATOR_IMPORT_BATCH_SIZE', IMPORT_BATCH_SIZE)
+        self.results = []
+        self._seen_emails = set()
+        self._allocated = set()  # usernames já reservados nesta importação
+        self._sectors = {}
+
+    def run(self, rows):
+        """Processa o iterável (linha, dict) e devolve o relatório"""
+        self._load_sectors()
+        pending = None
+        for batch in self._batches(rows):
+            prepared = self._prepare(batch)
+            if pending is not None:
+                self._write(pending)
+            pending = prepared
+        if pending is not None:
+            self._write(pending)
+        return self.report()
+
+    def report(self):
+        counts = {'created': 0, 'linked': 0, 'skipped': 0, 'error': 0}
+        for result in self.results:
+            counts[result['status']] += 1
+        summary = {
+            'total': len(self.results),
+            'created': counts['created'],
+            'linked': counts['linked'],
+            'skipped': counts['skipped'],
+            'failed': counts['error'],
+        }
+        summary['rows'] = sorted(self.results, key=lambda result: result['line'])
+        return summary
+
+    # -- leitura e validação -------------------------------------------------
+
+    def _load_sectors(self):
+        for sector in Sector.query.filter_by(company_id=self.company_id):
+            self._sectors[str(sector.id)] = sector.id
+            self._sectors[sector.name.strip().lower()] = sector.id
+
+    def _batches(self, rows):
+        batch = []
+        for count, (line, row) in enumerate(rows, start=1):
+            if count > MAX_IMPORT_ROWS:
+                self._result(line, row.get('email'), 'error', error=f'Limite de {MAX_IMPORT_ROWS} linhas por arquivo excedido')
+                break
+            error = self._validate(row)
+            if error:
+                self._result(line, row.get('email'), 'error', error=error)
+                continue
+            batch.append((line, row))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _validate(self, row):
+        if row.get('error'):
+            return row['error']
+        if not row.get('name'):
+            return 'Nome é obrigatório'
+        if len(row['name']) > 200:
+            return 'Nome deve ter no máximo 200 caracteres'
+        if not EMAIL_RE.match(row.get('email', '')) or len(row['email']) > 120:
+            return 'E-mail inválido'
+        if row['email'].lower() in self._seen_emails:
+            return 'E-mail repetido no arquivo'
+        if row.get('sector') and row['sector'].lower() not in self._sectors:
+            return f"Setor não encontrado: {row['sector']}"
+        self._seen_emails.add(row['email'].lower())
+        row['sector_id'] = self._sectors.get(row.get('sector', '').lower())
+        return None
+
+    # -- preparação do lote -----------------------------------------------------
+
+    def _prepare(self, batch):
+        """Resolve colaboradores/usuários existentes e usernames; dispara os hashes"""
+        emails = [row['email'] for _, row in batch]
+        existing_collaborators = {
+            email for (email,) in db.session.query(Collaborator.email).filter(
+                Collaborator.company_id == self.company_id,
+                Collaborator.email.in_(emails)
+            )
+        }
+        existing_users = {
+            user.email: user for user in User.query.filter(User.email.in_(emails))
+        }
+
+        items, new_users = [], []
+        for line, row in batch:
+            if row['email'] in existing_collaborators:
+                self._result(line, row['email'], 'skipped', error='Colaborador já cadastrado')
+                continue
+            user = existing_users.get(row['email'])
+            if user is not None and user.company_id not in (None, self.company_id):
+                self._result(line, row['email'], 'error', error='E-mail pertence a um usuário de outra empresa')
+                continue
+            item = {
+                'line': line, 'row': row, 'new_user': user is None,
+                'user_id': user.id if user else None, 'username': user.username if user else None
+            }
+            if user is None:
+                new_users.append(item)
+            items.append(item)
+
+        bases = [username_base(item['row']['email'], item['row']['name']) for item in new_users]
+        for item, username in zip(new_users, allocate_usernames(bases, self._allocated)):
+            item['username'] = username
+
+        hashes = password_hasher.hash_many(generate_random_password() for _ in new_users)
+        return items, new_users, hashes
+
+    # -- gravação ---------------------------------------------------------------
+
+    def _write(self, prepared):
+        items, new_users, hashes = prepared
+        for item, password_hash in zip(new_users, hashes):
+            item['password_hash'] = password_hash
+        if not items:
+            return
+        try:
+            self._insert(items)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            for item in items:
+                self._insert_one(item)
+            db.session.commit()
+        else:
+            for item in items:
+                self._record(item)
+
+        # só depois do commit: antes dele uma requisição concorrente recarregaria a linha antiga
+        for item in items:
+            if item.get('status') == 'linked':
+                user_cache.invalidate(item['user_id'])
+
+    def _insert_one(self, item):
+        # savepoint por linha; username levado por outro processo é realocado e tentado de novo
+        for attempt in range(MAX_ALLOCATION_ATTEMPTS):
+            item.pop('status', None)
+            if item['new_user']:
+                item['user_id'] = None
+            try:
+                with db.session.begin_nested():
+                    self._insert([item])
+            except IntegrityError:
+                if item['new_user'] and attempt < MAX_ALLOCATION_ATTEMPTS - 1 and username_taken(item['username']):
+                    item['username'] = allocate_username(
+                        username_base(item['row']['email'], item['row']['name']), self._allocated
+                    )
+                    continue
+                item.pop('status', None)
+                self._result(item['line'], item['row']['email'], 'error', error='Conflito ao gravar (e-mail ou username já existe)')
+                return
+            self._record(item)
+            return
+
+    def _insert(self, items):
+        new_users = [item for item in items if item['new_user']]
+        if new_users:
+            user_ids = db.session.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [{
+                    'username': item['username'],
+                    'name': item['row']['name'],
+                    'email': item['row']['email'],
+                    'role': 'cliente',  # role padrão para colaboradores
+                    'company_id': self.company_id,
+                    'password_hash': item['password_hash'],
+                } for item in new_users]
+            ).all()
+            for item, user_id in zip(new_users, user_ids):
+                item['user_id'] = user_id
+                item['status'] = 'created'
+
+        linked = [item for item in items if not item['new_user']]
+        if linked:
+            # como sync_collaborator_to_user: o usuário existente assume o nome e a empresa do colaborador
+            db.session.execute(update(User), [
+                {'id': item['user_id'], 'name': item['row']['name'], 'company_id': self.company_id}
+                for item in linked
+            ])
+            touch_blog(author_ids=[item['user_id'] for item in linked])  # nome do autor no RSS
+            for item in linked:
+                item['status'] = 'linked'
+
+        collaborator_ids = db.session.scalars(
+            insert(Collaborator).returning(Collaborator.id, sort_by_parameter_order=True),
+            [{
+                'company_id': self.company_id,
+                'user_id': item['user_id'],
+                'name': item['row']['name'],
+                'email': item['row']['email'],
+                'role': item['row'].get('role') or None,
+                'sector_id': item['row']['sector_id'],
+            } for item in items]
+        ).all()
+        for item, collaborator_id in zip(items, collaborator_ids):
+            item['collaborator_id'] = collaborator_id
+
+    def _record(self, item):
+        self._result(
+            item['line'], item['row']['email'], item['status'],
+            collaborator_id=item['collaborator_id'], user_id=item['user_id'], username=item['username']
+        )
+
+    def _result(self, line, email, status, **data):
+        self.results.append({'line': line, 'email': email, 'status': status, **data})
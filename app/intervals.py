@@ -0,0 +1,57 @@
+class IntervalTree:
+    """Árvore de intervalos estática para consultas de sobreposição em lote.
+
+    Os intervalos [start, end) ficam ordenados por início num array e a
+    árvore é implícita: cada nó é o meio de uma fatia e guarda o maior fim
+    da sua subárvore. Construção O(n log n); consulta O(log n + k).
+    """
+
+    def __init__(self, intervals=()):
+        self.items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self.starts = [item[0] for item in self.items]
+        self._max_end = [None] * len(self.items)
+        self._build(0, len(self.items))
+
+    def __len__(self):
+        return len(self.items)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        max_end = self.items[mid][1]
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > max_end:
+                max_end = child
+        self._max_end[mid] = max_end
+        return max_end
+
+    def overlapping(self, start, end):
+        """Intervalos (start, end, data) que se sobrepõem a [start, end), em ordem de início"""
+        found = []
+        self._query(0, len(self.items), start, end, found)
+        return found
+
+    def _query(self, lo, hi, start, end, found):
+        if lo >= hi:
+            return
+        mid = (lo + hi) // 2
+        if self._max_end[mid] <= start:
+            return  # nada nesta subárvore termina depois do início procurado
+        self._query(lo, mid, start, end, found)
+        if self.starts[mid] < end:
+            if self.items[mid][1] > start:
+                found.append(self.items[mid])
+            self._query(mid + 1, hi, start, end, found)
+
+
+def merge_intervals(intervals):
+    """Une intervalos (start, end) sobrepostos ou encostados; devolve lista ordenada"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
@@ -0,0 +1,466 @@
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import event, func, select, update
+
+from models import User, Collaborator, Sector, DemandKanban, KanbanCard, KanbanColumn, KanbanTombstone
+from manage import db, pubsub
+from app.pubsub import kanban_channel
+
+# nomes exibidos no front para as colunas padrão
+COLUMN_LABELS = {'Backlog': 'Pendências', 'To Do': 'A Fazer', 'Doing': 'Fazendo', 'Done': 'Concluído'}
+
+# Posições dos cards são ranks fracionários: inserir entre dois cards usa o
+# ponto médio, então mover ou criar um card só grava o próprio card. Quando o
+# intervalo entre vizinhos fica pequeno a coluna é renumerada em segundo plano;
+# se esgotar de vez, a renumeração acontece na hora. Toda escrita de posição
+# chama bump_board_version antes de ler os vizinhos: o UPDATE do quadro pega a
+# trava de escrita, então movimentos, criações e renumerações do mesmo quadro
+# se enfileiram e cada um lê a ordem já gravada pelo anterior.
+POSITION_STEP = 1.0
+REBALANCE_GAP = 1e-4
+MIN_POSITION_GAP = 1e-9
+
+# maior lista aceita por POST /client/kanban/columns/<id>/reorder
+MAX_REORDER_CARDS = 5000
+
+# colunas cujos cards contam como concluídos (fora da fila de prioridade)
+DONE_COLUMNS = ('Done',)
+MAX_PRIORITY_LIMIT = 100
+
+_rebalancing = set()
+_rebalancing_lock = threading.Lock()
+
+
+def serialize_card(card, responsavel_name=None, setor_name=None, criador_name=None):
+    """Converte um card para o formato usado pelo front do kanban"""
+    return {
+        'id': card.id,
+        'title': card.title,
+        'description': card.description,
+        'o_que_fazer': card.o_que_fazer,
+        'onde_fazer': card.onde_fazer,
+        'prazo': card.prazo.isoformat() if card.prazo else None,
+        'gravidade': card.gravidade,
+        'urgencia': card.urgencia,
+        'tendencia': card.tendencia,
+        'gut_score': card.gut_score,
+        'position': card.position,
+        'responsavel': {
+            'id': card.quem_fazer_id,
+            'name': responsavel_name
+        } if card.quem_fazer_id else None,
+        'setor': {
+            'id': card.setor_id,
+            'name': setor_name
+        } if card.setor_id else None,
+        'criador': criador_name,
+        'column_id': card.column_id,
+        'version': card.version,
+        'created_at': card.created_at.isoformat()
+    }
+
+
+def serialize_column(column):
+    """Converte uma coluna (sem os cards) para o formato usado pelo front"""
+    return {
+        'id': column.id,
+        'name': COLUMN_LABELS.get(column.name, column.name),
+        'color': column.color,
+        'position': column.position,
+        'version': column.version
+    }
+
+
+def _board_cards_query(kanban_id):
+    # cards do quadro com os nomes de responsável, setor e criador
+    return (
+        db.session.query(KanbanCard, Collaborator.name, Sector.name, User.name)
+        .join(KanbanColumn, KanbanCard.column_id == KanbanColumn.id)
+        .outerjoin(Collaborator, KanbanCard.quem_fazer_id == Collaborator.id)
+        .outerjoin(Sector, KanbanCard.setor_id == Sector.id)
+        .outerjoin(User, KanbanCard.created_by == User.id)
+        .filter(KanbanColumn.kanban_id == kanban_id)
+    )
+
+
+def load_board_data(kanban):
+    """Monta os dados completos de um quadro em número fixo de consultas.
+
+    Uma consulta traz as colunas e outra traz todos os cards do quadro já
+    com os nomes de responsável, setor e criador (outer joins), agrupados
+    por coluna em Python. O custo não cresce com o número de cards.
+    """
+    columns = KanbanColumn.query.filter_by(kanban_id=kanban.id).order_by(KanbanColumn.position).all()
+
+    rows = _board_cards_query(kanban.id).order_by(KanbanCard.column_id, KanbanCard.position).all()
+
+    cards_by_column = {}
+    for card, responsavel_name, setor_name, criador_name in rows:
+        cards_by_column.setdefault(card.column_id, []).append(
+            serialize_card(card, responsavel_name, setor_name, criador_name)
+        )
+
+    return {
+        'id': kanban.id,
+        'name': kanban.name,
+        'version': kanban.version,
+        'full': True,
+        'columns': [
+            dict(serialize_column(column), cards=cards_by_column.get(column.id, []))
+            for column in columns
+        ]
+    }
+
+
+def load_board_changes(kanban, since):
+    """Devolve só o que mudou no quadro depois da versão since.
+
+    Cards e colunas alterados vêm inteiros; exclusões vêm dos tombstones.
+    Uma versão desconhecida (maior que a atual) devolve o quadro completo.
+    """
+    if since > kanban.version:
+        return load_board_data(kanban)
+
+    changes = {
+        'id': kanban.id,
+        'name': kanban.name,
+        'version': kanban.version,
+        'since': since,
+        'full': False,
+        'columns': [],
+        'cards': [],
+        'deleted': {'columns': [], 'cards': []}
+    }
+    if since == kanban.version:
+        return changes
+
+    columns = (KanbanColumn.query
+               .filter(KanbanColumn.kanban_id == kanban.id, KanbanColumn.version > since)
+               .order_by(KanbanColumn.position).all())
+    changes['columns'] = [serialize_column(column) for column in columns]
+
+    rows = (_board_cards_query(kanban.id)
+            .filter(KanbanCard.version > since)
+            .order_by(KanbanCard.column_id, KanbanCard.position).all())
+    changes['cards'] = [serialize_card(*row) for row in rows]
+
+    tombstones = (db.session.query(KanbanTombstone.entity, KanbanTombstone.entity_id)
+                  .filter(KanbanTombstone.kanban_id == kanban.id, KanbanTombstone.version > since))
+    for entity, entity_id in tombstones:
+        changes['deleted'][f'{entity}s'].append(entity_id)
+
+    return changes
+
+
+# versões do quadro (sincronização incremental)
+
+def bump_board_version(kanban_id):
+    """Incrementa a versão do quadro e devolve o novo valor"""
+    db.session.execute(
+        update(DemandKanban)
+        .where(DemandKanban.id == kanban_id)
+        .values(version=DemandKanban.version + 1)
+    )
+    return db.session.query(DemandKanban.version).filter(DemandKanban.id == kanban_id).scalar()
+
+
+def publish_board_event(kanban_id, event, version, **data):
+    """Avisa os clientes conectados ao quadro (SSE); chamar depois do commit"""
+    data['version'] = version
+    pubsub.publish(kanban_channel(kanban_id), event, data, event_id=version)
+
+
+def record_deletion(kanban_id, entity, entity_id, version):
+    """Registra o tombstone de um card ou coluna excluído"""
+    db.session.add(KanbanTombstone(kanban_id=kanban_id, entity=entity, entity_id=entity_id, version=version))
+
+
+def load_user_boards(user):
+    """Quadros da empresa do usuário contendo só os cards em que ele está envolvido.
+
+    Uma única consulta: os ids dos cards vêm da união de "criados por ele"
+    (índice em kanban_card.created_by) e "atribuídos ao colaborador dele"
+    (índices em collaborator.user_id e kanban_card.quem_fazer_id), e o resto
+    é agrupado em quadro → coluna em Python. O custo acompanha os cards do
+    usuário, não os da empresa.
+    """
+    created = db.session.query(KanbanCard.id).filter(KanbanCard.created_by == user.id)
+    assigned = (db.session.query(KanbanCard.id)
+                .join(Collaborator, KanbanCard.quem_fazer_id == Collaborator.id)
+                .filter(Collaborator.user_id == user.id))
+    card_ids = created.union(assigned)
+
+    responsavel = db.aliased(Collaborator)
+    rows = (
+        db.session.query(KanbanCard, KanbanColumn, DemandKanban, responsavel, Sector, User.name)
+        .join(KanbanColumn, KanbanCard.column_id == KanbanColumn.id)
+        .join(DemandKanban, KanbanColumn.kanban_id == DemandKanban.id)
+        .outerjoin(responsavel, KanbanCard.quem_fazer_id == responsavel.id)
+        .outerjoin(Sector, KanbanCard.setor_id == Sector.id)
+        .outerjoin(User, KanbanCard.created_by == User.id)
+        .filter(KanbanCard.id.in_(card_ids.scalar_subquery()))
+        .filter(DemandKanban.company_id == user.company_id)
+        .order_by(DemandKanban.id, KanbanColumn.position, KanbanCard.position)
+        .all()
+    )
+
+    boards = {}
+    columns = {}
+    for card, column, board, collaborator, setor, criador_name in rows:
+        if board.id not in boards:
+            boards[board.id] = {
+                'id': board.id,
+                'name': board.name,
+                'description': board.description,
+                'columns': []
+            }
+        if column.id not in columns:
+            columns[column.id] = {
+                'id': column.id,
+                'name': column.name,
+                'color': column.color,
+                'position': column.position,
+                'cards': []
+            }
+            boards[board.id]['columns'].append(columns[column.id])
+
+        columns[column.id]['cards'].append({
+            'id': card.id,
+            'title': card.title,
+            'description': card.description,
+            'o_que_fazer': card.o_que_fazer,
+            'onde_fazer': card.onde_fazer,
+            'prazo': card.prazo.isoformat() if card.prazo else None,
+            'gravidade': card.gravidade,
+            'urgencia': card.urgencia,
+            'tendencia': card.tendencia,
+            'position': card.position,
+            'created_by': card.created_by,
+            'created_at': card.created_at.isoformat(),
+            'column_id': column.id,
+            'responsavel': {
+                'id': collaborator.id,
+                'name': collaborator.name,
+                'user_id': collaborator.user_id
+            } if collaborator else None,
+            'setor': {
+                'id': setor.id,
+                'name': setor.name
+            } if setor else None,
+            'criador': {
+                'id': card.created_by,
+                'name': criador_name
+            }
+        })
+
+    return list(boards.values())
+
+
+def load_priority_cards(company_id, sector_id=None, collaborator_id=None, limit=20, after=None):
+    """Cards abertos de maior GUT primeiro, paginados por cursor.
+
+    Percorre os índices (company_id, gut_score, id), (company_id, setor_id,
+    gut_score, id) ou (company_id, quem_fazer_id, gut_score, id) em ordem
+    decrescente e para no limite: só cards da empresa são lidos e nada é
+    ordenado. after é o par (gut_score, id) do último card da página anterior.
+    """
+    query = (
+        _company_cards_query(company_id)
+        .filter(KanbanColumn.name.notin_(DONE_COLUMNS))
+    )
+    if sector_id is not None:
+        query = query.filter(KanbanCard.setor_id == sector_id)
+    if collaborator_id is not None:
+        query = query.filter(KanbanCard.quem_fazer_id == collaborator_id)
+    if after is not None:
+        after_score, after_id = after
+        query = query.filter(db.or_(
+            KanbanCard.gut_score < after_score,
+            db.and_(KanbanCard.gut_score == after_score, KanbanCard.id < after_id)
+        ))
+
+    rows = query.order_by(KanbanCard.gut_score.desc(), KanbanCard.id.desc()).limit(limit + 1).all()
+
+    cards = []
+    for card, responsavel_name, setor_name, criador_name, column_name, board_id, board_name in rows[:limit]:
+        data = serialize_card(card, responsavel_name, setor_name, criador_name)
+        data['column'] = COLUMN_LABELS.get(column_name, column_name)
+        data['kanban'] = {'id': board_id, 'name': board_name}
+        cards.append(data)
+
+    next_cursor = None
+    if len(rows) > limit and cards:
+        next_cursor = {'after_score': cards[-1]['gut_score'], 'after_id': cards[-1]['id']}
+    return cards, next_cursor
+
+
+def _company_cards_query(company_id):
+    # cards de todos os quadros da empresa, com nomes relacionados e dados da coluna/quadro
+    return (
+        db.session.query(KanbanCard, Collaborator.name, Sector.name, User.name,
+                         KanbanColumn.name, DemandKanban.id, DemandKanban.name)
+        .join(KanbanColumn, KanbanCard.column_id == KanbanColumn.id)
+        .join(DemandKanban, KanbanColumn.kanban_id == DemandKanban.id)
+        .outerjoin(Collaborator, KanbanCard.quem_fazer_id == Collaborator.id)
+        .outerjoin(Sector, KanbanCard.setor_id == Sector.id)
+        .outerjoin(User, KanbanCard.created_by == User.id)
+        .filter(KanbanCard.company_id == company_id)
+    )
+
+
+# posições (ranks fracionários)
+
+def position_between(before, after):
+    """Calcula uma posição entre duas posições vizinhas (None = extremidade da coluna)"""
+    if before is None and after is None:
+        return POSITION_STEP
+    if before is None:
+        return after - POSITION_STEP
+    if after is None:
+        return before + POSITION_STEP
+    return (before + after) / 2
+
+
+def next_position(column_id):
+    """Posição para um card inserido no fim da coluna"""
+    last = db.session.query(func.max(KanbanCard.position)).filter(KanbanCard.column_id == column_id).scalar()
+    return position_between(last, None)
+
+
+def position_for_index(column_id, index, exclude_card_id=None):
+    """Posição para um card que deve ficar no índice informado da coluna.
+
+    Busca apenas os dois vizinhos do índice (uma consulta) e devolve o ponto
+    médio entre eles. Chamar depois de bump_board_version na mesma transação.
+    """
+    query = db.session.query(KanbanCard.position).filter(KanbanCard.column_id == column_id)
+    if exclude_card_id is not None:
+        query = query.filter(KanbanCard.id != exclude_card_id)
+    query = query.order_by(KanbanCard.position, KanbanCard.id)
+
+    if index <= 0:
+        before, after = None, query.limit(1).scalar()
+    else:
+        neighbours = [row[0] for row in query.offset(index - 1).limit(2).all()]
+        if not neighbours:
+            return next_position(column_id)
+        before = neighbours[0]
+        after = neighbours[1] if len(neighbours) > 1 else None
+
+    if before is not None and after is not None:
+        gap = after - before
+        if gap < MIN_POSITION_GAP:
+            # sem espaço entre os vizinhos: renumera agora e calcula de novo
+            rebalance_column(column_id)
+            return position_for_index(column_id, index, exclude_card_id)
+        if gap < REBALANCE_GAP:
+            schedule_rebalance(column_id)
+
+    return position_between(before, after)
+
+
+def spaced_positions(count):
+    """Posições igualmente espaçadas para count cards"""
+    return [(i + 1) * POSITION_STEP for i in range(count)]
+
+
+def rebalance_column(column_id):
+    """Renumera as posições de uma coluna com espaçamento uniforme.
+
+    A versão do quadro sobe primeiro (trava de escrita) e a renumeração é um
+    único UPDATE ... FROM com ROW_NUMBER(): a ordem usada é a gravada no
+    momento da escrita, sem janela para um movimento concorrente ser
+    sobrescrito com a posição antiga.
+    """
+    kanban_id = db.session.query(KanbanColumn.kanban_id).filter(KanbanColumn.id == column_id).scalar()
+    if kanban_id is None:
+        return None
+    version = bump_board_version(kanban_id)
+    ranked = select(
+        KanbanCard.id,
+        func.row_number().over(order_by=(KanbanCard.position, KanbanCard.id)).label('rank')
+    ).where(KanbanCard.column_id == column_id).subquery()
+    result = db.session.execute(
+        update(KanbanCard)
+        .where(KanbanCard.id == ranked.c.id)
+        .values(position=ranked.c.rank * POSITION_STEP, version=version),
+        execution_options={'synchronize_session': 'fetch'}
+    )
+    if not result.rowcount:
+        return None
+    return kanban_id, version
+
+
+def schedule_rebalance(column_id):
+    """Agenda a renumeração de uma coluna numa thread de fundo, depois do commit da sessão atual.
+
+    Antes do commit a thread leria a ordem antiga da coluna (o card movido
+    ainda não foi gravado) e disputaria a trava de escrita com a própria
+    requisição; num rollback a renumeração é descartada.
+    """
+    db.session.info.setdefault('kanban_rebalance', set()).add(column_id)
+
+
+def _start_rebalance(app, column_id):
+    with _rebalancing_lock:
+        if column_id in _rebalancing:
+            return
+        _rebalancing.add(column_id)
+
+    def run():
+        try:
+            with app.app_context():
+                result = rebalance_column(column_id)
+                db.session.commit()
+                if result:
+                    kanban_id, version = result
+                    publish_board_event(kanban_id, 'cards.rebalanced', version, column_id=column_id)
+        except Exception:
+            app.logger.exception("Falha ao renumerar a coluna %s do kanban", column_id)
+        finally:
+            with _rebalancing_lock:
+                _rebalancing.discard(column_id)
+
+    threading.Thread(target=run, name=f'kanban-rebalance-{column_id}', daemon=True).start()
+
+
+@event.listens_for(db.session, 'after_commit')
+def _rebalance_after_commit(session):
+    columns = session.info.pop('kanban_rebalance', ())
+    if columns:
+        app = current_app._get_current_object()
+        for column_id in columns:
+            _start_rebalance(app, column_id)
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _discard_rebalance(session):
+    session.info.pop('kanban_rebalance', None)
+
+
+def reorder_column(column, card_order):
+    """Aplica uma nova ordem aos cards de uma coluna em operações em lote.
+
+    Carrega e valida todos os ids numa única consulta e grava todas as
+    posições num único executemany. Devolve a lista de ids que não
+    pertencem à coluna; se houver algum, quem chama desfaz a transação.
+    """
+    if not card_order:
+        return []
+    # a trava do quadro vem antes da validação: nenhum card sai da coluna entre as duas
+    version = bump_board_version(column.kanban_id)
+    valid_ids = {row[0] for row in db.session.query(KanbanCard.id)
+                 .filter(KanbanCard.column_id == column.id, KanbanCard.id.in_(card_order))}
+    invalid_ids = [card_id for card_id in card_order if card_id not in valid_ids]
+    if invalid_ids:
+        return invalid_ids
+
+    now = datetime.utcnow()
+    db.session.execute(
+        update(KanbanCard),
+        [{'id': card_id, 'position': position, 'version': version, 'updated_at': now}
+         for card_id, position in zip(card_order, spaced_positions(len(card_order)))]
+    )
+    return []
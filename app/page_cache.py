@@ -0,0 +1,256 @@
+import atexit
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import request, session
+from flask_login import current_user
+
+
+class PageCache:
+    """Cache de respostas completas das páginas públicas para visitantes anônimos.
+
+    Só GETs anônimos, sem mensagens flash pendentes e com resposta 200 sem
+    cookie entram no cache. A chave é host + caminho + query string + os
+    cabeçalhos em PAGE_CACHE_VARY. A memória é um LRU limitado em bytes
+    (PAGE_CACHE_MAX_BYTES) e, com PAGE_CACHE_DIR, há uma camada em disco
+    compartilhada pelos processos (cada arquivo é uma linha JSON com os
+    cabeçalhos seguida do corpo em bytes: nada do disco é executado ao ser
+    lido, ao contrário de pickle). invalidate() troca a geração do cache:
+    as entradas em memória de todos os processos deixam de valer na próxima
+    leitura (o marcador de geração fica no diretório do cache).
+
+    O acesso continua auditado: anônimos são somados por página num
+    contador e gravados como um Log por intervalo; usuários logados seguem
+    com register_log por acesso.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.ttl = 300
+        self.max_bytes = 32 * 1024 * 1024
+        self.directory = None
+        self.vary = ()
+        self.views = PageViewCounter()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PAGE_CACHE_ENABLED', True)
+        app.config.setdefault('PAGE_CACHE_TTL', 300)  # segundos
+        app.config.setdefault('PAGE_CACHE_MAX_BYTES', 32 * 1024 * 1024)
+        app.config.setdefault('PAGE_CACHE_DIR', None)  # diretório da camada em disco; None desativa
+        app.config.setdefault('PAGE_CACHE_VARY', ())  # cabeçalhos da requisição que entram na chave
+        app.config.setdefault('PAGE_VIEW_FLUSH_INTERVAL', 60)  # segundos
+
+        self.app = app
+        self.ttl = app.config['PAGE_CACHE_TTL']
+        self.max_bytes = app.config['PAGE_CACHE_MAX_BYTES']
+        self.directory = app.config['PAGE_CACHE_DIR']
+        self.vary = tuple(app.config['PAGE_CACHE_VARY'])
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        self.views.init_app(app)
+        app.extensions['page_cache'] = self
+
+    # API pública
+
+    def cached(self, action):
+        """Decorador das views públicas; action é o texto do Log (aceita {kwargs} da rota)"""
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                anonymous = not current_user.is_authenticated
+                self._audit(action.format(**kwargs), anonymous)
+                if not (anonymous and self._cacheable_request()):
+                    return view(*args, **kwargs)
+
+                key = self._key()
+                generation = self._current_generation()
+                entry = self._get(key, generation)
+                if entry is not None:
+                    return self._response(entry, hit=True)
+
+                response = self.app.make_response(view(*args, **kwargs))
+                if response.status_code != 200 or response.headers.get('Set-Cookie') or response.is_streamed:
+                    return response
+                response.add_etag()
+                entry = {
+                    'body': response.get_data(),
+                    'headers': [(k, v) for k, v in response.headers if k.lower() not in ('set-cookie', 'date')],
+                    'expires_at': time.time() + self.ttl,
+                    # geração lida antes de renderizar: uma invalidação no meio descarta esta página
+                    'generation': generation,
+                }
+                self._put(key, entry)
+                return self._response(entry, hit=False)
+            return wrapper
+        return decorator
+
+    def invalidate(self):
+        """Descarta todas as páginas (chamar depois do commit que as altera)"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self._generation += 1
+        if self.directory:
+            marker = os.path.join(self.directory, 'generation')
+            with open(marker, 'w') as handle:
+                handle.write(str(time.time_ns()))
+            for name in os.listdir(self.directory):
+                if name.endswith('.page'):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
+
+    # internos
+
+    def _audit(self, action, anonymous):
+        from app.utils import register_log
+
+        if anonymous:
+            self.views.hit(action)
+        else:
+            register_log(action)
+
+    def _cacheable_request(self):
+        if not self.app.config['PAGE_CACHE_ENABLED'] or request.method not in ('GET', 'HEAD'):
+            return False
+        # flash pendente vai aparecer no HTML desta resposta
+        return not session.get('_flashes')
+
+    def _key(self):
+        parts = [request.host, request.path, request.query_string.decode('latin-1')]
+        parts += [request.headers.get(name, '') for name in self.vary]
+        return hashlib.sha256('\n'.join(parts).encode()).hexdigest()
+
+    def _current_generation(self):
+        # com disco, a geração é a do marcador (comum aos processos); sem disco, a local
+        if not self.directory:
+            return self._generation
+        try:
+            return os.stat(os.path.join(self.directory, 'generation')).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+
+    def _get(self, key, generation):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry['generation'] == generation and entry['expires_at'] > now:
+                    self._entries.move_to_end(key)
+                    return entry
+                self._drop(key)
+        if not self.directory:
+            return None
+
+        path = os.path.join(self.directory, f"{key}.page")
+        try:
+            entry = _read_page(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            return None  # ausente, pela metade ou em formato desconhecido: vale como miss
+        if entry['generation'] != generation or entry['expires_at'] <= now:
+            return None
+        self._remember(key, entry)
+        return entry
+
+    def _put(self, key, entry):
+        self._remember(key, entry)
+        if self.directory:
+            # escrita atômica: outro processo nunca lê um arquivo pela metade
+            path = os.path.join(self.directory, f"{key}.page")
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                _write_page(tmp, entry)
+                os.replace(tmp, path)
+            except OSError:
+                self.app.logger.warning("Falha ao gravar página em cache em %s", path)
+
+    def _remember(self, key, entry):
+        size = len(entry['body'])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_bytes:
+                _, oldest = self._entries.popitem(last=False)
+                self._size -= len(oldest['body'])
+
+    def _drop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry['body'])
+
+    def _response(self, entry, hit):
+        response = self.app.response_class(entry['body'], headers=entry['headers'])
+        response.headers['X-Page-Cache'] = 'HIT' if hit else 'MISS'
+        return response.make_conditional(request)
+
+
+def _write_page(path, entry):
+    meta = {'headers': entry['headers'], 'expires_at': entry['expires_at'], 'generation': entry['generation']}
+    with open(path, 'wb') as handle:
+        handle.write(json.dumps(meta).encode() + b'\n')
+        handle.write(entry['body'])
+
+
+def _read_page(path):
+    with open(path, 'rb') as handle:
+        meta = json.loads(handle.readline())
+        body = handle.read()
+    return {
+        'body': body,
+        'headers': [(str(name), str(value)) for name, value in meta['headers']],
+        'expires_at': float(meta['expires_at']),
+        'generation': int(meta['generation']),
+    }
+
+
+class PageViewCounter:
+    """Soma acessos anônimos por página e grava um Log por página a cada intervalo"""
+
+    def __init__(self):
+        self.app = None
+        self._counts = {}
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.app = app
+        atexit.register(self.flush)
+
+    # ações distintas por intervalo (slugs inexistentes não podem inchar o contador)
+    MAX_ACTIONS = 1000
+
+    def hit(self, action):
+        with self._lock:
+            if action not in self._counts and len(self._counts) >= self.MAX_ACTIONS:
+                action = "Acesso a outras páginas públicas"
+            self._counts[action] = self._counts.get(action, 0) + 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.app.config['PAGE_VIEW_FLUSH_INTERVAL'], self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        from manage import audit_log
+
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for action, count in counts.items():
+            audit_log.record(f"{action} ({count} acesso(s) anônimo(s))"[:255])
@@ -0,0 +1,127 @@
+import json
+import queue
+import threading
+
+from flask import Response
+
+
+class Broker:
+    """Interface mínima de um broker de eventos.
+
+    O LocalBroker atende um único processo; para vários workers basta uma
+    implementação com o mesmo contrato (ex.: Redis pub/sub) configurada em
+    PUBSUB_BROKER.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel):
+        """Devolve um objeto com get(timeout) -> message e close()"""
+        raise NotImplementedError
+
+
+class LocalSubscription:
+    def __init__(self, broker, channel, maxsize):
+        self.broker = broker
+        self.channel = channel
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout=None):
+        """Próxima mensagem do canal ou None se o timeout expirar"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+
+class LocalBroker(Broker):
+    """Broker em memória: cada assinante tem sua própria fila limitada"""
+
+    def __init__(self, queue_size=100):
+        self.queue_size = queue_size
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for sub in subscribers:
+            try:
+                sub.queue.put_nowait(message)
+            except queue.Full:
+                # assinante lento: descarta a mensagem (o cliente ressincroniza ao reconectar)
+                pass
+
+    def subscribe(self, channel):
+        sub = LocalSubscription(self, channel, self.queue_size)
+        with self._lock:
+            self._channels.setdefault(channel, set()).add(sub)
+        return sub
+
+    def _unsubscribe(self, sub):
+        with self._lock:
+            subscribers = self._channels.get(sub.channel)
+            if subscribers is not None:
+                subscribers.discard(sub)
+                if not subscribers:
+                    del self._channels[sub.channel]
+
+
+class PubSub:
+    """Publica eventos de domínio e os entrega como Server-Sent Events"""
+
+    def __init__(self, app=None):
+        self.broker = None
+        self.heartbeat = 15
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('PUBSUB_BROKER', None)  # instância de Broker; None usa o LocalBroker
+        app.config.setdefault('PUBSUB_HEARTBEAT', 15)  # segundos entre comentários de keep-alive
+
+        self.broker = app.config['PUBSUB_BROKER'] or LocalBroker()
+        self.heartbeat = app.config['PUBSUB_HEARTBEAT']
+        app.extensions['pubsub'] = self
+
+    def publish(self, channel, event, data, event_id=None):
+        """Publica um evento no canal (chamar depois do commit)"""
+        self.broker.publish(channel, {'event': event, 'data': data, 'id': event_id})
+
+    def response(self, channel):
+        """Resposta text/event-stream de longa duração para o canal"""
+        return Response(self.stream(channel), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',  # evita buffering em proxies (nginx)
+        })
+
+    def stream(self, channel):
+        """Gerador de texto SSE para o canal; envia ping periódico para manter a conexão"""
+        sub = self.broker.subscribe(channel)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                message = sub.get(timeout=self.heartbeat)
+                if message is None:
+                    yield ": ping\n\n"
+                    continue
+                chunk = ""
+                if message.get('id') is not None:
+                    chunk += f"id: {message['id']}\n"
+                chunk += f"event: {message['event']}\n"
+                chunk += f"data: {json.dumps(message['data'], default=str)}\n\n"
+                yield chunk
+        finally:
+            sub.close()
+
+
+def kanban_channel(kanban_id):
+    return f"kanban:{kanban_id}"
+
+
+def ticket_channel(ticket_id):
+    return f"ticket:{ticket_id}"
@@ -8,6 +8,7 @@ class CalendarManager {
         }));
         this.currentDate = new Date();
         this.currentView = 'month'; // 'month' | 'week' | 'day'
+        this.loadedMonths = new Set(); // meses ('YYYY-MM') já buscados em /api/events
         this.container = document.getElementById('calendar');
         this.currentMonthLabel = document.getElementById('currentMonth');
         this.prevBtn = document.getElementById('prevBtn');
@@ -27,9 +28,13 @@ class CalendarManager {
         this.inputSetor = document.getElementById('eventSetor');
         this.inputColor = document.getElementById('eventColor');
         this.colorValue = document.getElementById('colorValue');
+        this.inputRecurrence = document.getElementById('eventRecurrence');
+        this.inputRecurrenceUntil = document.getElementById('eventRecurrenceUntil');
         this.deleteBtn = document.getElementById('deleteBtn');
 
         this.draggedEventId = null;
+        this.currentRecurrence = null; // regra da série aberta no modal
+        this.currentOccurrence = null; // data (YYYY-MM-DD) da ocorrência aberta no modal
 
         this.init();
     }
@@ -71,7 +76,12 @@ class CalendarManager {
         this.deleteBtn.addEventListener('click', () => {
             const id = this.inputId.value;
             if (!id) return;
-            if (!confirm('Deseja realmente excluir este evento?')) return;
+            if (this.currentOccurrence && confirm('Excluir apenas esta ocorrência?')) {
+                this.deleteEvent(id, this.currentOccurrence);
+                return;
+            }
+            const message = this.currentRecurrence ? 'Deseja realmente excluir todas as ocorrências deste evento?' : 'Deseja realmente excluir este evento?';
+            if (!confirm(message)) return;
             this.deleteEvent(id);
         });
 
@@ -93,6 +103,83 @@ class CalendarManager {
         } else if (this.currentView === 'day') {
             this.renderDay();
         }
+        this.loadVisibleRange();
+    }
+
+    // -----------------------
+    // Carregamento por janela
+    // -----------------------
+    getVisibleRange() {
+        if (this.currentView === 'month') {
+            // a grade do mês inclui dias da semana anterior/seguinte
+            const first = new Date(this.currentDate.getFullYear(), this.currentDate.getMonth(), 1);
+            const start = this.getStartOfWeek(first);
+            const end = new Date(start);
+            end.setDate(start.getDate() + 42);
+            return [start, end];
+        }
+        if (this.currentView === 'week') {
+            const start = this.getStartOfWeek(this.currentDate);
+            const end = new Date(start);
+            end.setDate(start.getDate() + 7);
+            return [start, end];
+        }
+        const start = new Date(this.currentDate.getFullYear(), this.currentDate.getMonth(), this.currentDate.getDate());
+        const end = new Date(start);
+        end.setDate(start.getDate() + 1);
+        return [start, end];
+    }
+
+    /**
+     * Descarta os eventos em memória e recarrega a janela visível
+     * (usado quando uma série recorrente muda, pois suas ocorrências vêm expandidas do servidor)
+     */
+    reloadEvents() {
+        this.events = [];
+        this.loadedMonths.clear();
+        this.render();
+    }
+
+    monthKey(date) {
+        return `${date.getFullYear()}-${String(date.getMonth() + 1).padStart(2, '0')}`;
+    }
+
+    /**
+     * Busca os eventos dos meses visíveis que ainda não estão em cache
+     */
+    async loadVisibleRange() {
+        const [rangeStart, rangeEnd] = this.getVisibleRange();
+        const missing = [];
+        const cursor = new Date(rangeStart.getFullYear(), rangeStart.getMonth(), 1);
+        while (cursor < rangeEnd) {
+            const key = this.monthKey(cursor);
+            if (!this.loadedMonths.has(key)) missing.push(new Date(cursor));
+            cursor.setMonth(cursor.getMonth() + 1);
+        }
+        if (!missing.length) return;
+
+        const keys = missing.map((d) => this.monthKey(d));
+        keys.forEach((key) => this.loadedMonths.add(key));
+
+        const start = missing[0];
+        const end = new Date(missing[missing.length - 1]);
+        end.setMonth(end.getMonth() + 1);
+
+        try {
+            const params = new URLSearchParams({ start: start.toISOString(), end: end.toISOString() });
+            const resp = await fetch(`/api/events?${params}`, { credentials: 'same-origin' });
+            if (!resp.ok) throw new Error('Erro ao carregar eventos');
+            const data = await resp.json();
+
+            const known = new Set(this.events.map((ev) => String(ev.id)));
+            data.events.forEach((ev) => {
+                if (!known.has(String(ev.id))) this.events.push({ ...ev, start: ev.start || null, end: ev.end || null });
+            });
+            this.render();
+        } catch (err) {
+            console.error(err);
+            keys.forEach((key) => this.loadedMonths.delete(key)); // tenta de novo na próxima renderização
+        }
     }
 
     renderMonth() {
@@ -348,7 +435,7 @@ class CalendarManager {
     createEventElement(ev, context = 'month') {
         const el = document.createElement('div');
         el.className = 'calendar-event';
-        el.draggable = true;
+        el.draggable = !ev.series_id; // ocorrências de séries são editadas pelo modal
         el.dataset.eventId = ev.id;
         el.textContent = ev.title;
         el.title = (ev.description || '') + (ev.responsavel ? `\nResponsável: ${ev.responsavel}` : '');
@@ -479,14 +566,23 @@ class CalendarManager {
         // reset defaults
         this.inputColor.value = '#3b82f6';
         this.colorValue.textContent = '#3b82f6';
+        this.currentRecurrence = null;
+        this.currentOccurrence = null;
     }
 
     fillFormWithEvent(ev) {
-        this.inputId.value = ev.id || '';
+        // ocorrências editam a série inteira, a partir das datas da primeira ocorrência
+        const start = ev.series_id ? ev.series_start : ev.start;
+        const end = ev.series_id ? ev.series_end : ev.end;
+        this.inputId.value = ev.series_id || ev.id || '';
         this.inputTitle.value = ev.title || '';
         this.inputDescription.value = ev.description || '';
-        this.inputStart.value = ev.start ? this.isoToLocalInput(ev.start) : '';
-        this.inputEnd.value = ev.end ? this.isoToLocalInput(ev.end) : '';
+        this.inputStart.value = start ? this.isoToLocalInput(start) : '';
+        this.inputEnd.value = end ? this.isoToLocalInput(end) : '';
+        this.currentRecurrence = ev.recurrence || null;
+        this.currentOccurrence = ev.series_id ? ev.start.slice(0, 10) : null;
+        this.inputRecurrence.value = ev.recurrence ? ev.recurrence.freq : '';
+        this.inputRecurrenceUntil.value = ev.recurrence && ev.recurrence.until ? ev.recurrence.until.slice(0, 10) : '';
         this.inputResponsavel.value = (ev.responsavel || ev.responsavel_id) || '';
         this.inputSetor.value = (ev.setor || ev.setor_id) || '';
         this.inputColor.value = ev.color || ev.cor || '#3b82f6';
@@ -503,15 +599,47 @@ class CalendarManager {
             responsavel_id: this.inputResponsavel.value || null,
             setor_id: this.inputSetor.value || null,
             cor: this.inputColor.value || '#3b82f6',
-            tipo: 'evento'
+            tipo: 'evento',
+            recurrence: this.inputRecurrence.value ? {
+                ...(this.currentRecurrence || {}),
+                freq: this.inputRecurrence.value,
+                until: this.inputRecurrenceUntil.value ? `${this.inputRecurrenceUntil.value}T23:59:59` : null
+            } : null
         };
+        const recurring = Boolean(payload.recurrence || this.currentRecurrence);
 
         if (!payload.title || !payload.start_at) {
             alert('Preencha pelo menos o título e a data de início.');
             return;
         }
 
-        if (id) {
+        this.confirmConflicts(id, payload).then(proceed => {
+            if (proceed) this.persistEvent(id, payload, recurring);
+        });
+    }
+
+    /**
+     * Avisa se o responsável ou o setor já estão ocupados no horário; resolve true para salvar
+     */
+    confirmConflicts(id, payload) {
+        if (!payload.end_at || (!payload.responsavel_id && !payload.setor_id)) return Promise.resolve(true);
+        return this.apiCheckConflicts({ ...payload, exclude_id: id ? Number(id) : null }).then(result => {
+            if (!result.conflicts.length) return true;
+            const lines = result.conflicts.slice(0, 5).map(c => `- ${c.title} (${new Date(c.start).toLocaleString('pt-BR')})`);
+            return confirm(`Conflito de agenda com:\n${lines.join('\n')}\n\nSalvar mesmo assim?`);
+        }).catch(() => true); // a verificação é só um aviso; falhas não impedem o salvamento
+    }
+
+    persistEvent(id, payload, recurring) {
+        if (id && recurring) {
+            // séries não têm atualização otimista: as ocorrências são recalculadas no servidor
+            this.apiUpdateEvent(id, payload).then(() => {
+                this.closeEventModal();
+                this.reloadEvents();
+            }).catch(err => {
+                alert('Erro ao atualizar evento: ' + err.message);
+            });
+        } else if (id) {
             // update
             // optimistic update in memory
             const ev = this.events.find(x => String(x.id) === String(id));
@@ -540,6 +668,11 @@ class CalendarManager {
             // send to server
             this.apiCreateEvent(payload).then(result => {
                 const created = result.event;
+                if (created.recurrence) {
+                    this.closeEventModal();
+                    this.reloadEvents();
+                    return;
+                }
                 // push to memory with expected shape
                 this.events.push({
                     id: created.id,
@@ -559,7 +692,18 @@ class CalendarManager {
         }
     }
 
-    deleteEvent(id) {
+    deleteEvent(id, occurrence = null) {
+        if (this.currentRecurrence) {
+            // série inteira ou uma ocorrência: recarrega a janela depois de confirmar no servidor
+            this.apiDeleteEvent(id, occurrence).then(() => {
+                this.closeEventModal();
+                this.reloadEvents();
+            }).catch(err => {
+                alert('Erro ao excluir evento: ' + err.message);
+            });
+            return;
+        }
+
         // optimistic remove
         const idx = this.events.findIndex(x => String(x.id) === String(id));
         if (idx === -1) return;
@@ -591,6 +735,18 @@ class CalendarManager {
         });
     }
 
+    apiCheckConflicts(payload) {
+        return fetch('/api/events/conflicts', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify(payload),
+            credentials: 'same-origin'
+        }).then(resp => {
+            if (!resp.ok) return resp.json().then(j => { throw new Error(j.error || 'Erro ao verificar conflitos'); });
+            return resp.json();
+        });
+    }
+
     apiUpdateEvent(id, payload) {
         return fetch(`/api/events/${id}`, {
             method: 'PUT',
@@ -603,8 +759,9 @@ class CalendarManager {
         });
     }
 
-    apiDeleteEvent(id) {
-        return fetch(`/api/events/${id}`, {
+    apiDeleteEvent(id, occurrence = null) {
+        const query = occurrence ? `?occurrence=${occurrence}` : '';
+        return fetch(`/api/events/${id}${query}`, {
             method: 'DELETE',
             credentials: 'same-origin'
         }).then(resp => {
@@ -1,6 +1,9 @@
 class KanbanManager {
     constructor() {
         this.currentKanban = null;
+        this.boardState = null; // { id, name, version, columns: Map<id, coluna>, cards: Map<id, card> }
+        this.eventSource = null;
+        this.refreshTimer = null;
         this.kanbanContainer = document.getElementById("kanbanContainer");
         this.emptyState = document.getElementById("emptyState");
         this.kanbanSelector = document.getElementById("kanbanSelector");
@@ -20,6 +23,7 @@ class KanbanManager {
      * Carrega um quadro Kanban pelo ID
      */
     async loadKanban(boardId) {
+        this.unsubscribe();
         if (!boardId) {
             this.showEmptyState();
             return;
@@ -30,14 +34,116 @@ class KanbanManager {
             if (!response.ok) throw new Error("Erro ao carregar quadro");
 
             const data = await response.json();
-            this.renderKanban(data);
-            this.currentKanban = data;
+            this.setBoardState(data);
+            this.renderKanban(this.currentKanban);
+            this.subscribe(boardId);
         } catch (error) {
             console.error("Erro ao carregar Kanban:", error);
             this.showEmptyState("Falha ao carregar quadro.");
         }
     }
 
+    /**
+     * Sincroniza o quadro atual pedindo só o que mudou desde a última versão
+     */
+    async refreshKanban() {
+        if (!this.boardState) return;
+
+        try {
+            const { id, version } = this.boardState;
+            const response = await fetch(`/client/kanban/${id}/data?since=${version}`);
+            if (!response.ok) throw new Error("Erro ao sincronizar quadro");
+
+            const changes = await response.json();
+            if (changes.full) {
+                this.setBoardState(changes);
+            } else if (changes.version !== version) {
+                this.applyChanges(changes);
+            } else {
+                return; // nada mudou
+            }
+            this.renderKanban(this.currentKanban);
+        } catch (error) {
+            console.error("Erro ao sincronizar Kanban:", error);
+        }
+    }
+
+    /**
+     * Escuta os eventos do quadro (SSE) e sincroniza quando outra pessoa altera algo
+     */
+    subscribe(boardId) {
+        if (!window.EventSource) return;
+
+        this.eventSource = new EventSource(`/client/kanban/${boardId}/stream`);
+        const onBoardEvent = (event) => {
+            const data = JSON.parse(event.data);
+            if (this.boardState && data.version > this.boardState.version) {
+                this.scheduleRefresh();
+            }
+        };
+        ["card.created", "card.updated", "card.moved", "card.deleted", "cards.reordered", "cards.rebalanced", "cards.updated", "cards.deleted"].forEach(
+            (name) => this.eventSource.addEventListener(name, onBoardEvent)
+        );
+        // ao reconectar, busca o que pode ter sido perdido enquanto a conexão esteve fechada
+        this.eventSource.addEventListener("open", () => this.scheduleRefresh());
+    }
+
+    unsubscribe() {
+        if (this.eventSource) {
+            this.eventSource.close();
+            this.eventSource = null;
+        }
+    }
+
+    /**
+     * Agrupa rajadas de eventos numa única sincronização
+     */
+    scheduleRefresh() {
+        clearTimeout(this.refreshTimer);
+        this.refreshTimer = setTimeout(() => this.refreshKanban(), 200);
+    }
+
+    /**
+     * Guarda o quadro completo como estado local (colunas e cards indexados por id)
+     */
+    setBoardState(data) {
+        const columns = new Map();
+        const cards = new Map();
+        data.columns.forEach((column) => {
+            const { cards: columnCards, ...columnData } = column;
+            columns.set(column.id, columnData);
+            columnCards.forEach((card) => cards.set(card.id, { ...card, column_id: column.id }));
+        });
+        this.boardState = { id: data.id, name: data.name, version: data.version, columns, cards };
+        this.currentKanban = this.buildBoard();
+    }
+
+    /**
+     * Aplica uma resposta incremental (?since=) ao estado local
+     */
+    applyChanges(changes) {
+        const state = this.boardState;
+        changes.columns.forEach((column) => state.columns.set(column.id, column));
+        changes.cards.forEach((card) => state.cards.set(card.id, card));
+        changes.deleted.columns.forEach((id) => state.columns.delete(id));
+        changes.deleted.cards.forEach((id) => state.cards.delete(id));
+        state.version = changes.version;
+        this.currentKanban = this.buildBoard();
+    }
+
+    /**
+     * Monta a estrutura { columns: [{ ..., cards }] } ordenada por posição
+     */
+    buildBoard() {
+        const state = this.boardState;
+        const byPosition = (a, b) => a.position - b.position || a.id - b.id;
+        const columns = [...state.columns.values()].sort(byPosition).map((column) => ({
+            ...column,
+            cards: [...state.cards.values()].filter((card) => card.column_id === column.id).sort(byPosition),
+        }));
+        return { id: state.id, name: state.name, version: state.version, columns };
+    }
+
     /**
      * Renderiza o quadro no container
      */
@@ -112,14 +218,13 @@ class KanbanManager {
         if (!confirm("Deseja realmente excluir este card?")) return;
 
         try {
-            const response = await fetch(`/api/kanban/card/${cardId}`, {
-                method: "DELETE",
+            const response = await fetch(`/client/kanban/card/${cardId}/delete`, {
+                method: "POST",
             });
             if (!response.ok) throw new Error("Erro ao excluir card");
 
-            // Remove da tela
-            const cardEl = this.kanbanContainer.querySelector(`.kanban-card[data-id="${cardId}"]`);
-            if (cardEl) cardEl.remove();
+            // Busca só as alterações (inclui a exclusão e o que outros usuários mudaram)
+            await this.refreshKanban();
         } catch (error) {
             console.error("Erro ao excluir card:", error);
             alert("Erro ao excluir card.");
@@ -0,0 +1,223 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ThrottleBackend:
+    """Interface dos baldes de tokens do limitador de login.
+
+    O LocalBackend atende um único processo; para vários workers use o
+    SQLiteBackend (arquivo compartilhado na mesma máquina) ou outra
+    implementação com o mesmo contrato (ex.: Redis) em LOGIN_THROTTLE_BACKEND.
+    """
+
+    def consume(self, key, capacity, rate, now=None):
+        """Tira um token do balde; devolve 0 se permitido ou os segundos até o próximo token"""
+        raise NotImplementedError
+
+    def reset(self, key):
+        raise NotImplementedError
+
+
+def _refill(tokens, updated, capacity, rate, now):
+    # balde que nunca foi usado (ou foi descartado) começa cheio
+    if tokens is None:
+        return float(capacity)
+    return min(float(capacity), tokens + max(0.0, now - updated) * rate)
+
+
+def _take(tokens, rate):
+    """(tokens restantes, espera): espera 0 quando havia token para consumir"""
+    if tokens >= 1:
+        return tokens - 1, 0.0
+    return tokens, (1 - tokens) / rate
+
+
+class LocalBackend(ThrottleBackend):
+    """Baldes em memória, com LRU limitado para não crescer sem fim sob ataque"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (None, now))
+            tokens, wait = _take(_refill(tokens, updated, capacity, rate, now), rate)
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)  # o mais antigo: descartá-lo equivale a um balde cheio
+        return wait
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+
+class SQLiteBackend(ThrottleBackend):
+    """Baldes num arquivo SQLite, compartilhados pelos processos da mesma máquina.
+
+    Cada consumo é uma transação BEGIN IMMEDIATE (trava de escrita do
+    arquivo), então leitura e atualização do balde são atômicas entre
+    workers. Usa o relógio de parede, comum a todos os processos.
+    """
+
+    # a cada N consumos, remove baldes parados há tempo suficiente para estarem cheios
+    PRUNE_EVERY = 1000
+    PRUNE_AFTER = 3600  # segundos
+
+    def __init__(self, path, timeout=5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._consumed = 0
+
+    def _connection(self):
+        # conexões sqlite3 não são compartilháveis entre threads nem sobrevivem a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS throttle_bucket "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def consume(self, key, capacity, rate, now=None):
+        now = time.time() if now is None else now
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM throttle_bucket WHERE key = ?", (key,)).fetchone()
+            tokens, updated = row if row else (None, now)
+            tokens, wait = _take(_refill(tokens, updated, capacity, rate, now), rate)
+            conn.execute("INSERT OR REPLACE INTO throttle_bucket (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            self._consumed += 1
+            if self._consumed % self.PRUNE_EVERY == 0:
+                conn.execute("DELETE FROM throttle_bucket WHERE updated < ?", (now - self.PRUNE_AFTER,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+    def reset(self, key):
+        self._connection().execute("DELETE FROM throttle_bucket WHERE key = ?", (key,))
+
+
+class LoginThrottle:
+    """Limita tentativas de login por IP e por identificador (username/e-mail) vindo desse IP.
+
+    A verificação acontece antes de buscar o usuário e de calcular o hash
+    da senha, então uma rajada de credenciais não ocupa a CPU dos workers.
+    O balde do identificador é por par (identificador, IP): quem tenta a
+    conta de outra pessoa de um IP esgota só o próprio balde e não bloqueia
+    o login do dono a partir de outro endereço. Um terceiro balde, por conta
+    e bem maior, soma as tentativas de todos os IPs: limita um ataque
+    distribuído contra uma mesma conta sem que poucas falhas a bloqueiem.
+    Falhas e bloqueios não geram um Log por tentativa: são somados por IP
+    e gravados como um único registro a cada LOGIN_FAILURE_LOG_INTERVAL.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.backend = None
+        self._failures = {}
+        self._timer = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('LOGIN_THROTTLE_ENABLED', True)
+        app.config.setdefault('LOGIN_THROTTLE_BACKEND', None)  # instância de ThrottleBackend; None usa o LocalBackend
+        app.config.setdefault('LOGIN_THROTTLE_IP_BURST', 20)
+        app.config.setdefault('LOGIN_THROTTLE_IP_PER_MINUTE', 10)
+        app.config.setdefault('LOGIN_THROTTLE_ID_BURST', 5)
+        app.config.setdefault('LOGIN_THROTTLE_ID_PER_MINUTE', 2)
+        app.config.setdefault('LOGIN_THROTTLE_ACCOUNT_BURST', 50)
+        app.config.setdefault('LOGIN_THROTTLE_ACCOUNT_PER_MINUTE', 10)
+        app.config.setdefault('LOGIN_FAILURE_LOG_INTERVAL', 60)  # segundos
+
+        self.app = app
+        self.backend = app.config['LOGIN_THROTTLE_BACKEND'] or LocalBackend()
+        app.extensions['login_throttle'] = self
+        atexit.register(self.flush)
+
+    # API pública
+
+    def check(self, ip_address, identifier):
+        """Consome uma tentativa; devolve None se permitida ou os segundos de espera"""
+        config = self.app.config
+        if not config['LOGIN_THROTTLE_ENABLED']:
+            return None
+        buckets = [
+            (f"ip:{ip_address}", config['LOGIN_THROTTLE_IP_BURST'], config['LOGIN_THROTTLE_IP_PER_MINUTE']),
+            (_identifier_key(ip_address, identifier), config['LOGIN_THROTTLE_ID_BURST'], config['LOGIN_THROTTLE_ID_PER_MINUTE']),
+            (f"account:{_normalize(identifier)}", config['LOGIN_THROTTLE_ACCOUNT_BURST'],
+             config['LOGIN_THROTTLE_ACCOUNT_PER_MINUTE']),
+        ]
+        for key, capacity, per_minute in buckets:
+            wait = self.backend.consume(key, capacity, per_minute / 60.0)
+            if wait:
+                return wait
+        return None
+
+    def limit(self, key, burst, per_minute):
+        """Balde avulso no mesmo backend (ex.: rotas caras da API); None se permitido ou os segundos de espera"""
+        return self.backend.consume(key, burst, per_minute / 60.0) or None
+
+    def succeeded(self, ip_address, identifier):
+        """Login correto: o usuário não herda as tentativas erradas anteriores"""
+        # o balde da conta não é zerado: cada login do dono reabriria espaço para o ataque distribuído
+        if self.app.config['LOGIN_THROTTLE_ENABLED']:
+            self.backend.reset(_identifier_key(ip_address, identifier))
+
+    def failed(self, ip_address, identifier, throttled=False):
+        """Soma a falha ao agregado do IP; o Log é gravado no fim do intervalo"""
+        with self._lock:
+            entry = self._failures.setdefault(ip_address, {'failed': 0, 'throttled': 0, 'identifiers': set()})
+            entry['throttled' if throttled else 'failed'] += 1
+            if len(entry['identifiers']) < 20:
+                entry['identifiers'].add(_normalize(identifier))
+            if self._timer is None:
+                self._timer = threading.Timer(self.app.config['LOGIN_FAILURE_LOG_INTERVAL'], self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Grava um registro de auditoria por IP com as falhas acumuladas"""
+        from manage import audit_log
+
+        with self._lock:
+            failures, self._failures = self._failures, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for ip_address, entry in failures.items():
+            audit_log.record(_summary(entry), ip_address=ip_address, status="fail")
+
+
+def _normalize(identifier):
+    return (identifier or '').strip().lower()
+
+
+def _identifier_key(ip_address, identifier):
+    return f"id:{_normalize(identifier)}:{ip_address}"
+
+
+def _summary(entry):
+    action = f"Tentativas de login falharam: {entry['failed']}"
+    if entry['throttled']:
+        action += f", bloqueadas: {entry['throttled']}"
+    action += f" ({', '.join(sorted(entry['identifiers']))})"
+    return action[:255]
@@ -0,0 +1,33 @@
+from sqlalchemy.orm import joinedload
+
+from models import Mensagem
+from manage import db
+
+MESSAGE_PAGE_SIZE = 30
+
+
+def load_messages_page(ticket_id, limit=MESSAGE_PAGE_SIZE, before=None):
+    """Mensagens do ticket, da página mais recente para trás, por cursor (criado_em, id).
+
+    before é o par (criado_em, id) da mensagem mais antiga já exibida; sem
+    ele vem a página mais recente. A busca segue o índice
+    (ticket_id, criado_em, id) de trás para frente e para no limite; o autor
+    vem no mesmo SELECT. As mensagens saem em ordem cronológica, prontas
+    para o chat. Devolve (mensagens, cursor da página anterior ou None).
+    """
+    query = Mensagem.query.options(joinedload(Mensagem.usuario)).filter(Mensagem.ticket_id == ticket_id)
+    if before is not None:
+        before_criado_em, before_id = before
+        query = query.filter(db.or_(
+            Mensagem.criado_em < before_criado_em,
+            db.and_(Mensagem.criado_em == before_criado_em, Mensagem.id < before_id)
+        ))
+
+    messages = query.order_by(Mensagem.criado_em.desc(), Mensagem.id.desc()).limit(limit + 1).all()
+
+    older_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        older_cursor = {'before_criado_em': messages[-1].criado_em.isoformat(), 'before_id': messages[-1].id}
+    messages.reverse()
+    return messages, older_cursor
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload
+
+
+class UserCache:
+    """Cache do user_loader: snapshots destacados de User com a empresa já carregada.
+
+    Cada requisição recebe uma cópia ligada à sessão via merge(load=False),
+    que não executa SQL; o snapshot em si nunca é alterado. Entradas expiram
+    após USER_CACHE_TTL segundos (limite de desatualização entre processos)
+    e o LRU guarda no máximo USER_CACHE_SIZE usuários.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 60
+        self.max_size = 1024
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_TTL', 60)  # segundos; 0 desativa o cache
+        app.config.setdefault('USER_CACHE_SIZE', 1024)
+
+        self.ttl = app.config['USER_CACHE_TTL']
+        self.max_size = app.config['USER_CACHE_SIZE']
+        app.extensions['user_cache'] = self
+
+        if not self._listening:
+            from manage import db
+            event.listen(db.session, 'after_commit', self._after_commit)
+            event.listen(db.session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def load(self, user_id):
+        """Usuário para o flask-login: do cache quando possível, ligado à sessão atual"""
+        from manage import db
+
+        snapshot = self._get(user_id) if self.ttl else None
+        if snapshot is None:
+            snapshot = self._load_snapshot(user_id)
+            if snapshot is None:
+                return None
+            if self.ttl:
+                self._put(user_id, snapshot)
+        return db.session.merge(snapshot, load=False)
+
+    def invalidate(self, user_id):
+        """Descarta o usuário agora e de novo após o commit da sessão atual
+        (evita que uma requisição concorrente recoloque a versão antiga)"""
+        from manage import db
+
+        self._drop(user_id)
+        db.session.info.setdefault('user_cache_invalidate', set()).add(user_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _load_snapshot(self, user_id):
+        from manage import db
+        from models import User
+
+        # sessão própria: ao fechar, os objetos ficam destacados com os atributos carregados
+        with Session(db.engine) as session:
+            user = session.get(User, int(user_id), options=[joinedload(User.company)])
+            # exclusão agendada encerra as sessões abertas do usuário
+            return user if user is not None and user.deleted_at is None else None
+
+    def _get(self, user_id):
+        key = int(user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            snapshot, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return snapshot
+
+    def _put(self, user_id, snapshot):
+        with self._lock:
+            self._entries[int(user_id)] = (snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(int(user_id))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _drop(self, user_id):
+        with self._lock:
+            self._entries.pop(int(user_id), None)
+
+    def _after_commit(self, session):
+        for user_id in session.info.pop('user_cache_invalidate', ()):
+            self._drop(user_id)
+
+    def _after_rollback(self, session):
+        session.info.pop('user_cache_invalidate', None)
@@ -0,0 +1,261 @@
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, update, delete, insert
+
+users_cli = AppGroup('users', help='Manutenção de usuários')
+
+
+class UserPurger:
+    """Exclui usuários em segundo plano, em lotes, com progresso consultável.
+
+    schedule() marca o usuário como excluído (deleted_at: ele deixa de
+    entrar e some das listagens) e cria o registro UserDeletion; depois do
+    commit, start() entrega o trabalho a uma thread de fundo que limpa cada
+    tabela que referencia o usuário em lotes de USER_PURGE_CHUNK_SIZE
+    linhas, um commit por lote, para não segurar a trava de escrita do
+    banco. Só então a linha de user é removida. Cada etapa é idempotente:
+    um trabalho interrompido pode ser retomado com `flask users purge`.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('USER_PURGE_ASYNC', True)
+        app.config.setdefault('USER_PURGE_CHUNK_SIZE', 500)
+        app.config.setdefault('USER_PURGE_PAUSE', 0.05)  # segundos entre lotes: dá vez às outras escritas
+
+        self.app = app
+        app.extensions['user_purger'] = self
+        app.cli.add_command(users_cli)
+
+    # API pública
+
+    def schedule(self, user, requested_by=None):
+        """Marca o usuário como excluído e cria o registro de progresso (commit fica com quem chama)"""
+        from manage import db, user_cache
+        from models import UserDeletion
+
+        user.deleted_at = datetime.utcnow()
+        job = UserDeletion(user_id=user.id, username=user.username, requested_by=requested_by,
+                           steps_total=len(self._steps()))
+        db.session.add(job)
+        db.session.flush()
+        user_cache.invalidate(user.id)
+        return job
+
+    def start(self, job_id):
+        """Executa o trabalho (chamar depois do commit de schedule)"""
+        if not self.app.config['USER_PURGE_ASYNC']:
+            self.run(job_id)
+            return
+        self._ensure_worker()
+        self._queue.put(job_id)
+
+    def run(self, job_id):
+        """Executa o trabalho na thread atual (precisa de contexto de aplicação)"""
+        from manage import db, user_cache, page_cache
+        from models import User, UserDeletion
+        from app.blog import touch_blog
+
+        job = db.session.get(UserDeletion, job_id)
+        if job is None or job.status == 'done':
+            return
+        job.status = 'running'
+        job.steps_done = 0
+        job.rows_processed = 0
+        job.error = None
+        db.session.commit()
+        try:
+            for name, step in self._steps():
+                job.step = name
+                db.session.commit()
+                for rows in step(job.user_id):
+                    job.rows_processed += rows
+                    if name == 'blog_post':
+                        touch_blog()  # sitemap e RSS, no mesmo commit do lote
+                    db.session.commit()
+                    self._pause()
+                    if name == 'blog_post':
+                        page_cache.invalidate()  # posts do usuário saem do blog público
+                job.steps_done += 1
+            db.session.execute(delete(User).where(User.id == job.user_id))
+            user_cache.invalidate(job.user_id)
+            job.status = 'done'
+            job.step = None
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+        except Exception as exc:
+            db.session.rollback()
+            job.status = 'failed'
+            job.error = str(exc)[:1000]
+            db.session.commit()
+            self.app.logger.exception("Falha ao excluir o usuário %s", job.user_id)
+
+    def pending(self):
+        from manage import db
+        from models import UserDeletion
+
+        return db.session.scalars(
+            select(UserDeletion.id).where(UserDeletion.status.in_(('pending', 'running', 'failed'))).order_by(UserDeletion.id)
+        ).all()
+
+    # etapas
+
+    def _steps(self):
+        from manage import db
+        from models import BlogPost, Ticket, Mensagem, Log, Demand, Collaborator, PersonalDemand, Leisure, UserSession
+
+        # ordem importa: dependentes antes das linhas que eles referenciam; user por último
+        return [
+            ('kanban_card', self._kanban_cards),
+            ('mensagem', lambda user_id: self._delete(Mensagem, db.or_(
+                Mensagem.usuario_id == user_id,
+                Mensagem.ticket_id.in_(select(Ticket.id).where(Ticket.usuario_id == user_id))
+            ))),
+            ('ticket', lambda user_id: self._delete(Ticket, Ticket.usuario_id == user_id)),
+            ('blog_post', lambda user_id: self._delete(BlogPost, BlogPost.autor_id == user_id)),
+            ('log', lambda user_id: self._update(Log, Log.user_id == user_id, user_id=None)),
+            ('demand', lambda user_id: self._update(Demand, Demand.owner_id == user_id, owner_id=None)),
+            ('collaborator', lambda user_id: self._update(Collaborator, Collaborator.user_id == user_id, user_id=None)),
+            ('personal_demands', lambda user_id: self._delete(PersonalDemand, PersonalDemand.owner_id == user_id)),
+            ('organizations', self._organizations),
+            ('leisure', lambda user_id: self._delete(Leisure, Leisure.owner_id == user_id)),
+            ('user_session', lambda user_id: self._delete(UserSession, UserSession.user_id == user_id)),
+        ]
+
+    def _chunk_ids(self, model, criterion):
+        from manage import db
+
+        return db.session.scalars(select(model.id).where(criterion).limit(self.app.config['USER_PURGE_CHUNK_SIZE'])).all()
+
+    def _delete(self, model, criterion):
+        from manage import db
+
+        while ids := self._chunk_ids(model, criterion):
+            db.session.execute(delete(model).where(model.id.in_(ids)))
+            yield len(ids)
+
+    def _update(self, model, criterion, **values):
+        from manage import db
+
+        while ids := self._chunk_ids(model, criterion):
+            db.session.execute(update(model).where(model.id.in_(ids)).values(**values))
+            yield len(ids)
+
+    def _organizations(self, user_id):
+        from models import Organization, PersonalDemand
+
+        # demandas pessoais de outros usuários ligadas a essas organizações ficam sem organização
+        owned = select(Organization.id).where(Organization.owner_id == user_id)
+        yield from self._update(PersonalDemand, PersonalDemand.organization_id.in_(owned), organization_id=None)
+        yield from self._delete(Organization, Organization.owner_id == user_id)
+
+    def _kanban_cards(self, user_id):
+        """Cards criados pelo usuário passam para outro admin/funcionário ou, sem nenhum, são excluídos.
+
+        Cada lote incrementa a versão dos quadros afetados (com tombstones
+        para os excluídos) e avisa os clientes conectados, como as rotas do kanban.
+        """
+        from manage import db
+        from models import User, KanbanCard, KanbanColumn, KanbanTombstone
+        from app.kanban import bump_board_version, publish_board_event
+
+        replacement = db.session.scalar(
+            select(User.id)
+            .where(User.role.in_(['admin', 'funcionarios']), User.id != user_id, User.deleted_at.is_(None))
+            .order_by(User.id)
+            .limit(1)
+        )
+        chunk_size = self.app.config['USER_PURGE_CHUNK_SIZE']
+        while True:
+            rows = db.session.execute(
+                select(KanbanCard.id, KanbanColumn.kanban_id)
+                .join(KanbanColumn, KanbanCard.column_id == KanbanColumn.id)
+                .where(KanbanCard.created_by == user_id)
+                .limit(chunk_size)
+            ).all()
+            if not rows:
+                return
+            boards = {}
+            for card_id, kanban_id in rows:
+                boards.setdefault(kanban_id, []).append(card_id)
+
+            events = []
+            for kanban_id, card_ids in boards.items():
+                version = bump_board_version(kanban_id)
+                if replacement is not None:
+                    db.session.execute(
+                        update(KanbanCard).where(KanbanCard.id.in_(card_ids))
+                        .values(created_by=replacement, version=version)
+                    )
+                    events.append((kanban_id, 'cards.updated', version, card_ids))
+                else:
+                    db.session.execute(insert(KanbanTombstone), [
+                        {'kanban_id': kanban_id, 'entity': 'card', 'entity_id': card_id, 'version': version}
+                        for card_id in card_ids
+                    ])
+                    db.session.execute(delete(KanbanCard).where(KanbanCard.id.in_(card_ids)))
+                    events.append((kanban_id, 'cards.deleted', version, card_ids))
+            db.session.commit()
+            for kanban_id, event, version, card_ids in events:
+                publish_board_event(kanban_id, event, version, ids=card_ids)
+            yield len(rows)
+
+    # internos
+
+    def _pause(self):
+        pause = self.app.config['USER_PURGE_PAUSE']
+        if pause and self.app.config['USER_PURGE_ASYNC']:
+            time.sleep(pause)
+
+    def _ensure_worker(self):
+        # a thread não sobrevive a fork (gunicorn, etc.), então é criada por processo
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._worker, name='user-purger', daemon=True)
+            self._thread.start()
+
+    def _worker(self):
+        from manage import db
+
+        while True:
+            job_id = self._queue.get()
+            with self.app.app_context():
+                try:
+                    self.run(job_id)
+                finally:
+                    db.session.remove()
+
+
+@users_cli.command('purge')
+@click.option('--job', 'job_id', type=int, help='Só este trabalho (padrão: todos os não concluídos)')
+def purge_command(job_id):
+    """Executa (ou retoma) exclusões de usuários pendentes na linha de comando"""
+    from flask import current_app
+
+    from manage import db
+    from models import UserDeletion
+
+    purger = current_app.extensions['user_purger']
+    for pending_id in ([job_id] if job_id else purger.pending()):
+        purger.run(pending_id)
+        job = db.session.get(UserDeletion, pending_id)
+        if job is not None:
+            click.echo(f"exclusão {job.id} ({job.username}): {job.status}" + (f" - {job.error}" if job.error else ""))
@@ -0,0 +1,102 @@
+from sqlalchemy.exc import IntegrityError
+
+from models import User
+from manage import db
+
+# tentativas de gravação quando outro processo leva o username entre a consulta e o INSERT
+MAX_ALLOCATION_ATTEMPTS = 5
+
+
+def username_base(email=None, name=None):
+    """Base do username: parte local do e-mail ou o nome sem espaços (regra original)"""
+    base = email.split('@')[0] if email else (name or '').lower().replace(' ', '')
+    return base.strip() or 'usuario'
+
+
+def _prefix_filter(base):
+    # intervalo [base, base + 1) em vez de LIKE: usa o índice único de username em qualquer banco
+    upper = base[:-1] + chr(ord(base[-1]) + 1)
+    return db.and_(User.username >= base, User.username < upper)
+
+
+def taken_usernames(bases, reserved=()):
+    """Usernames existentes iguais às bases ou com base + sufixo, em no máximo duas consultas"""
+    bases = set(bases)
+    if not bases:
+        return set()
+    taken = {username for (username,) in db.session.query(User.username).filter(User.username.in_(bases))}
+    colliding = [base for base in bases if base in taken or base in reserved]
+    if colliding:
+        taken.update(
+            username for (username,) in
+            db.session.query(User.username).filter(db.or_(*[_prefix_filter(base) for base in colliding]))
+        )
+    return taken
+
+
+def _index_suffixes(names, index):
+    # "joao12" -> ("joao1", 2) e ("joao", 12): cada divisão possível entre prefixo e sufixo numérico
+    for name in names:
+        cut = len(name)
+        while cut > 0 and name[cut - 1].isdigit():
+            cut -= 1
+            index.setdefault(name[:cut], set()).add(int(name[cut:]))
+
+
+def allocate_usernames(bases, reserved=None):
+    """Um username livre para cada base, na ordem recebida.
+
+    Segue a regra de sempre (base, base1, base2...; o menor sufixo livre),
+    mas os existentes vêm de uma única consulta por prefixo e o sufixo é
+    calculado em memória. 'reserved' (set) acumula os nomes já entregues,
+    para chamadas sucessivas não repetirem um nome ainda não gravado.
+    """
+    reserved = set() if reserved is None else reserved
+    taken = taken_usernames(bases, reserved)
+    suffixes = {}
+    _index_suffixes(taken | reserved, suffixes)
+    cursors = {}  # menor sufixo ainda possível por base (os usados só aumentam)
+
+    allocated = []
+    for base in bases:
+        if base not in taken and base not in reserved:
+            username = base
+        else:
+            used = suffixes.get(base, ())
+            counter = cursors.get(base, 1)
+            while counter in used:
+                counter += 1
+            cursors[base] = counter + 1
+            username = f"{base}{counter}"
+        reserved.add(username)
+        _index_suffixes([username], suffixes)
+        allocated.append(username)
+    return allocated
+
+
+def allocate_username(base, reserved=None):
+    return allocate_usernames([base], reserved)[0]
+
+
+def username_taken(username):
+    return db.session.query(User.id).filter(User.username == username).first() is not None
+
+
+def add_user(user, base):
+    """Adiciona o usuário com um username livre derivado de base.
+
+    O INSERT roda num savepoint; se outro processo gravar o mesmo username
+    antes (violação de unicidade), o nome é descartado e outro é alocado.
+    Violações de outras colunas (ex.: e-mail) são relançadas.
+    """
+    reserved = set()
+    for attempt in range(MAX_ALLOCATION_ATTEMPTS):
+        user.username = allocate_username(base, reserved)
+        try:
+            with db.session.begin_nested():
+                db.session.add(user)
+                db.session.flush()
+            return user
+        except IntegrityError:
+            if attempt == MAX_ALLOCATION_ATTEMPTS - 1 or not username_taken(user.username):
+                raise
@@ -1,13 +1,31 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, abort, jsonify, current_app, make_response
 from flask_login import login_user, logout_user, login_required, current_user
-from models import User, Contato, BlogPost, Ticket, Mensagem, Log, Company, Goal, Event, Demand, Collaborator, PersonalDemand, Organization, Leisure, Plan, Objective, Sector, DemandKanban, KanbanCard, KanbanColumn, Event
-from manage import db, login
+from models import User, Contato, BlogPost, Ticket, Mensagem, Log, Company, Goal, Event, Demand, Collaborator, PersonalDemand, Organization, Leisure, Plan, Objective, Sector, DemandKanban, KanbanCard, KanbanColumn, KanbanTombstone, Event, UserDeletion
+from manage import db, login, pubsub, user_cache, login_throttle, user_purger, page_cache
 import os
 from werkzeug.utils import secure_filename
 from app.utils import register_log
-import string
-import secrets
-from datetime import datetime
+from app.kanban import (load_board_data, load_board_changes, next_position, position_for_index, reorder_column,
+                        load_user_boards, load_priority_cards, bump_board_version, record_deletion, publish_board_event,
+                        MAX_REORDER_CARDS, MAX_PRIORITY_LIMIT)
+from app.pubsub import kanban_channel, ticket_channel
+from app.collaborator_import import CollaboratorImport, read_rows
+from app.accounts import generate_random_password
+from app.usernames import username_base, allocate_username, add_user
+from app.blog_search import search_posts, SEARCH_PAGE_SIZE
+from app.blog_render import compile_post, needs_compile
+from app.blog import load_posts_page, blog_page_size, cached_blog_feed, build_sitemap, build_rss, touch_blog
+from app.admin import (load_users_page, load_logs_page, load_tickets_page, page_size, parse_day, serialize_deletion,
+                       USER_ROLES, LOG_STATUSES, TICKET_STATUSES, TICKET_AGES)
+from app.tickets import load_messages_page, MESSAGE_PAGE_SIZE
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import defer, joinedload
+from app.agenda import (parse_datetime, serialize_occurrence, occurrences_in_window, parse_recurrence, serialize_recurrence,
+                        exclude_occurrence, touch_calendar, feed_token, read_feed_token, feed_state, feed_etag,
+                        cached_feed, conflict_item, find_conflicts, free_busy, MAX_EVENTS_WINDOW, MAX_CONFLICT_BATCH,
+                        MAX_FREEBUSY_COLLABORATORS)
+import csv
+from datetime import datetime, timedelta, timezone
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 UPLOAD_FOLDER = 'app/static/uploads/avatars'
@@ -18,11 +36,6 @@ bp = Blueprint('app_bp', __name__, template_folder='templates', static_folder='s
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def generate_random_password(length=12):
-    """Gera uma senha aleatória"""
-    characters = string.ascii_letters + string.digits + string.punctuation
-    return ''.join(secrets.choice(characters) for i in range(length))
-
 def create_user_from_collaborator(collaborator):
     """Cria um usuário a partir de um colaborador"""
     # Verifica se já existe um usuário com este email
@@ -30,22 +43,11 @@ def create_user_from_collaborator(collaborator):
     if existing_user:
         return existing_user, False  # Já existe, não criou novo
     
-    # Gera username a partir do email ou nome
-    base_username = collaborator.email.split('@')[0] if collaborator.email else collaborator.name.lower().replace(' ', '')
-    username = base_username
-    counter = 1
-    
-    # Garante que o username seja único
-    while User.query.filter_by(username=username).first():
-        username = f"{base_username}{counter}"
-        counter += 1
-    
     # Gera senha aleatória
     password = generate_random_password()
     
     # Cria o usuário
     user = User(
-        username=username,
         name=collaborator.name,
         email=collaborator.email,
         role='cliente',  # Role padrão para colaboradores
@@ -53,7 +55,8 @@ def create_user_from_collaborator(collaborator):
     )
     user.set_password(password)
     
-    db.session.add(user)
+    # Username a partir do email ou nome, com o próximo sufixo livre (uma consulta por prefixo)
+    add_user(user, username_base(collaborator.email, collaborator.name))
     return user, True  # Novo usuário criado
 
 def sync_collaborator_to_user(collaborator):
@@ -62,9 +65,12 @@ def sync_collaborator_to_user(collaborator):
     
     if user:
         # Atualiza os dados do usuário existente
+        if user.name != collaborator.name:
+            touch_blog(author_ids=[user.id])  # nome do autor no RSS
         user.name = collaborator.name
         user.company_id = collaborator.company_id
         # Mantém o role do usuário, não sobrescreve
+        user_cache.invalidate(user.id)
         return user, False  # Usuário atualizado, não criado
     else:
         # Cria novo usuário
@@ -74,26 +80,26 @@ def sync_collaborator_to_user(collaborator):
 
 # home principal
 @bp.route('/')
+@page_cache.cached("Acesso à página inicial")
 def home():
-    register_log("Acesso à página inicial")
     return render_template('public/home.html')
 
 # página de sobre
 @bp.route('/sobre')
+@page_cache.cached("Acesso à página sobre")
 def about():
-    register_log("Acesso à página sobre")
     return render_template('public/sobre.html')
 
 # página institucional para comunicação com empresas
 @bp.route('/empresas')
+@page_cache.cached("Acesso à página empresas")
 def empresas():
-    register_log("Acesso à página empresas")
     return render_template('public/empresas.html')
 
 # página para detalhar os planos
 @bp.route('/planos')
+@page_cache.cached("Acesso à página planos")
 def planos():
-    register_log("Acesso à página planos")
     return render_template('public/planos.html')
 
 # formulário de contato
@@ -126,8 +132,8 @@ def contato():
 
 # página de perguntas e respostas
 @bp.route('/faq')
+@page_cache.cached("Acesso à página FAQ")
 def faq():
-    register_log("Acesso à página FAQ")
     return render_template('public/faq.html')
 
 # página para abertura de chamados
@@ -182,6 +188,13 @@ def ajuda_ticket(ticket_id):
             )
             db.session.add(msg)
             db.session.commit()
+            pubsub.publish(ticket_channel(ticket.id), 'mensagem.created', {
+                'id': msg.id,
+                'conteudo': msg.conteudo,
+                'autor': msg.usuario.name if msg.usuario else None,
+                'usuario_id': msg.usuario_id,
+                'criado_em': msg.criado_em.isoformat() if msg.criado_em else None
+            }, event_id=msg.id)
             flash('Mensagem enviada!', 'success')
         else:
             register_log("Envio de mensagem via ticket de ajuda: falha, detalhes incompletos", status="fail")
@@ -189,46 +202,117 @@ def ajuda_ticket(ticket_id):
     else:
         register_log("Acesso à página de ticket de ajuda")
 
-    return render_template('public/ajuda_ticket.html', ticket=ticket)
+    before = None
+    before_criado_em = request.args.get('before_criado_em')
+    before_id = request.args.get('before_id', type=int)
+    if before_criado_em and before_id is not None:
+        try:
+            before = (datetime.fromisoformat(before_criado_em), before_id)
+        except ValueError:
+            abort(400)
+
+    mensagens, older_cursor = load_messages_page(ticket.id, limit=MESSAGE_PAGE_SIZE, before=before)
+    return render_template('public/ajuda_ticket.html', ticket=ticket, mensagens=mensagens,
+                           older_cursor=older_cursor, paginated=before is not None)
+
+@bp.route('/ajuda/<int:ticket_id>/stream')
+def ajuda_ticket_stream(ticket_id):
+    """Novas mensagens e mudanças de status do ticket em tempo real (Server-Sent Events)"""
+    Ticket.query.get_or_404(ticket_id)
+
+    # conexão longa: devolve a conexão do banco antes de começar o stream
+    db.session.close()
+    return pubsub.response(ticket_channel(ticket_id))
 
 # página do blog público da plataforma
 @bp.route('/blog')
+@page_cache.cached("Acesso à página do blog")
 def blog():
-    register_log("Acesso à página do blog")
-    posts = BlogPost.query.order_by(BlogPost.criado_em.desc()).all()
-    return render_template('public/blog.html', posts=posts)
+    limit = blog_page_size(request.args.get('limit', type=int))
+    after = None
+    after_criado_em = request.args.get('after_criado_em')
+    after_id = request.args.get('after_id', type=int)
+    if after_criado_em and after_id is not None:
+        try:
+            after = (datetime.fromisoformat(after_criado_em), after_id)
+        except ValueError:
+            abort(400)
+
+    posts, next_cursor = load_posts_page(limit=limit, after=after)
+    return render_template('public/blog.html', posts=posts, next_cursor=next_cursor,
+                           paginated=after is not None, limit=limit)
+
+@bp.route('/sitemap.xml')
+@page_cache.cached("Acesso ao sitemap")
+def sitemap():
+    return current_app.response_class(cached_blog_feed('sitemap', build_sitemap), mimetype='application/xml')
+
+@bp.route('/blog/rss.xml')
+@page_cache.cached("Acesso ao feed RSS do blog")
+def blog_rss():
+    return current_app.response_class(cached_blog_feed('rss', build_rss), mimetype='application/rss+xml')
 
 @bp.route('/blog/<slug>')
+@page_cache.cached("Acesso à página do post do blog: {slug}")
 def blog_post(slug):
-    register_log(f"Acesso à página do post do blog: {slug}")
-    post = BlogPost.query.filter_by(slug=slug).first_or_404()
+    post = (BlogPost.query
+            .options(defer(BlogPost.conteudo), joinedload(BlogPost.autor))
+            .filter_by(slug=slug)
+            .first_or_404())
+    if needs_compile(post):
+        # post anterior ao render armazenado ou renderer atualizado: compila uma vez e grava
+        compile_post(post, keep_timestamp=True)
+        db.session.commit()
     return render_template('public/blog_post.html', post=post)
 
+@bp.route('/blog/busca')
+@page_cache.cached("Busca no blog")
+def blog_busca():
+    """Busca de texto completo nos posts, por relevância, com os termos destacados"""
+    q = (request.args.get('q') or '').strip()
+    page = max(request.args.get('page', 1, type=int), 1)
+    results, total = search_posts(q, page=page, per_page=SEARCH_PAGE_SIZE)
+    return render_template('public/blog_busca.html', q=q, results=results, total=total,
+                           page=page, per_page=SEARCH_PAGE_SIZE)
+
 # páinel de privacidade
 @bp.route('/privacidade')
+@page_cache.cached("Acesso à página de privacidade")
 def privacidade():
-    register_log("Acesso à página de privacidade")
     return render_template('public/privacidade.html')
 
 # autenticações
 @bp.route('/login', methods=['GET','POST'])
 def login():
     if request.method == 'POST':
-        login_input = request.form.get('login').strip()
-        pwd = request.form.get('password')
+        login_input = (request.form.get('login') or '').strip()
+        pwd = request.form.get('password') or ''
+
+        # limite por IP e por login (vindo deste IP) antes de qualquer consulta ou hash de senha
+        wait = login_throttle.check(request.remote_addr, login_input)
+        if wait:
+            login_throttle.failed(request.remote_addr, login_input, throttled=True)
+            retry_after = max(1, int(wait + 0.999))
+            flash(f'Muitas tentativas de login. Tente novamente em {retry_after} segundos.', 'danger')
+            response = make_response(render_template('auth/login.html'), 429)
+            response.headers['Retry-After'] = str(retry_after)
+            return response
 
         # Buscar pelo username ou email
         user = User.query.filter(
-            (User.username == login_input) | (User.email == login_input)
+            (User.username == login_input) | (User.email == login_input),
+            User.deleted_at.is_(None)
         ).first()
 
         if user and user.check_password(pwd):
             login_user(user)
+            login_throttle.succeeded(request.remote_addr, login_input)
             register_log("Login de usuário")
             return redirect(url_for('app_bp.dashboard'))
 
         flash('Credenciais inválidas', 'danger')
-        register_log("Tentativa de login falhou", status="fail")
+        # falhas são agregadas por IP num único registro de auditoria por intervalo
+        login_throttle.failed(request.remote_addr, login_input)
         return redirect(url_for('app_bp.login'))
 
     return render_template('auth/login.html')
@@ -236,7 +320,7 @@ def login():
 @bp.route('/register', methods=['GET','POST'])
 def register():
     if request.method == 'POST':
-        username = request.form.get('username').strip()
+        username = (request.form.get('username') or '').strip()
         name = request.form.get('name').strip()
         email = request.form.get('email').strip()
         password = request.form.get('password')
@@ -248,9 +332,13 @@ def register():
             flash('Email já cadastrado', 'warning')
             return redirect(url_for('app_bp.register'))
 
-        if User.query.filter_by(username=username).first():
+        # sem username escolhido, um é gerado a partir do email
+        auto_username = not username
+        if auto_username:
+            username = allocate_username(username_base(email=email))
+        elif User.query.filter_by(username=username).first():
             register_log("Tentativa de registro falhou: username já existe", status="fail")
-            flash('Username já existe', 'warning')
+            flash(f'Username já existe. Sugestão: {allocate_username(username)}', 'warning')
             return redirect(url_for('app_bp.register'))
 
         avatar_path = None
@@ -271,8 +359,18 @@ def register():
         user = User(username=username, name=name, email=email, avatar=avatar_path, role="cliente", company=company)
         user.set_password(password)
 
-        db.session.add(user)
-        db.session.commit()
+        try:
+            if auto_username:
+                add_user(user, username_base(email=email))
+            else:
+                db.session.add(user)
+            db.session.commit()
+        except IntegrityError:
+            # outro registro simultâneo levou o username/email escolhido
+            db.session.rollback()
+            register_log("Tentativa de registro falhou: username ou email já existe", status="fail")
+            flash('Username ou email já cadastrado', 'warning')
+            return redirect(url_for('app_bp.register'))
         register_log("Registro de novo usuário")
         flash('Conta criada com sucesso! Faça login.', 'success')
         return redirect(url_for('app_bp.login'))
@@ -310,6 +408,8 @@ def settings():
 
     if request.method == 'POST':
         current_user.username = request.form.get('username')
+        if request.form.get('name') != current_user.name:
+            touch_blog(author_ids=[current_user.id])  # nome do autor no RSS
         current_user.name = request.form.get('name')
         current_user.email = request.form.get('email')
 
@@ -326,6 +426,7 @@ def settings():
         if new_password:
             current_user.set_password(new_password)
 
+        user_cache.invalidate(current_user.id)
         db.session.commit()
         flash("Configurações atualizadas com sucesso!", "success")
         register_log("Atualização de configurações de usuário")
@@ -371,8 +472,11 @@ def admin_blog_novo():
             return redirect(url_for('app_bp.admin_blog_novo'))
 
         post = BlogPost(titulo=titulo, slug=slug, resumo=resumo, conteudo=conteudo, autor=current_user)
+        compile_post(post)
         db.session.add(post)
+        touch_blog()
         db.session.commit()
+        page_cache.invalidate()
         flash('Post criado com sucesso!', 'success')
         register_log("Criação de novo post no blog")
         return redirect(url_for('app_bp.admin_blog'))
@@ -405,8 +509,11 @@ def admin_blog_editar(post_id):
         post.resumo = resumo
         post.conteudo = conteudo
         post.atualizado_em = db.func.current_timestamp()
+        compile_post(post)
+        touch_blog()
         
         db.session.commit()
+        page_cache.invalidate()
         flash('Post atualizado com sucesso!', 'success')
         register_log(f"Edição do post {post_id}")
         return redirect(url_for('app_bp.admin_blog'))
@@ -422,7 +529,9 @@ def admin_blog_excluir(post_id):
     post = BlogPost.query.get_or_404(post_id)
     
     db.session.delete(post)
+    touch_blog()
     db.session.commit()
+    page_cache.invalidate()
     
     flash('Post excluído com sucesso!', 'success')
     register_log(f"Exclusão do post {post_id}")
@@ -434,9 +543,29 @@ def admin_blog_excluir(post_id):
 def admin_ajuda():
     if not current_user.is_admin() and not current_user.is_funcionario():
         abort(403)
+    filters = {
+        'status': request.args.get('status') or None,
+        'idade': request.args.get('idade') or None,
+    }
+    after = None
+    after_criado_em = request.args.get('after_criado_em')
+    after_id = request.args.get('after_id', type=int)
+    if after_criado_em and after_id is not None:
+        try:
+            after = (datetime.fromisoformat(after_criado_em), after_id)
+        except ValueError:
+            abort(400)
+
+    limit = request.args.get('limit', type=int)
+    tickets, next_cursor = load_tickets_page(
+        status=filters['status'],
+        age=filters['idade'],
+        limit=page_size(limit),
+        after=after
+    )
     register_log("Acesso à página de ajuda/admin")
-    tickets = Ticket.query.order_by(Ticket.criado_em.desc()).all()
-    return render_template('admin/ajuda_list.html', tickets=tickets)
+    return render_template('admin/ajuda_list.html', tickets=tickets, statuses=TICKET_STATUSES, ages=TICKET_AGES,
+                           filters=filters, limit=limit, next_cursor=next_cursor, paginated=after is not None)
 
 @bp.route('/admin/ajuda/<int:ticket_id>', methods=['GET', 'POST'])
 @login_required
@@ -448,6 +577,7 @@ def admin_ajuda_ticket(ticket_id):
         novo_status = request.form.get('status')
         ticket.status = novo_status
         db.session.commit()
+        pubsub.publish(ticket_channel(ticket.id), 'ticket.status', {'status': ticket.status})
         flash('Status do ticket atualizado.', 'success')
         return redirect(url_for('app_bp.admin_ajuda_ticket', ticket_id=ticket.id))
 
@@ -495,9 +625,23 @@ def admin_usuarios():
     if not current_user.is_admin():
         abort(403)
 
-    usuarios = User.query.order_by(User.id.desc()).all()
+    # filtros e cursor vêm da query string; a página só lê limit + 1 usuários
+    filters = {
+        'role': request.args.get('role') or None,
+        'company_id': request.args.get('company_id', type=int),
+    }
+    limit = request.args.get('limit', type=int)
+    usuarios, next_cursor = load_users_page(
+        limit=page_size(limit),
+        after_id=request.args.get('after_id', type=int),
+        **filters
+    )
+    companies = db.session.query(Company.id, Company.name).order_by(Company.name).all()
+    deletions = UserDeletion.query.filter(UserDeletion.status != 'done').order_by(UserDeletion.id.desc()).limit(20).all()
     register_log("Acesso à gestão de usuários")
-    return render_template('admin/usuarios_list.html', usuarios=usuarios)
+    return render_template('admin/usuarios_list.html', usuarios=usuarios, companies=companies, roles=USER_ROLES,
+                           filters=filters, limit=limit, next_cursor=next_cursor, paginated='after_id' in request.args,
+                           deletions=[serialize_deletion(job) for job in deletions])
 
 @bp.route('/admin/usuarios/novo', methods=['GET','POST'])
 @login_required
@@ -525,12 +669,21 @@ def admin_usuario_novo():
                 db.session.add(company)
                 db.session.flush()
 
-        user = User(username=username, name=name, email=email, role=role, company=company)
+        user = User(name=name, email=email, role=role, company=company)
         user.set_password(password)
-        db.session.add(user)
-        db.session.commit()
-        register_log(f"Usuário criado: {username}")
-        flash('Usuário criado com sucesso!', 'success')
+        try:
+            # o username pedido (ou o derivado do email) ganha sufixo se já existir
+            add_user(user, (username or '').strip() or username_base(email=email))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            flash('Email já cadastrado', 'danger')
+            return redirect(url_for('app_bp.admin_usuario_novo'))
+        register_log(f"Usuário criado: {user.username}")
+        if user.username != username:
+            flash(f'Usuário criado com sucesso como "{user.username}"!', 'success')
+        else:
+            flash('Usuário criado com sucesso!', 'success')
         return redirect(url_for('app_bp.admin_usuarios'))
 
     # para o form, podemos passar lista de empresas existentes
@@ -547,6 +700,8 @@ def admin_usuario_editar(user_id):
 
     if request.method == 'POST':
         user.username = request.form.get('username')
+        if request.form.get('name') != user.name:
+            touch_blog(author_ids=[user.id])  # nome do autor no RSS
         user.name = request.form.get('name')
         user.email = request.form.get('email')
         user.role = request.form.get('role')
@@ -566,6 +721,7 @@ def admin_usuario_editar(user_id):
         if new_password:
             user.set_password(new_password)
 
+        user_cache.invalidate(user.id)
         db.session.commit()
         register_log(f"Usuário editado: {user.username}")
         flash('Usuário atualizado com sucesso!', 'success')
@@ -586,63 +742,67 @@ def admin_usuario_excluir(user_id):
         return redirect(url_for('app_bp.admin_usuarios'))
 
     user = User.query.get_or_404(user_id)
-    
-    try:
-        # 1. Primeiro, atualiza ou remove referências em outras tabelas
-        
-        # Atualiza kanban_card (define created_by para outro usuário admin ou remove os cards)
-        from sqlalchemy import text
-        admin_user = User.query.filter(User.role.in_(['admin', 'funcionarios'])).filter(User.id != user_id).first()
-        
-        if admin_user:
-            # Atualiza kanban_card para usar outro usuário admin
-            KanbanCard.query.filter_by(created_by=user_id).update({'created_by': admin_user.id})
-        else:
-            # Se não há outro admin, exclui os cards
-            KanbanCard.query.filter_by(created_by=user_id).delete()
-        
-        # Atualiza ou remove outras referências
-        BlogPost.query.filter_by(autor_id=user_id).delete()
-        Ticket.query.filter_by(usuario_id=user_id).delete()
-        Mensagem.query.filter_by(usuario_id=user_id).delete()
-        Log.query.filter_by(user_id=user_id).update({'user_id': None})
-        
-        # Atualiza demandas onde o usuário é owner
-        Demand.query.filter_by(owner_id=user_id).update({'owner_id': None})
-        
-        # Remove relacionamentos de colaborador se existir
-        collaborator = Collaborator.query.filter_by(user_id=user_id).first()
-        if collaborator:
-            collaborator.user_id = None
-        
-        # Remove organizações pessoais, demandas pessoais e lazer
-        Organization.query.filter_by(owner_id=user_id).delete()
-        PersonalDemand.query.filter_by(owner_id=user_id).delete()
-        Leisure.query.filter_by(owner_id=user_id).delete()
-        
-        # 2. Agora pode excluir o usuário
-        db.session.delete(user)
-        db.session.commit()
-        
-        register_log(f"Usuário excluído: {user.username}")
-        flash('Usuário excluído com sucesso!', 'success')
-        
-    except Exception as e:
-        db.session.rollback()
-        register_log(f"Erro ao excluir usuário {user.username}: {str(e)}", status="fail")
-        flash('Erro ao excluir usuário. Existem registros vinculados a este usuário.', 'danger')
-    
+    if user.deleted_at is not None:
+        flash('A exclusão deste usuário já está em andamento.', 'info')
+        return redirect(url_for('app_bp.admin_usuarios'))
+
+    # o usuário é desativado agora; as referências e a própria linha são
+    # removidas em lotes numa thread de fundo (progresso em UserDeletion).
+    # Depois de start() a linha pode já ter sumido: nada de ler `user`.
+    username = user.username
+    job = user_purger.schedule(user, requested_by=current_user.id)
+    db.session.commit()
+    user_purger.start(job.id)
+
+    register_log(f"Exclusão de usuário agendada: {username}")
+    flash('Usuário desativado. A exclusão dos dados vinculados está em andamento.', 'success')
     return redirect(url_for('app_bp.admin_usuarios'))
 
+@bp.route('/admin/usuarios/exclusoes/<int:job_id>')
+@login_required
+def admin_usuario_exclusao(job_id):
+    """Progresso de uma exclusão de usuário (consultado pela tela de gestão)"""
+    job = UserDeletion.query.get_or_404(job_id)
+    if not current_user.is_admin() and job.requested_by != current_user.id:
+        abort(403)
+    return jsonify(serialize_deletion(job))
+
 # auditar os log da plataforma
 @bp.route('/admin/logs')
 @login_required
 def admin_logs():
     if not current_user.is_admin():
         abort(403)
-    logs = Log.query.order_by(Log.created_at.desc()).limit(500).all()  # últimos 500
+    filters = {
+        'status': request.args.get('status') or None,
+        'user_id': request.args.get('user_id', type=int),
+        'company_id': request.args.get('company_id', type=int),
+        'start': request.args.get('start') or None,
+        'end': request.args.get('end') or None,
+    }
+    after = None
+    after_created_at = request.args.get('after_created_at')
+    after_id = request.args.get('after_id', type=int)
+    if after_created_at and after_id is not None:
+        try:
+            after = (datetime.fromisoformat(after_created_at), after_id)
+        except ValueError:
+            abort(400)
+
+    limit = request.args.get('limit', type=int)
+    logs, next_cursor = load_logs_page(
+        status=filters['status'],
+        user_id=filters['user_id'],
+        company_id=filters['company_id'],
+        start=parse_day(filters['start']),
+        end=parse_day(filters['end']),
+        limit=page_size(limit),
+        after=after
+    )
+    companies = db.session.query(Company.id, Company.name).order_by(Company.name).all()
     register_log("Acesso à página de auditoria/logs")
-    return render_template('admin/logs.html', logs=logs)
+    return render_template('admin/logs.html', logs=logs, companies=companies, statuses=LOG_STATUSES,
+                           filters=filters, limit=limit, next_cursor=next_cursor, paginated=after is not None)
 
 # metas institucionais
 @bp.route('/client/goals')
@@ -782,6 +942,33 @@ def new_collaborator():
     
     return redirect(url_for('app_bp.client_collaborators'))
 
+@bp.route('/client/collaborators/import', methods=['POST'])
+@login_required
+def import_collaborators():
+    """Importação em lote de colaboradores a partir de um arquivo .csv, .json ou .jsonl.
+
+    Colunas: nome/name e email obrigatórios; cargo/role e setor/sector
+    (nome ou id) opcionais. Devolve o relatório por linha em JSON.
+    """
+    if not current_user.is_cliente_adm() and not current_user.is_admin():
+        abort(403)
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({'error': 'Envie o arquivo no campo "file"'}), 400
+
+    importer = CollaboratorImport(current_user.company_id)
+    try:
+        report = importer.run(read_rows(upload))
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        # lotes anteriores ao erro já foram gravados; o relatório parcial indica quais
+        db.session.rollback()
+        return jsonify({'error': f'Arquivo inválido: {e}', **importer.report()}), 400
+
+    register_log(f"Importação de colaboradores: {report['created']} criados, {report['linked']} vinculados, "
+                 f"{report['skipped']} ignorados, {report['failed']} com erro")
+    return jsonify(report)
+
 @bp.route('/client/collaborators/<int:collab_id>/edit', methods=['POST'])
 @login_required
 def edit_collaborator(collab_id):
@@ -832,16 +1019,19 @@ def delete_collaborator(collab_id):
     # Remove o colaborador
     db.session.delete(collab)
     
-    # Remove o usuário se existir e pertencer à mesma empresa
-    if user:
-        db.session.delete(user)
-        flash('Colaborador e usuário excluídos com sucesso!', 'success')
-        register_log(f"Colaborador e usuário excluídos: {collab_name}")
+    # Remove o usuário se existir e pertencer à mesma empresa (mesmo caminho da gestão de usuários)
+    job = None
+    if user and user.deleted_at is None and user.id != current_user.id:
+        job = user_purger.schedule(user, requested_by=current_user.id)
+    
+    db.session.commit()
+    if job is not None:
+        user_purger.start(job.id)
+        flash('Colaborador excluído. O usuário foi desativado e seus dados estão sendo removidos.', 'success')
+        register_log(f"Colaborador excluído e exclusão de usuário agendada: {collab_name}")
     else:
         flash('Colaborador excluído com sucesso!', 'success')
         register_log(f"Colaborador excluído: {collab_name}")
-    
-    db.session.commit()
     return redirect(url_for('app_bp.client_collaborators'))
 
 # página de demandas
@@ -874,52 +1064,49 @@ def client_demands():
 @login_required
 def get_kanban_data(kanban_id):
     kanban = DemandKanban.query.filter_by(id=kanban_id, company_id=current_user.company_id).first_or_404()
-    
-    data = {
-        'id': kanban.id,
-        'name': kanban.name,
-        'columns': []
-    }
-    
-    for column in sorted(kanban.columns, key=lambda c: c.position):
-        column_data = {
-            'id': column.id,
-            'name': {'Backlog':'Pendências','To Do':'A Fazer','Doing':'Fazendo','Done':'Concluído'}.get(column.name, column.name),
-            'color': column.color,
-            'position': column.position,
-            'cards': []
-        }
-        
-        # Ordena os cards
-        for card in sorted(column.cards, key=lambda c: c.position):
-            card_data = {
-                'id': card.id,
-                'title': card.title,
-                'description': card.description,
-                'o_que_fazer': card.o_que_fazer,
-                'onde_fazer': card.onde_fazer,
-                'prazo': card.prazo.isoformat() if card.prazo else None,
-                'gravidade': card.gravidade,
-                'urgencia': card.urgencia,
-                'tendencia': card.tendencia,
-                'position': card.position,
-                'responsavel': {
-                    'id': card.quem_fazer_id,
-                    'name': card.responsavel.name if card.responsavel else None
-                } if card.quem_fazer_id else None,
-                'setor': {
-                    'id': card.setor_id,
-                    'name': card.setor.name if card.setor else None
-                } if card.setor_id else None,
-                'criador': card.criador.name,
-                'created_at': card.created_at.isoformat()
-            }
-            column_data['cards'].append(card_data)
-        
-        data['columns'].append(column_data)
-    
+
+    # ?since=<versão> devolve só o que mudou desde a última sincronização do cliente
+    since = request.args.get('since', type=int)
+    if since is not None:
+        data = load_board_changes(kanban, since)
+    else:
+        # colunas e cards (com nomes relacionados) em consultas fixas
+        data = load_board_data(kanban)
+
     return jsonify(data)
 
+@bp.route('/client/kanban/<int:kanban_id>/stream')
+@login_required
+def kanban_stream(kanban_id):
+    """Eventos do quadro em tempo real (Server-Sent Events)"""
+    DemandKanban.query.filter_by(id=kanban_id, company_id=current_user.company_id).first_or_404()
+
+    # conexão longa: devolve a conexão do banco antes de começar o stream
+    db.session.close()
+    return pubsub.response(kanban_channel(kanban_id))
+
+@bp.route('/client/kanban/priorities')
+@login_required
+def kanban_priorities():
+    """Fila de prioridade: cards abertos da empresa ordenados pela matriz GUT.
+
+    Filtros opcionais: sector_id, collaborator_id. Paginação por cursor com
+    limit (até MAX_PRIORITY_LIMIT) e after_score/after_id devolvidos em "next".
+    """
+    limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_PRIORITY_LIMIT)
+    after_score = request.args.get('after_score', type=int)
+    after_id = request.args.get('after_id', type=int)
+    after = (after_score, after_id) if after_score is not None and after_id is not None else None
+
+    cards, next_cursor = load_priority_cards(
+        current_user.company_id,
+        sector_id=request.args.get('sector_id', type=int),
+        collaborator_id=request.args.get('collaborator_id', type=int),
+        limit=limit,
+        after=after
+    )
+    return jsonify({'cards': cards, 'next': next_cursor})
+
 @bp.route('/client/kanban/new', methods=['POST'])
 @login_required
 def create_kanban():
@@ -967,6 +1154,7 @@ def create_kanban():
 def delete_kanban(kanban_id):
     kanban = DemandKanban.query.filter_by(id=kanban_id, company_id=current_user.company_id).first_or_404()
     
+    KanbanTombstone.query.filter_by(kanban_id=kanban.id).delete()
     db.session.delete(kanban)
     db.session.commit()
     
@@ -996,6 +1184,7 @@ def create_kanban_card():
     
     card = KanbanCard(
         column_id=column_id,
+        company_id=column.kanban.company_id,
         title=title,
         description=request.form.get('description'),
         o_que_fazer=o_que_fazer,
@@ -1007,6 +1196,7 @@ def create_kanban_card():
         tendencia=int(request.form.get('tendencia', 1)),
         created_by=current_user.id
     )
+    card.update_gut_score()
     
     # Prazo
     prazo_str = request.form.get('prazo')
@@ -1016,12 +1206,13 @@ def create_kanban_card():
         except ValueError:
             card.prazo = datetime.strptime(prazo_str, '%Y-%m-%d')
     
-    # Posição (última da coluna)
-    last_card = KanbanCard.query.filter_by(column_id=column_id).order_by(KanbanCard.position.desc()).first()
-    card.position = last_card.position + 1 if last_card else 0
+    # Posição (última da coluna), lida depois de pegar a trava do quadro
+    card.version = bump_board_version(column.kanban_id)
+    card.position = next_position(column_id)
     
     db.session.add(card)
     db.session.commit()
+    publish_board_event(column.kanban_id, 'card.created', card.version, id=card.id, column_id=card.column_id)
     
     flash('Card criado com sucesso!', 'success')
     register_log(f"Criou card: {title}")
@@ -1045,6 +1236,7 @@ def edit_kanban_card(card_id):
     card.gravidade = int(request.form.get('gravidade', card.gravidade))
     card.urgencia = int(request.form.get('urgencia', card.urgencia))
     card.tendencia = int(request.form.get('tendencia', card.tendencia))
+    card.update_gut_score()
     
     # Prazo
     prazo_str = request.form.get('prazo')
@@ -1056,7 +1248,10 @@ def edit_kanban_card(card_id):
     else:
         card.prazo = None
     
+    kanban_id = card.column.kanban_id
+    card.version = bump_board_version(kanban_id)
     db.session.commit()
+    publish_board_event(kanban_id, 'card.updated', card.version, id=card.id, column_id=card.column_id)
     
     flash('Card atualizado com sucesso!', 'success')
     register_log(f"Editou card: {card.title}")
@@ -1070,8 +1265,12 @@ def delete_kanban_card(card_id):
     if card.column.kanban.company_id != current_user.company_id:
         abort(403)
     
+    kanban_id = card.column.kanban_id
+    version = bump_board_version(kanban_id)
+    record_deletion(kanban_id, 'card', card.id, version)
     db.session.delete(card)
     db.session.commit()
+    publish_board_event(kanban_id, 'card.deleted', version, id=card_id)
     
     flash('Card deletado com sucesso!', 'success')
     register_log(f"Deletou card: {card.title}")
@@ -1086,49 +1285,67 @@ def move_kanban_card(card_id):
         abort(403)
     
     new_column_id = request.json.get('column_id')
-    new_position = request.json.get('position', 0)
+    try:
+        new_position = int(request.json.get('position', 0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'position deve ser um índice inteiro'}), 400
     
     new_column = KanbanColumn.query.get_or_404(new_column_id)
     
     if new_column.kanban.id != card.column.kanban.id:
         abort(400, 'Cannot move card to different kanban board')
     
-    # Atualizar posições dos outros cards na coluna original
-    if card.column_id != new_column_id:
-        cards_in_old_column = KanbanCard.query.filter_by(column_id=card.column_id).filter(KanbanCard.position > card.position).all()
-        for c in cards_in_old_column:
-            c.position -= 1
-    
-    # Atualizar posições dos cards na nova coluna
-    cards_in_new_column = KanbanCard.query.filter_by(column_id=new_column_id).filter(KanbanCard.position >= new_position).all()
-    for c in cards_in_new_column:
-        c.position += 1
-    
-    card.column_id = new_column_id
-    card.position = new_position
+    # Só o card movido é gravado: a nova posição fica entre os vizinhos do índice pedido
+    version = bump_board_version(new_column.kanban_id)
+    card.position = position_for_index(new_column.id, new_position, exclude_card_id=card.id)
+    card.column_id = new_column.id
+    card.version = version
     
     db.session.commit()
+    publish_board_event(new_column.kanban_id, 'card.moved', version, id=card.id, column_id=card.column_id, position=card.position)
     
     return jsonify({'success': True})
 
 @bp.route('/client/kanban/columns/<int:column_id>/reorder', methods=['POST'])
 @login_required
 def reorder_kanban_cards(column_id):
+    """Reordena os cards de uma coluna.
+
+    Corpo: {"card_order": [ids na nova ordem]}, com no máximo MAX_REORDER_CARDS
+    ids. Ids que não pertencem à coluna são devolvidos em "invalid_ids" e,
+    nesse caso, nenhuma posição é alterada.
+    """
     column = KanbanColumn.query.get_or_404(column_id)
     
     if column.kanban.company_id != current_user.company_id:
         abort(403)
     
     card_order = request.json.get('card_order', [])
-    
-    for index, card_id in enumerate(card_order):
-        card = KanbanCard.query.get(card_id)
-        if card and card.column_id == column_id:
-            card.position = index
-    
+
+    if not isinstance(card_order, list) or len(card_order) > MAX_REORDER_CARDS:
+        return jsonify({'success': False, 'error': f'card_order deve ser uma lista com até {MAX_REORDER_CARDS} ids'}), 400
+    try:
+        card_order = [int(card_id) for card_id in card_order]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'card_order deve conter apenas ids inteiros'}), 400
+    if len(set(card_order)) != len(card_order):
+        return jsonify({'success': False, 'error': 'card_order contém ids repetidos'}), 400
+
+    # validação e escrita em lote, numa única transação
+    invalid_ids = reorder_column(column, card_order)
+    if invalid_ids:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'error': 'Alguns cards não pertencem a esta coluna',
+            'invalid_ids': invalid_ids
+        }), 400
+
     db.session.commit()
-    
-    return jsonify({'success': True})
+    if card_order:
+        publish_board_event(column.kanban_id, 'cards.reordered', column.kanban.version, column_id=column.id)
+
+    return jsonify({'success': True, 'updated': len(card_order)})
 
 # Página para eventos
 @bp.route('/client/events')
@@ -1146,17 +1363,157 @@ def client_calendar():
     if not current_user.is_cliente_adm() and not current_user.is_admin() and not current_user.is_funcionario() and not current_user.is_cliente():
         abort(403)
     
-    events = Event.query.filter_by(company_id=current_user.company_id).order_by(Event.start_at.asc()).all()
+    # os eventos são carregados pelo calendar.js via GET /api/events, só para a janela visível
     collaborators = Collaborator.query.filter_by(company_id=current_user.company_id).all()
     sectors = Sector.query.filter_by(company_id=current_user.company_id).all()
     
+    feed_url = url_for('app_bp.calendar_feed', token=feed_token(current_user.company_id), _external=True)
+    
     register_log("Acesso: cliente_adm - calendar")
     return render_template('client/calendar.html', 
-                         events=events,
                          collaborators=collaborators,
-                         sectors=sectors)
+                         sectors=sectors,
+                         feed_url=feed_url)
+
+@bp.route('/calendar/feed/<token>.ics')
+def calendar_feed(token):
+    """Feed iCalendar assinável (Outlook, Google Agenda...).
+
+    Sem login: o token assinado identifica empresa e escopo. Clientes que
+    repetem o ETag/Last-Modified recebem 304 sem que nenhum evento seja lido,
+    e o corpo é gerado uma vez por versão da agenda.
+    """
+    feed = read_feed_token(token)
+    if feed is None:
+        abort(404)
+    company_id, scope, scope_id = feed
+    state = feed_state(company_id)
+    if state is None:
+        abort(404)
+    version, updated_at = state
+
+    etag = feed_etag(company_id, scope, scope_id, version)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains(etag)
+    else:
+        not_modified = bool(updated_at and request.if_modified_since
+                            and updated_at.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None))
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        body = cached_feed(company_id, scope, scope_id, version)
+        response = current_app.response_class(body, mimetype='text/calendar')
+        response.headers['Content-Disposition'] = 'inline; filename="agenda.ics"'
+    response.set_etag(etag)
+    if updated_at:
+        response.last_modified = updated_at.replace(tzinfo=timezone.utc)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@bp.route('/api/calendar/feed-url')
+@login_required
+def calendar_feed_url():
+    """URL do feed .ics da empresa, de um setor (?setor_id=) ou de um responsável (?responsavel_id=)"""
+    if request.args.get('setor_id'):
+        sector = Sector.query.filter_by(id=request.args.get('setor_id', type=int), company_id=current_user.company_id).first_or_404()
+        token = feed_token(current_user.company_id, 'setor', sector.id)
+    elif request.args.get('responsavel_id'):
+        collaborator = Collaborator.query.filter_by(id=request.args.get('responsavel_id', type=int), company_id=current_user.company_id).first_or_404()
+        token = feed_token(current_user.company_id, 'responsavel', collaborator.id)
+    else:
+        token = feed_token(current_user.company_id)
+    return jsonify({'url': url_for('app_bp.calendar_feed', token=token, _external=True)})
 
 # ROTAS API PARA CRUD
+@bp.route('/api/events', methods=['GET'])
+@login_required
+def list_events():
+    """Eventos que se sobrepõem à janela ?start=&end= (datas ISO 8601)"""
+    try:
+        start = parse_datetime(request.args['start'])
+        end = parse_datetime(request.args['end'])
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Parâmetros start e end (ISO 8601) são obrigatórios'}), 400
+
+    if end <= start or end - start > MAX_EVENTS_WINDOW:
+        return jsonify({'error': f'Janela inválida (máximo de {MAX_EVENTS_WINDOW.days} dias)'}), 400
+
+    occurrences = occurrences_in_window(current_user.company_id, start, end)
+    return jsonify({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'events': [serialize_occurrence(event, occ_start, occ_end) for event, occ_start, occ_end in occurrences]
+    })
+
+@bp.route('/api/events/conflicts', methods=['POST'])
+@login_required
+def check_event_conflicts():
+    """Conflitos de agenda de responsável/setor para um evento proposto.
+
+    Corpo: o mesmo payload de POST /api/events (mais exclude_id numa edição)
+    ou {"events": [...]} com até MAX_CONFLICT_BATCH eventos, verificados
+    contra uma única consulta.
+    """
+    data = request.get_json(silent=True) or {}
+    batch = 'events' in data
+    payloads = data['events'] if batch else [data]
+    if not isinstance(payloads, list) or len(payloads) > MAX_CONFLICT_BATCH:
+        return jsonify({'error': f'events deve ser uma lista com até {MAX_CONFLICT_BATCH} eventos'}), 400
+    try:
+        items = [conflict_item(payload) for payload in payloads]
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    results = find_conflicts(current_user.company_id, items)
+    if batch:
+        return jsonify({'results': [{'index': index, 'conflicts': conflicts} for index, conflicts in enumerate(results)]})
+    return jsonify({'conflicts': results[0]})
+
+@bp.route('/api/events/freebusy', methods=['GET'])
+@login_required
+def event_free_busy():
+    """Ocupação dos responsáveis na janela e o primeiro horário livre comum.
+
+    Parâmetros: responsavel_ids=1,2,3, start, end (ISO 8601) e, para a
+    busca de horário, duration (minutos), day_start/day_end (HH:MM locais)
+    e tz_offset (minutos em relação a UTC, ex.: -180).
+    """
+    try:
+        responsavel_ids = sorted({int(value) for value in request.args['responsavel_ids'].split(',') if value.strip()})
+        start = parse_datetime(request.args['start'])
+        end = parse_datetime(request.args['end'])
+        duration = request.args.get('duration', type=int)
+        tz_offset = timedelta(minutes=request.args.get('tz_offset', 0, type=int))
+        day_start = day_end = None
+        if request.args.get('day_start') or request.args.get('day_end'):
+            day_start = datetime.strptime(request.args.get('day_start', '00:00'), '%H:%M') - datetime(1900, 1, 1)
+            day_end = datetime.strptime(request.args.get('day_end', '23:59'), '%H:%M') - datetime(1900, 1, 1)
+    except (KeyError, ValueError):
+        return jsonify({'error': 'Parâmetros inválidos: responsavel_ids, start e end são obrigatórios'}), 400
+
+    if not responsavel_ids or len(responsavel_ids) > MAX_FREEBUSY_COLLABORATORS:
+        return jsonify({'error': f'Informe de 1 a {MAX_FREEBUSY_COLLABORATORS} responsáveis'}), 400
+    if end <= start or end - start > MAX_EVENTS_WINDOW:
+        return jsonify({'error': f'Janela inválida (máximo de {MAX_EVENTS_WINDOW.days} dias)'}), 400
+    if duration is not None and duration <= 0:
+        return jsonify({'error': 'duration deve ser positivo (minutos)'}), 400
+    if day_start is not None and day_start >= day_end:
+        return jsonify({'error': 'day_start deve ser anterior a day_end'}), 400
+
+    known = Collaborator.query.filter(
+        Collaborator.company_id == current_user.company_id,
+        Collaborator.id.in_(responsavel_ids)
+    ).count()
+    if known != len(responsavel_ids):
+        abort(404)
+
+    return jsonify(free_busy(
+        current_user.company_id, responsavel_ids, start, end,
+        duration=timedelta(minutes=duration) if duration else None,
+        day_start=day_start, day_end=day_end, tz_offset=tz_offset
+    ))
+
 @bp.route('/api/events', methods=['POST'])
 @login_required
 def create_event():
@@ -1164,6 +1521,19 @@ def create_event():
         return jsonify({'error': 'Não autorizado'}), 403
     
     data = request.get_json()
+    try:
+        recurrence = parse_recurrence(data.get('recurrence'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if data.get('check_conflicts'):
+        # modo de validação opcional: recusa o evento se o responsável/setor já estiver ocupado
+        try:
+            conflicts = find_conflicts(current_user.company_id, [conflict_item(data)])[0]
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if conflicts:
+            return jsonify({'error': 'Conflito de agenda', 'conflicts': conflicts}), 409
     
     event = Event(
         company_id=current_user.company_id,
@@ -1174,10 +1544,12 @@ def create_event():
         responsavel_id=data.get('responsavel_id'),
         setor_id=data.get('setor_id'),
         cor=data.get('cor', '#3b82f6'),
-        tipo=data.get('tipo', 'evento')
+        tipo=data.get('tipo', 'evento'),
+        **recurrence
     )
     
     db.session.add(event)
+    touch_calendar(event.company_id)
     db.session.commit()
     
     return jsonify({'success': True, 'event': {
@@ -1185,7 +1557,8 @@ def create_event():
         'title': event.title,
         'start': event.start_at.isoformat(),
         'end': event.end_at.isoformat() if event.end_at else None,
-        'color': event.cor
+        'color': event.cor,
+        'recurrence': serialize_recurrence(event)
     }})
 
 @bp.route('/api/events/<int:event_id>', methods=['PUT'])
@@ -1194,6 +1567,22 @@ def update_event(event_id):
     event = Event.query.filter_by(id=event_id, company_id=current_user.company_id).first_or_404()
     
     data = request.get_json()
+    if data.get('check_conflicts'):
+        try:
+            conflicts = find_conflicts(current_user.company_id, [conflict_item(data, exclude_id=event.id)])[0]
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        if conflicts:
+            return jsonify({'error': 'Conflito de agenda', 'conflicts': conflicts}), 409
+
+    if 'recurrence' in data:
+        # sem a chave a regra atual é mantida; null remove a recorrência
+        try:
+            for field, value in parse_recurrence(data['recurrence']).items():
+                setattr(event, field, value)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
     event.title = data['title']
     event.description = data.get('description')
     event.start_at = datetime.fromisoformat(data['start_at'])
@@ -1202,6 +1591,7 @@ def update_event(event_id):
     event.setor_id = data.get('setor_id')
     event.cor = data.get('cor', event.cor)
     
+    touch_calendar(event.company_id)
     db.session.commit()
     
     return jsonify({'success': True})
@@ -1209,9 +1599,22 @@ def update_event(event_id):
 @bp.route('/api/events/<int:event_id>', methods=['DELETE'])
 @login_required
 def delete_event(event_id):
+    """Exclui o evento; com ?occurrence=YYYY-MM-DD exclui só aquela ocorrência da série"""
     event = Event.query.filter_by(id=event_id, company_id=current_user.company_id).first_or_404()
+
+    occurrence = request.args.get('occurrence')
+    if occurrence and event.recurrence_freq:
+        try:
+            day = datetime.fromisoformat(occurrence[:10]).date()
+        except ValueError:
+            return jsonify({'error': 'occurrence deve ser uma data YYYY-MM-DD'}), 400
+        exclude_occurrence(event, day)
+        touch_calendar(event.company_id)
+        db.session.commit()
+        return jsonify({'success': True})
     
     db.session.delete(event)
+    touch_calendar(event.company_id)
     db.session.commit()
     
     return jsonify({'success': True})
@@ -1226,100 +1629,8 @@ def my_demands():
     if not current_user.company_id:
         abort(403, "Usuário não está associado a uma empresa")
     
-    # Buscar quadros kanban da empresa do usuário
-    kanban_boards = DemandKanban.query.filter_by(company_id=current_user.company_id).all()
-    
-    # Função auxiliar para verificar acesso
-    def check_user_company_access(user, company_id):
-        """Verifica se o usuário tem acesso à empresa especificada"""
-        if user.is_admin():
-            return True  # Admin tem acesso a tudo
-        return user.company_id == company_id
-    
-    # Filtrar quadros acessíveis
-    accessible_boards = []
-    for board in kanban_boards:
-        if check_user_company_access(current_user, board.company_id):
-            accessible_boards.append(board)
-    
-    # Para cada quadro acessível, filtrar apenas cards onde o usuário está envolvido
-    filtered_boards = []
-    for board in accessible_boards:
-        # Criar uma cópia "filtrada" do quadro
-        filtered_board = {
-            'id': board.id,
-            'name': board.name,
-            'description': board.description,
-            'columns': []
-        }
-        
-        for column in sorted(board.columns, key=lambda c: c.position):
-            # Filtrar cards: onde o usuário é responsável OU criador
-            filtered_cards = []
-            for card in column.cards:
-                # Verificar se o usuário está envolvido no card
-                is_responsible = (card.quem_fazer_id and 
-                                 card.responsavel and 
-                                 card.responsavel.user_id == current_user.id)
-                is_creator = (card.created_by == current_user.id)
-                
-                if is_responsible or is_creator:
-                    # Converter o card para dicionário serializável
-                    card_dict = {
-                        'id': card.id,
-                        'title': card.title,
-                        'description': card.description,
-                        'o_que_fazer': card.o_que_fazer,
-                        'onde_fazer': card.onde_fazer,
-                        'prazo': card.prazo.isoformat() if card.prazo else None,
-                        'gravidade': card.gravidade,
-                        'urgencia': card.urgencia,
-                        'tendencia': card.tendencia,
-                        'position': card.position,
-                        'created_by': card.created_by,
-                        'created_at': card.created_at.isoformat(),
-                        'column_id': column.id
-                    }
-                    
-                    # Adicionar informações do responsável se existir
-                    if card.responsavel:
-                        card_dict['responsavel'] = {
-                            'id': card.responsavel.id,
-                            'name': card.responsavel.name,
-                            'user_id': card.responsavel.user_id
-                        }
-                    else:
-                        card_dict['responsavel'] = None
-                    
-                    # Adicionar informações do setor se existir
-                    if card.setor:
-                        card_dict['setor'] = {
-                            'id': card.setor.id,
-                            'name': card.setor.name
-                        }
-                    else:
-                        card_dict['setor'] = None
-                    
-                    # Adicionar informações do criador
-                    card_dict['criador'] = {
-                        'id': card.criador.id,
-                        'name': card.criador.name
-                    }
-                    
-                    filtered_cards.append(card_dict)
-            
-            if filtered_cards:  # Só incluir coluna se tiver cards relevantes
-                filtered_column = {
-                    'id': column.id,
-                    'name': column.name,
-                    'color': column.color,
-                    'position': column.position,
-                    'cards': filtered_cards
-                }
-                filtered_board['columns'].append(filtered_column)
-        
-        if filtered_board['columns']:  # Só incluir quadro se tiver colunas com cards
-            filtered_boards.append(filtered_board)
+    # Quadros da empresa com apenas os cards onde o usuário é responsável OU criador
+    filtered_boards = load_user_boards(current_user)
     
     collaborators = Collaborator.query.filter_by(company_id=current_user.company_id).all()
     sectors = Sector.query.filter_by(company_id=current_user.company_id).all()
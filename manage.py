@@ -1,13 +1,27 @@
-from flask import Flask, render_template, request
+from flask import Flask, render_template
 from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, current_user
+from flask_login import LoginManager
+from app.audit import AuditLogWriter
+from app.pubsub import PubSub
+from app.user_cache import UserCache
+from app.throttle import LoginThrottle
+from app.user_deletion import UserPurger
+from app.page_cache import PageCache
+from app.accounts import PasswordHasher
 
 
 db = SQLAlchemy()
 migrate = Migrate()
 login = LoginManager()
 login.login_view = 'app_bp.login'
+audit_log = AuditLogWriter()
+pubsub = PubSub()
+user_cache = UserCache()
+login_throttle = LoginThrottle()
+user_purger = UserPurger()
+page_cache = PageCache()
+password_hasher = PasswordHasher()
 
 class Config:
     # Default to sqlite for quick start; override via env var FLASK_DATABASE_URI
@@ -16,19 +30,8 @@ class Config:
     SECRET_KEY = "dev-secret-key"  # override in production via env var
 
 def register_error_handlers(app):
-    from models import Log
-
-    def register_log(action, status="ok"):
-        user_id = current_user.id if current_user.is_authenticated else None
-        ip_address = request.remote_addr
-        log = Log(
-            user_id=user_id,
-            action=action,
-            ip_address=ip_address,
-            status=status
-        )
-        db.session.add(log)
-        db.session.commit()
+    from app.utils import register_log
+
     @app.errorhandler(403)
     def forbidden(e):
         register_log(f"Ocorreu um erro 403, {str(e)}", "fail")
@@ -52,14 +55,21 @@ def create_app(config_object=None):
     db.init_app(app)
     migrate.init_app(app, db)
     login.init_app(app)
+    audit_log.init_app(app)
+    pubsub.init_app(app)
+    user_cache.init_app(app)
+    login_throttle.init_app(app)
+    user_purger.init_app(app)
+    page_cache.init_app(app)
+    password_hasher.init_app(app)
 
     # import aqui para evitar circular import
     from models import User
 
-    # 🔑 registrar user_loader
+    # 🔑 registrar user_loader (snapshot em cache, sem consulta por requisição)
     @login.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return user_cache.load(user_id)
 
     # register blueprints
     from app.views import bp as app_bp
@@ -67,6 +77,9 @@ def create_app(config_object=None):
     app.register_blueprint(app_bp)
     app.register_blueprint(api_bp, url_prefix='/api')
 
+    from app.blog_search import blog_cli
+    app.cli.add_command(blog_cli)
+
     # configurações adicionais
     app.config['MAX_CONTENT_LENGTH'] = 2 * 1024 * 1024
     register_error_handlers(app)
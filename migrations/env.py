@@ -90,9 +90,17 @@ def run_migrations_online():
                 directives[:] = []
                 logger.info('No changes in schema detected.')
 
+    # o índice FTS5 do blog (tabela virtual e tabelas-sombra) é criado por SQL
+    # próprio e não está nos modelos: fica fora da comparação do autogenerate
+    def include_name(name, type_, parent_names):
+        if type_ == 'table':
+            return not name.startswith('blog_post_fts')
+        return True
+
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_name", include_name)
 
     connectable = get_engine()
 
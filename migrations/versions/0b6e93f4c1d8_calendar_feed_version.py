@@ -0,0 +1,28 @@
+"""versão da agenda em company para os feeds .ics
+
+Revision ID: 0b6e93f4c1d8
+Revises: f5c81d2a9e37
+Create Date: 2026-10-18 15:02:17.448120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e93f4c1d8'
+down_revision = 'f5c81d2a9e37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('company', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('calendar_version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('calendar_updated_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('company', schema=None) as batch_op:
+        batch_op.drop_column('calendar_updated_at')
+        batch_op.drop_column('calendar_version')
@@ -0,0 +1,28 @@
+"""índices de intervalo por responsável e setor em event
+
+Revision ID: 7d2f4a8c5b96
+Revises: 0b6e93f4c1d8
+Create Date: 2026-10-18 15:47:33.610254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2f4a8c5b96'
+down_revision = '0b6e93f4c1d8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.create_index('ix_event_responsavel_interval', ['responsavel_id', 'start_at', 'end_at'], unique=False)
+        batch_op.create_index('ix_event_setor_interval', ['setor_id', 'start_at', 'end_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_setor_interval')
+        batch_op.drop_index('ix_event_responsavel_interval')
@@ -0,0 +1,38 @@
+"""índices das listagens administrativas de user e log
+
+Revision ID: 9c3e5a1d7f20
+Revises: 7d2f4a8c5b96
+Create Date: 2026-10-18 16:32:05.184227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3e5a1d7f20'
+down_revision = '7d2f4a8c5b96'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('log', schema=None) as batch_op:
+        batch_op.create_index('ix_log_created_at', ['created_at', 'id'], unique=False)
+        batch_op.create_index('ix_log_user_created_at', ['user_id', 'created_at', 'id'], unique=False)
+        batch_op.create_index('ix_log_status_created_at', ['status', 'created_at', 'id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index('ix_user_company_id', ['company_id', 'id'], unique=False)
+        batch_op.create_index('ix_user_role_id', ['role', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_role_id')
+        batch_op.drop_index('ix_user_company_id')
+
+    with op.batch_alter_table('log', schema=None) as batch_op:
+        batch_op.drop_index('ix_log_status_created_at')
+        batch_op.drop_index('ix_log_user_created_at')
+        batch_op.drop_index('ix_log_created_at')
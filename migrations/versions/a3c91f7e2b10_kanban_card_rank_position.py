@@ -0,0 +1,58 @@
+"""kanban_card.position como rank fracionário
+
+Revision ID: a3c91f7e2b10
+Revises: 5895fb1def3f
+Create Date: 2026-10-18 10:02:41.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3c91f7e2b10'
+down_revision = '5895fb1def3f'
+branch_labels = None
+depends_on = None
+
+
+def _renumber(start, step):
+    # reescreve as posições de cada coluna em sequência, preservando a ordem atual
+    conn = op.get_bind()
+    rows = conn.execute(sa.text(
+        "SELECT id, column_id FROM kanban_card ORDER BY column_id, position, id"
+    )).fetchall()
+
+    updates = []
+    current_column, index = None, 0
+    for card_id, column_id in rows:
+        if column_id != current_column:
+            current_column, index = column_id, 0
+        updates.append({'id': card_id, 'position': start + index * step})
+        index += 1
+
+    if updates:
+        conn.execute(sa.text("UPDATE kanban_card SET position = :position WHERE id = :id"), updates)
+
+
+def upgrade():
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.alter_column('position',
+               existing_type=sa.Integer(),
+               type_=sa.Float(),
+               existing_nullable=True)
+        batch_op.create_index('ix_kanban_card_column_position', ['column_id', 'position'], unique=False)
+
+    # posições inteiras (com buracos/duplicadas) viram 1.0, 2.0, 3.0... por coluna
+    _renumber(1.0, 1.0)
+
+
+def downgrade():
+    _renumber(0, 1)
+
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.drop_index('ix_kanban_card_column_position')
+        batch_op.alter_column('position',
+               existing_type=sa.Float(),
+               type_=sa.Integer(),
+               existing_nullable=True)
@@ -0,0 +1,50 @@
+"""exclusão de usuários em segundo plano: user.deleted_at e user_deletion
+
+Revision ID: a81f2c6d9e43
+Revises: 9c3e5a1d7f20
+Create Date: 2026-10-18 17:10:42.518390
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a81f2c6d9e43'
+down_revision = '9c3e5a1d7f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('user_deletion',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(length=50), nullable=False),
+    sa.Column('requested_by', sa.Integer(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('step', sa.String(length=50), nullable=True),
+    sa.Column('steps_done', sa.Integer(), nullable=False),
+    sa.Column('steps_total', sa.Integer(), nullable=False),
+    sa.Column('rows_processed', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('user_deletion', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_deletion_user_id'), ['user_id'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('deleted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('deleted_at')
+
+    with op.batch_alter_table('user_deletion', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_deletion_user_id'))
+
+    op.drop_table('user_deletion')
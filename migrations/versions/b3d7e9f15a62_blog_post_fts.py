@@ -0,0 +1,42 @@
+"""índice FTS5 de busca do blog
+
+Revision ID: b3d7e9f15a62
+Revises: a81f2c6d9e43
+Create Date: 2026-10-18 17:58:26.044731
+
+O índice é preenchido com o conteúdo atual dos posts (ainda com HTML);
+`flask blog reindex` regrava o texto limpo.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3d7e9f15a62'
+down_revision = 'a81f2c6d9e43'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS blog_post_fts USING fts5("
+        "titulo, resumo, conteudo, tokenize='unicode61 remove_diacritics 2')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS blog_post_fts_delete AFTER DELETE ON blog_post BEGIN "
+        "DELETE FROM blog_post_fts WHERE rowid = old.id; END"
+    )
+    op.execute(
+        "INSERT INTO blog_post_fts (rowid, titulo, resumo, conteudo) "
+        "SELECT id, titulo, coalesce(resumo, ''), conteudo FROM blog_post"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    op.execute("DROP TRIGGER IF EXISTS blog_post_fts_delete")
+    op.execute("DROP TABLE IF EXISTS blog_post_fts")
@@ -0,0 +1,58 @@
+"""versões e tombstones para sincronização incremental do kanban
+
+Revision ID: b7e2d4a91c35
+Revises: a3c91f7e2b10
+Create Date: 2026-10-18 11:14:07.530981
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2d4a91c35'
+down_revision = 'a3c91f7e2b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('kanban_tombstone',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kanban_id', sa.Integer(), nullable=False),
+    sa.Column('entity', sa.String(length=20), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['kanban_id'], ['demand_kanban.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('kanban_tombstone', schema=None) as batch_op:
+        batch_op.create_index('ix_kanban_tombstone_kanban_version', ['kanban_id', 'version'], unique=False)
+
+    with op.batch_alter_table('demand_kanban', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('kanban_column', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.create_index('ix_kanban_card_column_version', ['column_id', 'version'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.drop_index('ix_kanban_card_column_version')
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('kanban_column', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('demand_kanban', schema=None) as batch_op:
+        batch_op.drop_column('version')
+
+    with op.batch_alter_table('kanban_tombstone', schema=None) as batch_op:
+        batch_op.drop_index('ix_kanban_tombstone_kanban_version')
+
+    op.drop_table('kanban_tombstone')
@@ -0,0 +1,34 @@
+"""índices para a visão individual de demandas
+
+Revision ID: c4f18a6d0e27
+Revises: b7e2d4a91c35
+Create Date: 2026-10-18 12:03:55.402117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4f18a6d0e27'
+down_revision = 'b7e2d4a91c35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_kanban_card_created_by'), ['created_by'], unique=False)
+        batch_op.create_index(batch_op.f('ix_kanban_card_quem_fazer_id'), ['quem_fazer_id'], unique=False)
+
+    with op.batch_alter_table('collaborator', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_collaborator_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('collaborator', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_collaborator_user_id'))
+
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_kanban_card_quem_fazer_id'))
+        batch_op.drop_index(batch_op.f('ix_kanban_card_created_by'))
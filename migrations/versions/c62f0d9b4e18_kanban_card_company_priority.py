@@ -0,0 +1,50 @@
+"""kanban_card.company_id e índices da fila de prioridade por empresa
+
+Revision ID: c62f0d9b4e18
+Revises: be7801a5b077
+Create Date: 2026-10-18 20:12:40.518271
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c62f0d9b4e18'
+down_revision = 'be7801a5b077'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('company_id', sa.Integer(), nullable=True))
+
+    op.execute(
+        "UPDATE kanban_card SET company_id = ("
+        "SELECT demand_kanban.company_id FROM kanban_column "
+        "JOIN demand_kanban ON demand_kanban.id = kanban_column.kanban_id "
+        "WHERE kanban_column.id = kanban_card.column_id)"
+    )
+
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.alter_column('company_id', existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key('fk_kanban_card_company_id_company', 'company', ['company_id'], ['id'])
+        batch_op.drop_index('ix_kanban_card_quem_fazer_gut_score')
+        batch_op.drop_index('ix_kanban_card_setor_gut_score')
+        batch_op.drop_index('ix_kanban_card_gut_score')
+        batch_op.create_index('ix_kanban_card_company_gut_score', ['company_id', 'gut_score', 'id'], unique=False)
+        batch_op.create_index('ix_kanban_card_company_setor_gut_score', ['company_id', 'setor_id', 'gut_score', 'id'], unique=False)
+        batch_op.create_index('ix_kanban_card_company_quem_fazer_gut_score', ['company_id', 'quem_fazer_id', 'gut_score', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.drop_index('ix_kanban_card_company_quem_fazer_gut_score')
+        batch_op.drop_index('ix_kanban_card_company_setor_gut_score')
+        batch_op.drop_index('ix_kanban_card_company_gut_score')
+        batch_op.create_index('ix_kanban_card_gut_score', ['gut_score', 'id'], unique=False)
+        batch_op.create_index('ix_kanban_card_setor_gut_score', ['setor_id', 'gut_score', 'id'], unique=False)
+        batch_op.create_index('ix_kanban_card_quem_fazer_gut_score', ['quem_fazer_id', 'gut_score', 'id'], unique=False)
+        batch_op.drop_constraint('fk_kanban_card_company_id_company', type_='foreignkey')
+        batch_op.drop_column('company_id')
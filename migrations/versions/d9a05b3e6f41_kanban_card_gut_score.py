@@ -0,0 +1,39 @@
+"""kanban_card.gut_score persistido e indexado
+
+Revision ID: d9a05b3e6f41
+Revises: c4f18a6d0e27
+Create Date: 2026-10-18 12:47:19.884023
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd9a05b3e6f41'
+down_revision = 'c4f18a6d0e27'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('gut_score', sa.Integer(), nullable=False, server_default='1'))
+
+    op.execute(
+        "UPDATE kanban_card SET gut_score = "
+        "COALESCE(gravidade, 1) * COALESCE(urgencia, 1) * COALESCE(tendencia, 1)"
+    )
+
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.create_index('ix_kanban_card_gut_score', ['gut_score', 'id'], unique=False)
+        batch_op.create_index('ix_kanban_card_setor_gut_score', ['setor_id', 'gut_score', 'id'], unique=False)
+        batch_op.create_index('ix_kanban_card_quem_fazer_gut_score', ['quem_fazer_id', 'gut_score', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('kanban_card', schema=None) as batch_op:
+        batch_op.drop_index('ix_kanban_card_quem_fazer_gut_score')
+        batch_op.drop_index('ix_kanban_card_setor_gut_score')
+        batch_op.drop_index('ix_kanban_card_gut_score')
+        batch_op.drop_column('gut_score')
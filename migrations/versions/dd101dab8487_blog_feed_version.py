@@ -0,0 +1,31 @@
+"""blog_state: versão do blog para o cache do sitemap e do RSS
+
+Revision ID: dd101dab8487
+Revises: c62f0d9b4e18
+Create Date: 2026-10-18 10:31:47.838783
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'dd101dab8487'
+down_revision = 'c62f0d9b4e18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    blog_state = op.create_table('blog_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # linha única usada por app/blog.py (BLOG_STATE_ID)
+    op.bulk_insert(blog_state, [{'id': 1, 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('blog_state')
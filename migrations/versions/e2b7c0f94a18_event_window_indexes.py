@@ -0,0 +1,28 @@
+"""índices de janela de datas em event
+
+Revision ID: e2b7c0f94a18
+Revises: d9a05b3e6f41
+Create Date: 2026-10-18 13:36:02.271590
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b7c0f94a18'
+down_revision = 'd9a05b3e6f41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.create_index('ix_event_company_start_at', ['company_id', 'start_at'], unique=False)
+        batch_op.create_index('ix_event_company_end_at', ['company_id', 'end_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_company_end_at')
+        batch_op.drop_index('ix_event_company_start_at')
@@ -0,0 +1,36 @@
+"""regras de recorrência em event
+
+Revision ID: f5c81d2a9e37
+Revises: e2b7c0f94a18
+Create Date: 2026-10-18 14:21:48.903615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c81d2a9e37'
+down_revision = 'e2b7c0f94a18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('recurrence_freq', sa.String(length=10), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_interval', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('recurrence_until', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_count', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('recurrence_exdates', sa.Text(), nullable=True))
+        batch_op.create_index('ix_event_company_recurrence', ['company_id', 'recurrence_freq', 'start_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('event', schema=None) as batch_op:
+        batch_op.drop_index('ix_event_company_recurrence')
+        batch_op.drop_column('recurrence_exdates')
+        batch_op.drop_column('recurrence_count')
+        batch_op.drop_column('recurrence_until')
+        batch_op.drop_column('recurrence_interval')
+        batch_op.drop_column('recurrence_freq')
@@ -1,3 +1,4 @@
+import json
 from datetime import datetime
 from manage import db
 from flask_login import UserMixin
@@ -9,11 +10,19 @@ class Company(db.Model):
     name = db.Column(db.String(200), unique=True, nullable=False)
     slug = db.Column(db.String(200), unique=True, nullable=True)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    # versão da agenda: incrementada a cada alteração de evento (ETag dos feeds .ics)
+    calendar_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    calendar_updated_at = db.Column(db.DateTime, nullable=True)
 
     users = db.relationship('User', backref='company', lazy='dynamic')
 
 class User(UserMixin, db.Model):
     __tablename__ = "user"
+    __table_args__ = (
+        # gestão de usuários: filtro por empresa ou role, do mais novo para o mais antigo
+        db.Index('ix_user_company_id', 'company_id', 'id'),
+        db.Index('ix_user_role_id', 'role', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, index=True, nullable=False)
@@ -25,6 +34,8 @@ class User(UserMixin, db.Model):
     # padronizados: "admin", "funcionarios", "cliente_adm", "cliente"
 
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=True)
+    # exclusão agendada: o usuário fica inativo até a limpeza em segundo plano terminar (ver UserDeletion)
+    deleted_at = db.Column(db.DateTime, nullable=True)
 
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -47,6 +58,28 @@ class User(UserMixin, db.Model):
     def company_name(self):
         return self.company.name if self.company else None
 
+    @property
+    def is_active(self):
+        # flask-login recusa login_user para contas com exclusão agendada
+        return self.deleted_at is None
+
+class UserDeletion(db.Model):
+    """Progresso da exclusão de um usuário, feita em lotes numa thread de fundo"""
+    __tablename__ = "user_deletion"
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False, index=True)  # sem FK: o usuário some ao fim do processo
+    username = db.Column(db.String(50), nullable=False)
+    requested_by = db.Column(db.Integer, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, running, done, failed
+    step = db.Column(db.String(50), nullable=True)
+    steps_done = db.Column(db.Integer, nullable=False, default=0)
+    steps_total = db.Column(db.Integer, nullable=False, default=0)
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+    updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    finished_at = db.Column(db.DateTime, nullable=True)
+
 class Contato(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(120), nullable=False)
@@ -58,6 +91,10 @@ class Contato(db.Model):
     atualizado_em = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
 
 class BlogPost(db.Model):
+    __table_args__ = (
+        # listagem pública e feeds: do mais novo para o mais antigo, cursor (criado_em, id)
+        db.Index('ix_blog_post_criado_em', 'criado_em', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(200), nullable=False)
     slug = db.Column(db.String(200), unique=True, nullable=False)
@@ -66,10 +103,35 @@ class BlogPost(db.Model):
     autor_id = db.Column(db.Integer, db.ForeignKey('user.id'))
     criado_em = db.Column(db.DateTime, default=db.func.current_timestamp())
     atualizado_em = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
+    # render compilado ao salvar (app/blog_render.py): HTML sanitizado, resumo e metadados
+    conteudo_html = db.Column(db.Text)
+    excerpt = db.Column(db.String(300))
+    word_count = db.Column(db.Integer)
+    headings = db.Column(db.Text)  # JSON: [{"level", "id", "text"}]
+    content_hash = db.Column(db.String(64))  # sha256 do conteudo que gerou o render
+    renderer_version = db.Column(db.Integer)
 
     autor = db.relationship('User', backref='posts')
 
+    def reading_minutes(self):
+        return max(1, round((self.word_count or 0) / 200))
+
+    def toc(self):
+        return json.loads(self.headings) if self.headings else []
+
+class BlogState(db.Model):
+    """Versão do blog (linha única): sobe a cada alteração que muda o sitemap ou o RSS"""
+    __tablename__ = "blog_state"
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    updated_at = db.Column(db.DateTime, nullable=True)
+
 class Ticket(db.Model):
+    __table_args__ = (
+        # caixa de entrada do suporte: ordem (criado_em, id), geral e por status
+        db.Index('ix_ticket_criado_em', 'criado_em', 'id'),
+        db.Index('ix_ticket_status_criado_em', 'status', 'criado_em', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     titulo = db.Column(db.String(200), nullable=False)
     descricao = db.Column(db.Text, nullable=False)
@@ -81,6 +143,10 @@ class Ticket(db.Model):
     usuario = db.relationship('User', backref='tickets')
 
 class Mensagem(db.Model):
+    __table_args__ = (
+        # chat do ticket paginado de trás para frente e agregados da caixa de entrada
+        db.Index('ix_mensagem_ticket_criado_em', 'ticket_id', 'criado_em', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     conteudo = db.Column(db.Text, nullable=False)
     criado_em = db.Column(db.DateTime, default=db.func.current_timestamp())
@@ -92,6 +158,12 @@ class Mensagem(db.Model):
 
 class Log(db.Model):
     __tablename__ = "log"
+    __table_args__ = (
+        # listagem da auditoria: ordem (created_at, id), geral, por usuário e por status
+        db.Index('ix_log_created_at', 'created_at', 'id'),
+        db.Index('ix_log_user_created_at', 'user_id', 'created_at', 'id'),
+        db.Index('ix_log_status_created_at', 'status', 'created_at', 'id'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
@@ -115,6 +187,13 @@ class Goal(db.Model):
 
 class Event(db.Model):
     __tablename__ = "event"
+    __table_args__ = (
+        db.Index('ix_event_company_start_at', 'company_id', 'start_at'),
+        db.Index('ix_event_company_end_at', 'company_id', 'end_at'),
+        db.Index('ix_event_company_recurrence', 'company_id', 'recurrence_freq', 'start_at'),
+        db.Index('ix_event_responsavel_interval', 'responsavel_id', 'start_at', 'end_at'),
+        db.Index('ix_event_setor_interval', 'setor_id', 'start_at', 'end_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
     title = db.Column(db.String(300), nullable=False)
@@ -126,6 +205,13 @@ class Event(db.Model):
     setor_id = db.Column(db.Integer, db.ForeignKey('sector.id'), nullable=True)
     cor = db.Column(db.String(7), default='#3b82f6')  # Cor do evento em HEX
     tipo = db.Column(db.String(50), default='evento')  # evento, reuniao, tarefa, etc.
+
+    # Recorrência: a regra é guardada uma vez e as ocorrências são expandidas sob demanda
+    recurrence_freq = db.Column(db.String(10), nullable=True)  # daily, weekly, monthly (None = evento único)
+    recurrence_interval = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    recurrence_until = db.Column(db.DateTime, nullable=True)  # último início permitido
+    recurrence_count = db.Column(db.Integer, nullable=True)  # total de ocorrências da série
+    recurrence_exdates = db.Column(db.Text, nullable=True)  # JSON com as datas (YYYY-MM-DD) excluídas
     
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
@@ -151,7 +237,7 @@ class Collaborator(db.Model):
     __tablename__ = "collaborator"
     id = db.Column(db.Integer, primary_key=True)
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)  # opcionalmente vinculado a um user
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)  # opcionalmente vinculado a um user
     name = db.Column(db.String(200), nullable=False)
     email = db.Column(db.String(200))
     role = db.Column(db.String(100))
@@ -234,6 +320,7 @@ class DemandKanban(db.Model):
     company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
     name = db.Column(db.String(100), nullable=False)  # Nome do quadro (ex: "Projetos 2024")
     description = db.Column(db.Text)
+    version = db.Column(db.Integer, default=0, nullable=False)  # incrementa a cada alteração (sincronização incremental)
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
     company = db.relationship('Company', backref='kanban_boards')
@@ -246,14 +333,25 @@ class KanbanColumn(db.Model):
     name = db.Column(db.String(100), nullable=False)  # Ex: "To Do", "Doing", "Done"
     position = db.Column(db.Integer, nullable=False)  # Ordem das colunas
     color = db.Column(db.String(7), default="#6b7280")  # Cor em hex
+    version = db.Column(db.Integer, default=0, nullable=False)  # versão do quadro na última alteração
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     
     cards = db.relationship('KanbanCard', backref='column', lazy=True, cascade='all, delete-orphan')
 
 class KanbanCard(db.Model):
     __tablename__ = "kanban_card"
+    __table_args__ = (
+        db.Index('ix_kanban_card_column_position', 'column_id', 'position'),
+        db.Index('ix_kanban_card_column_version', 'column_id', 'version'),
+        # fila de prioridade (maior GUT primeiro) da empresa: geral, por setor e por responsável
+        db.Index('ix_kanban_card_company_gut_score', 'company_id', 'gut_score', 'id'),
+        db.Index('ix_kanban_card_company_setor_gut_score', 'company_id', 'setor_id', 'gut_score', 'id'),
+        db.Index('ix_kanban_card_company_quem_fazer_gut_score', 'company_id', 'quem_fazer_id', 'gut_score', 'id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     column_id = db.Column(db.Integer, db.ForeignKey('kanban_column.id'), nullable=False)
+    # empresa do quadro, copiada no card: a fila de prioridade lê o índice da empresa sem passar pelos quadros
+    company_id = db.Column(db.Integer, db.ForeignKey('company.id'), nullable=False)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     
@@ -261,17 +359,19 @@ class KanbanCard(db.Model):
     gravidade = db.Column(db.Integer, default=1)  # 1-5
     urgencia = db.Column(db.Integer, default=1)   # 1-5
     tendencia = db.Column(db.Integer, default=1)  # 1-5
+    gut_score = db.Column(db.Integer, default=1, nullable=False)  # gravidade x urgência x tendência
     
     # Informações da demanda
     o_que_fazer = db.Column(db.Text, nullable=False)
     onde_fazer = db.Column(db.String(200))
-    quem_fazer_id = db.Column(db.Integer, db.ForeignKey('collaborator.id'), nullable=True)
+    quem_fazer_id = db.Column(db.Integer, db.ForeignKey('collaborator.id'), nullable=True, index=True)
     setor_id = db.Column(db.Integer, db.ForeignKey('sector.id'), nullable=True)
     prazo = db.Column(db.DateTime, nullable=True)
     
     # Metadados
-    position = db.Column(db.Integer, default=0)  # Ordem dentro da coluna
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    position = db.Column(db.Float, default=0)  # Ordem dentro da coluna (rank fracionário, ver app/kanban.py)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    version = db.Column(db.Integer, default=0, nullable=False)  # versão do quadro na última alteração
     created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
     updated_at = db.Column(db.DateTime, default=db.func.current_timestamp(), onupdate=db.func.current_timestamp())
     
@@ -280,6 +380,22 @@ class KanbanCard(db.Model):
     setor = db.relationship('Sector', backref='cards')
     criador = db.relationship('User', backref='created_cards')
 
+    def update_gut_score(self):
+        self.gut_score = (self.gravidade or 1) * (self.urgencia or 1) * (self.tendencia or 1)
+
+class KanbanTombstone(db.Model):
+    """Registro de exclusão de card/coluna, usado pela sincronização incremental do quadro"""
+    __tablename__ = "kanban_tombstone"
+    __table_args__ = (
+        db.Index('ix_kanban_tombstone_kanban_version', 'kanban_id', 'version'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kanban_id = db.Column(db.Integer, db.ForeignKey('demand_kanban.id'), nullable=False)
+    entity = db.Column(db.String(20), nullable=False)  # 'card' ou 'column'
+    entity_id = db.Column(db.Integer, nullable=False)
+    version = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=db.func.current_timestamp())
+
 class KPI(db.Model):
     __tablename__ = "kpi"
     id = db.Column(db.Integer, primary_key=True)
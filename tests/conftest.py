@@ -0,0 +1,63 @@
+import pytest
+from sqlalchemy import event
+
+from manage import create_app, db, login_throttle, page_cache, user_cache
+
+
+class TestConfig:
+    SQLALCHEMY_DATABASE_URI = "sqlite://"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SECRET_KEY = "test"
+    TESTING = True
+    # auditoria e exclusões síncronas: nada de threads de fundo nos testes
+    AUDIT_LOG_ASYNC = False
+    USER_PURGE_ASYNC = False
+    PAGE_CACHE_ENABLED = False
+
+
+@pytest.fixture
+def app():
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        # falhas de login e acessos anônimos agregados viram Log agora, e não no atexit com o banco já descartado
+        login_throttle.flush()
+        page_cache.views.flush()
+        # o banco de cada teste reaproveita os ids; usuários em cache seriam de outro teste
+        user_cache.clear()
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def count_queries(app):
+    """Conta os SELECTs executados dentro do bloco: `with count_queries() as queries: ...`"""
+    from contextlib import contextmanager
+
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+    return counter
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+def log_in(client, user):
+    """Abre a sessão do flask-login direto no cookie (sem passar pelo hash da senha)"""
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user.id)
+        session['_fresh'] = True
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from manage import db
+from models import Company, Event
+from app.agenda import events_in_window, expand_occurrences
+
+
+def test_window_excludes_event_ending_at_its_start(app):
+    company = Company(name="Agenda")
+    db.session.add(company)
+    db.session.flush()
+    start = datetime(2026, 3, 2, 9)
+    db.session.add_all([
+        Event(company_id=company.id, title="Termina no início", start_at=start - timedelta(hours=1), end_at=start),
+        Event(company_id=company.id, title="Atravessa o início", start_at=start - timedelta(hours=1),
+              end_at=start + timedelta(minutes=30)),
+        Event(company_id=company.id, title="Começa no fim", start_at=start + timedelta(hours=8),
+              end_at=start + timedelta(hours=9)),
+    ])
+    db.session.commit()
+
+    events = events_in_window(company.id, start, start + timedelta(hours=8))
+
+    assert [event.title for event in events] == ["Atravessa o início"]
+
+
+def test_series_occurrence_ending_at_window_start_is_excluded():
+    series_start = datetime(2026, 3, 1, 8)
+    occurrences = expand_occurrences(series_start, series_start + timedelta(hours=1), 'daily', 1, None, None,
+                                     frozenset(), datetime(2026, 3, 3, 9), datetime(2026, 3, 4, 9))
+
+    assert occurrences == ((datetime(2026, 3, 4, 8), datetime(2026, 3, 4, 9)),)
@@ -0,0 +1,45 @@
+import pytest
+
+from manage import db
+from models import User
+from conftest import log_in
+
+
+@pytest.fixture
+def admin(app):
+    user = User(username="admin", name="Admin", email="admin@example.com", role="admin")
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+def _payload(*emails):
+    return [{'email': email, 'password': 'segredo123'} for email in emails]
+
+
+def test_bulk_create_requires_a_session(client, admin):
+    assert client.post('/api/users/bulk', json=_payload('a@example.com')).status_code == 401
+
+
+def test_bulk_create_requires_the_admin_role(client, admin):
+    cliente = User(username="cli", name="Cliente", email="cli@example.com", role="cliente")
+    db.session.add(cliente)
+    db.session.commit()
+    log_in(client, cliente)
+
+    assert client.post('/api/users/bulk', json=_payload('a@example.com')).status_code == 403
+    assert User.query.filter_by(email='a@example.com').count() == 0
+
+
+def test_bulk_create_is_rate_limited_per_admin(app, client, admin):
+    app.config.update(API_BULK_RATE_BURST=1, API_BULK_RATE_PER_MINUTE=1)
+    log_in(client, admin)
+
+    created = client.post('/api/users/bulk', json=_payload('a@example.com', 'b@example.com'))
+    limited = client.post('/api/users/bulk', json=_payload('c@example.com'))
+
+    assert created.status_code == 201
+    assert [result['status'] for result in created.get_json()['results']] == ['created', 'created']
+    assert limited.status_code == 429
+    assert int(limited.headers['Retry-After']) > 0
+    assert User.query.filter_by(email='c@example.com').count() == 0
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from manage import db
+from models import User
+from conftest import log_in
+
+
+@pytest.fixture
+def users(app):
+    admin = User(username="admin", name="Admin", email="admin@example.com", role="admin")
+    cliente = User(username="cli", name="Cliente", email="cli@example.com", role="cliente")
+    db.session.add_all([admin, cliente])
+    db.session.commit()
+    return admin, cliente
+
+
+def test_anonymous_callers_get_only_the_baseline_fields(client, users):
+    response = client.get('/api/users?limit=5000')
+
+    assert response.status_code == 200
+    assert [sorted(user) for user in response.get_json()] == [['email', 'id', 'name']] * 2
+
+
+@pytest.mark.parametrize('query', ['fields=role', 'fields=email,avatar', 'role=admin', 'company_id=1', 'format=ndjson'])
+def test_extra_fields_filters_and_export_require_a_session(client, users, query):
+    assert client.get(f'/api/users?{query}').status_code == 401
+
+
+def test_non_admin_session_is_refused(client, users):
+    log_in(client, users[1])
+
+    assert client.get('/api/users?fields=role').status_code == 403
+
+
+def test_admin_can_pick_fields_and_stream(client, users):
+    log_in(client, users[0])
+
+    page = client.get('/api/users?fields=username,role')
+    export = client.get('/api/users?format=ndjson&fields=role')
+
+    assert page.get_json()[0] == {'id': users[0].id, 'username': 'admin', 'role': 'admin'}
+    assert [json.loads(line)['role'] for line in export.get_data(as_text=True).splitlines()] == ['admin', 'cliente']
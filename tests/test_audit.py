@@ -0,0 +1,55 @@
+import time
+
+from flask import Flask
+
+from manage import audit_log, create_app, db
+from models import Log
+from app.audit import AuditLogWriter
+
+from conftest import TestConfig
+
+
+def make_app(tmp_path, name, **config):
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / name}"
+
+    for key, value in config.items():
+        setattr(FileConfig, key, value)
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def count_logs(app):
+    with app.app_context():
+        count = Log.query.count()
+        db.session.remove()
+        return count
+
+
+def test_new_app_writes_queued_rows_to_the_previous_one(tmp_path):
+    first = make_app(tmp_path, 'first.db', AUDIT_LOG_ASYNC=True, AUDIT_LOG_FLUSH_INTERVAL=30)
+    with first.app_context():
+        for i in range(3):
+            audit_log.record(f"Ação {i}")
+
+    started = time.monotonic()
+    second = make_app(tmp_path, 'second.db')
+
+    # o lote na mão da thread e o resto da fila vão para o banco do primeiro app, sem esperar o intervalo
+    assert time.monotonic() - started < 5
+    assert count_logs(first) == 3
+    assert count_logs(second) == 0
+    assert audit_log.app is second
+
+
+def test_atexit_hook_is_registered_once(monkeypatch):
+    registered = []
+    monkeypatch.setattr('app.audit.atexit.register', registered.append)
+    writer = AuditLogWriter()
+
+    writer.init_app(Flask('primeiro'))
+    writer.init_app(Flask('segundo'))
+
+    assert registered == [writer.shutdown]
@@ -0,0 +1,36 @@
+from manage import db
+from models import BlogPost, User
+from conftest import log_in
+
+
+def make_author():
+    admin = User(username="admin", name="Admin", email="admin@example.com", role="admin")
+    db.session.add(admin)
+    db.session.commit()
+    return admin
+
+
+def test_rss_follows_edits_in_the_same_second(client):
+    admin = make_author()
+    log_in(client, admin)
+    client.post('/admin/blog/novo', data={'titulo': "Primeiro", 'slug': 'primeiro', 'resumo': "r", 'conteudo': "<p>a</p>"})
+    post_id = db.session.query(BlogPost.id).scalar()
+    assert "<title>Primeiro</title>" in client.get('/blog/rss.xml').get_data(as_text=True)
+
+    # atualizado_em tem resolução de um segundo: as duas edições ficam com o mesmo valor
+    for titulo in ("Segundo", "Terceiro"):
+        client.post(f'/admin/blog/editar/{post_id}',
+                    data={'titulo': titulo, 'slug': 'primeiro', 'resumo': "r", 'conteudo': "<p>a</p>"})
+        assert f"<title>{titulo}</title>" in client.get('/blog/rss.xml').get_data(as_text=True)
+
+
+def test_rss_follows_an_author_rename(client):
+    admin = make_author()
+    log_in(client, admin)
+    client.post('/admin/blog/novo', data={'titulo': "Post", 'slug': 'post', 'resumo': "r", 'conteudo': "<p>a</p>"})
+    assert "<dc:creator>Admin</dc:creator>" in client.get('/blog/rss.xml').get_data(as_text=True)
+
+    client.post(f'/admin/usuarios/{admin.id}/editar',
+                data={'username': 'admin', 'name': "Admin Renomeado", 'email': 'admin@example.com', 'role': 'admin'})
+
+    assert "<dc:creator>Admin Renomeado</dc:creator>" in client.get('/blog/rss.xml').get_data(as_text=True)
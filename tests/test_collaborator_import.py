@@ -0,0 +1,25 @@
+from manage import db, user_cache
+from models import Collaborator, Company, User
+from app.collaborator_import import CollaboratorImport
+
+
+def test_linked_users_leave_the_cache_after_commit(app, monkeypatch):
+    company = Company(name="Importação")
+    user = User(username="ana", name="Ana", email="ana@example.com", role="cliente")
+    db.session.add_all([company, user])
+    db.session.commit()
+
+    invalidated = []
+    monkeypatch.setattr(user_cache, 'invalidate',
+                        lambda user_id: invalidated.append((user_id, db.session().in_transaction())))
+
+    report = CollaboratorImport(company.id).run([
+        (2, {'name': "Ana Souza", 'email': "ana@example.com"}),
+        (3, {'name': "Bruno", 'email': "bruno@example.com"}),
+    ])
+
+    assert (report['linked'], report['created']) == (1, 1)
+    # nenhuma transação aberta: o cache só é limpo depois do commit do lote
+    assert invalidated == [(user.id, False)]
+    assert db.session.get(User, user.id).company_id == company.id
+    assert Collaborator.query.filter_by(company_id=company.id).count() == 2
@@ -0,0 +1,187 @@
+import threading
+
+import pytest
+from sqlalchemy import event, insert, update
+
+from manage import create_app, db
+from models import Company, User, Sector, Collaborator, DemandKanban, KanbanColumn, KanbanCard
+from app import kanban as kanban_module
+from app.kanban import load_board_data, rebalance_column, schedule_rebalance, POSITION_STEP
+
+from conftest import TestConfig, log_in
+
+
+def make_board(cards):
+    """Quadro com três colunas e `cards` cards distribuídos entre elas (com setor, responsável e criador)"""
+    company = Company(name=f"Empresa {cards}")
+    db.session.add(company)
+    db.session.flush()
+    user = User(username=f"criador{cards}", name="Criador", email=f"criador{cards}@example.com",
+                role="cliente_adm", company_id=company.id)
+    sector = Sector(company_id=company.id, name="Operações")
+    db.session.add_all([user, sector])
+    db.session.flush()
+    collaborator = Collaborator(company_id=company.id, name="Responsável", sector_id=sector.id)
+    kanban = DemandKanban(company_id=company.id, name="Quadro")
+    db.session.add_all([collaborator, kanban])
+    db.session.flush()
+    columns = [KanbanColumn(kanban_id=kanban.id, name=name, position=i) for i, name in enumerate(("A fazer", "Fazendo", "Feito"))]
+    db.session.add_all(columns)
+    db.session.flush()
+
+    if cards:
+        db.session.execute(insert(KanbanCard), [
+            {
+                'column_id': columns[i % len(columns)].id,
+                'company_id': company.id,
+                'title': f"Card {i}",
+                'o_que_fazer': "Tarefa",
+                'setor_id': sector.id,
+                'quem_fazer_id': collaborator.id,
+                'created_by': user.id,
+                'position': float(i),
+            }
+            for i in range(cards)
+        ])
+    db.session.commit()
+    return kanban
+
+
+def board_queries(kanban, count_queries):
+    db.session.expire_all()
+    with count_queries() as queries:
+        data = load_board_data(kanban)
+    return len(queries), data
+
+
+def test_board_query_count_does_not_grow_with_cards(app, count_queries):
+    small = make_board(cards=3)
+    large = make_board(cards=2500)
+
+    small_queries, small_data = board_queries(small, count_queries)
+    large_queries, large_data = board_queries(large, count_queries)
+
+    assert sum(len(column['cards']) for column in small_data['columns']) == 3
+    assert sum(len(column['cards']) for column in large_data['columns']) == 2500
+    assert 0 < small_queries == large_queries
+
+
+def test_board_cards_carry_related_names(app, count_queries):
+    kanban = make_board(cards=4)
+
+    _, data = board_queries(kanban, count_queries)
+
+    card = data['columns'][0]['cards'][0]
+    assert card['responsavel']['name'] == "Responsável"
+    assert card['setor']['name'] == "Operações"
+    assert card['criador'] == "Criador"
+
+
+def test_move_card_rejects_non_integer_position(app, client):
+    kanban = make_board(cards=2)
+    card = KanbanCard.query.first()
+    log_in(client, db.session.get(User, card.created_by))
+
+    response = client.post(f'/client/kanban/card/{card.id}/move',
+                           json={'column_id': card.column_id, 'position': 'primeiro'})
+
+    assert response.status_code == 400
+
+
+def test_rebalance_waits_for_commit(app, monkeypatch):
+    kanban = make_board(cards=3)
+    column = KanbanColumn.query.filter_by(kanban_id=kanban.id).order_by(KanbanColumn.position).first()
+    started = []
+    monkeypatch.setattr(kanban_module, '_start_rebalance', lambda app, column_id: started.append(column_id))
+
+    schedule_rebalance(column.id)
+    assert started == []
+    db.session.rollback()
+    db.session.commit()
+    assert started == []  # descartada com o rollback
+
+    schedule_rebalance(column.id)
+    db.session.commit()
+    assert started == [column.id]
+
+
+def test_rebalance_renumbers_committed_order(app):
+    kanban = make_board(cards=0)
+    column = KanbanColumn.query.filter_by(kanban_id=kanban.id).order_by(KanbanColumn.position).first()
+    user_id = db.session.query(User.id).scalar()
+    for i, position in enumerate((1.0, 1.00001, 1.00002)):
+        db.session.add(KanbanCard(column_id=column.id, company_id=kanban.company_id, title=f"Card {i}", o_que_fazer="Tarefa",
+                                  created_by=user_id, position=position))
+    db.session.commit()
+
+    schedule_rebalance(column.id)
+    db.session.commit()
+    for thread in threading.enumerate():
+        if thread.name == f'kanban-rebalance-{column.id}':
+            thread.join(timeout=5)
+
+    db.session.expire_all()
+    positions = [card.position for card in
+                 KanbanCard.query.filter_by(column_id=column.id).order_by(KanbanCard.position)]
+    assert positions == [POSITION_STEP, 2 * POSITION_STEP, 3 * POSITION_STEP]
+
+
+def test_priority_cards_are_scoped_to_the_company(app):
+    own = make_board(cards=5)
+    make_board(cards=50)
+    db.session.execute(db.update(KanbanCard).values(gut_score=KanbanCard.id))
+    db.session.commit()
+
+    cards, next_cursor = kanban_module.load_priority_cards(own.company_id, limit=3)
+
+    own_ids = [card.id for card in KanbanCard.query.filter_by(company_id=own.company_id).order_by(KanbanCard.id.desc())]
+    assert [card['id'] for card in cards] == own_ids[:3]
+    assert next_cursor == {'after_score': own_ids[2], 'after_id': own_ids[2]}
+    rest, _ = kanban_module.load_priority_cards(own.company_id, limit=3, after=(own_ids[2], own_ids[2]))
+    assert [card['id'] for card in rest] == own_ids[3:]
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    # banco em arquivo: uma segunda conexão enxerga (e disputa) as escritas da primeira
+    class FileConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'kanban.db'}"
+
+    app = create_app(FileConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+def test_rebalance_keeps_a_move_committed_while_it_runs(file_app):
+    kanban = make_board(cards=0)
+    column = KanbanColumn.query.filter_by(kanban_id=kanban.id).order_by(KanbanColumn.position).first()
+    user_id = db.session.query(User.id).scalar()
+    cards = [KanbanCard(column_id=column.id, company_id=kanban.company_id, title=f"Card {i}", o_que_fazer="Tarefa",
+                        created_by=user_id, position=1.0 + i * 1e-5) for i in range(3)]
+    db.session.add_all(cards)
+    db.session.commit()
+    first, second, last = [card.id for card in cards]
+    column_id = column.id
+    statements = []
+
+    def move_last_to_top(conn, cursor, statement, parameters, context, executemany):
+        # outra requisição move o último card para o topo depois da primeira leitura da renumeração
+        statements.append(statement)
+        if len(statements) == 2:
+            with db.engine.begin() as other:
+                other.execute(update(KanbanCard).where(KanbanCard.id == last).values(position=0.5))
+
+    event.listen(db.engine, 'before_cursor_execute', move_last_to_top)
+    try:
+        rebalance_column(column_id)
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', move_last_to_top)
+    db.session.commit()
+
+    rows = db.session.execute(db.select(KanbanCard.id, KanbanCard.position)
+                              .where(KanbanCard.column_id == column_id).order_by(KanbanCard.position)).all()
+    assert rows == [(last, POSITION_STEP), (first, 2 * POSITION_STEP), (second, 3 * POSITION_STEP)]
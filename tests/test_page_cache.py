@@ -0,0 +1,63 @@
+import pickle
+from pathlib import Path
+
+import pytest
+
+from manage import create_app, db, page_cache
+
+from conftest import TestConfig
+
+
+class _Payload:
+    def __init__(self, path):
+        self.path = path
+
+    def __reduce__(self):
+        return Path.touch, (Path(self.path),)
+
+
+@pytest.fixture
+def disk_app(tmp_path):
+    class DiskConfig(TestConfig):
+        PAGE_CACHE_ENABLED = True
+        PAGE_CACHE_DIR = str(tmp_path / 'pages')
+
+    app = create_app(DiskConfig)
+    with app.app_context():
+        db.create_all()
+        yield app
+        page_cache.views.flush()
+        db.session.remove()
+        db.drop_all()
+
+
+def forget_memory():
+    # simula outro processo: só a camada em disco é compartilhada
+    page_cache._entries.clear()
+    page_cache._size = 0
+
+
+def test_disk_tier_round_trips_body_and_headers(disk_app):
+    client = disk_app.test_client()
+    first = client.get('/privacidade')
+    forget_memory()
+
+    second = client.get('/privacidade')
+
+    assert (first.headers['X-Page-Cache'], second.headers['X-Page-Cache']) == ('MISS', 'HIT')
+    assert second.get_data() == first.get_data()
+    assert second.headers['ETag'] == first.headers['ETag']
+
+
+def test_disk_tier_never_unpickles(disk_app, tmp_path):
+    client = disk_app.test_client()
+    client.get('/privacidade')
+    marker = tmp_path / 'executado'
+    for page in Path(page_cache.directory).glob('*.page'):
+        page.write_bytes(pickle.dumps(_Payload(marker)))
+    forget_memory()
+
+    response = client.get('/privacidade')
+
+    assert response.headers['X-Page-Cache'] == 'MISS'
+    assert not marker.exists()
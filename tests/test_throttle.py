@@ -0,0 +1,32 @@
+from manage import db
+from models import User
+
+
+def _login(client, ip_address, password):
+    return client.post('/login', data={'login': 'ana', 'password': password},
+                       environ_base={'REMOTE_ADDR': ip_address})
+
+
+def test_failures_from_another_ip_do_not_lock_the_owner_out(app, client):
+    user = User(username="ana", name="Ana", email="ana@example.com", role="cliente")
+    user.set_password("senha-correta")
+    db.session.add(user)
+    db.session.commit()
+
+    for _ in range(app.config['LOGIN_THROTTLE_ID_BURST']):
+        assert _login(client, '203.0.113.9', 'errada').status_code == 302
+    assert _login(client, '203.0.113.9', 'errada').status_code == 429
+
+    response = _login(client, '198.51.100.7', 'senha-correta')
+
+    assert response.status_code == 302
+    assert response.headers['Location'].endswith('/dashboard')
+
+
+def test_attempts_spread_over_many_ips_hit_the_account_limit(app, client):
+    app.config.update(LOGIN_THROTTLE_ACCOUNT_BURST=8, LOGIN_THROTTLE_ACCOUNT_PER_MINUTE=1)
+
+    statuses = [_login(client, f'203.0.113.{i}', 'errada').status_code for i in range(10)]
+
+    # um IP por tentativa: só o balde da conta segura a rodada
+    assert statuses == [302] * 8 + [429] * 2
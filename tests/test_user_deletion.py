@@ -0,0 +1,41 @@
+from manage import db
+from models import Collaborator, Company, User, UserDeletion
+from conftest import log_in
+
+
+def test_admin_delete_purges_inline_and_redirects(client):
+    admin = User(username="admin", name="Admin", email="admin@example.com", role="admin")
+    user = User(username="ana", name="Ana", email="ana@example.com", role="cliente")
+    db.session.add_all([admin, user])
+    db.session.commit()
+    user_id = user.id
+    log_in(client, admin)
+
+    response = client.post(f'/admin/usuarios/{user_id}/excluir')
+
+    assert response.status_code == 302
+    assert db.session.get(User, user_id) is None
+    assert UserDeletion.query.filter_by(user_id=user_id).one().status == 'done'
+
+
+def test_deleting_a_collaborator_purges_its_user(client):
+    company = Company(name="Empresa")
+    db.session.add(company)
+    db.session.flush()
+    manager = User(username="gestor", name="Gestor", email="gestor@example.com", role="cliente_adm",
+                   company_id=company.id)
+    user = User(username="bia", name="Bia", email="bia@example.com", role="cliente", company_id=company.id)
+    db.session.add_all([manager, user])
+    db.session.flush()
+    collab = Collaborator(company_id=company.id, user_id=user.id, name="Bia", email="bia@example.com")
+    db.session.add(collab)
+    db.session.commit()
+    user_id, collab_id = user.id, collab.id
+    log_in(client, manager)
+
+    response = client.post(f'/client/collaborators/{collab_id}/delete')
+
+    assert response.status_code == 302
+    assert db.session.get(Collaborator, collab_id) is None
+    assert db.session.get(User, user_id) is None
+    assert UserDeletion.query.filter_by(user_id=user_id).one().status == 'done'